@@ -1,5 +1,6 @@
 # MIT license; Copyright (c) 2022 Jim Mussared
 
+import builtins
 import micropython
 from micropython import const
 import re
@@ -163,7 +164,7 @@ async def task(g=None, prompt="--> "):
                                 cmd = cmd[:-1]
                                 sys.stdout.write("\x08 \x08")
                     elif c == CHAR_CTRL_A:
-                        raw_repl(sys.stdin, g)
+                        await raw_repl(s, g)
                         break
                     elif c == CHAR_CTRL_B:
                         continue
@@ -241,92 +242,217 @@ async def task(g=None, prompt="--> "):
         micropython.kbd_intr(3)
 
 
-def raw_paste(s, window=512):
-    sys.stdout.write("R\x01")  # supported
-    sys.stdout.write(bytearray([window & 0xFF, window >> 8, 0x01]).decode())
-    eof = False
-    idx = 0
-    buff = bytearray(window)
-    file = b""
-    while not eof:
-        for idx in range(window):
-            b = s.read(1)
-            c = ord(b)
-            if c == CHAR_CTRL_C or c == CHAR_CTRL_D:
-                # end of file
-                sys.stdout.write(chr(CHAR_CTRL_D))
-                if c == CHAR_CTRL_C:
-                    raise KeyboardInterrupt
-                file += buff[:idx]
-                eof = True
-                break
-            buff[idx] = c
+# Raw REPL input is gathered here and reused between commands. It grows
+# by doubling when a paste outgrows it, so a large script costs a few
+# allocations instead of one per window.
+_RAW_BUF = const(512)
+# Output other tasks may print() while the raw REPL runs, written out
+# once it exits; anything beyond this is dropped.
+_HOLD_LIMIT = const(512)
+
+
+class _RawInput:
+    def __init__(self, s):
+        self.s = s
+        self.rest = b""
+        self.buf = bytearray(_RAW_BUF)
+        self.n = 0
+
+    async def read(self, n):
+        if self.rest:
+            data = self.rest[:n]
+            self.rest = self.rest[n:]
+            return data
+        # The ports' stdin read(n) waits for all n characters, which would
+        # stall the loop on a short command, so take one at a time as
+        # task() does; callers already loop until they have enough
+        data = await self.s.read(1)
+        if isinstance(data, str):
+            data = data.encode()
+        return data
 
-        if not eof:
-            file += buff
-            sys.stdout.write("\x01")  # indicate window available to host
+    def add(self, data):
+        n = self.n
+        end = n + len(data)
+        if end > len(self.buf):
+            size = 2 * len(self.buf)
+            while size < end:
+                size *= 2
+            buf = bytearray(size)
+            memoryview(buf)[:n] = memoryview(self.buf)[:n]
+            self.buf = buf
+        memoryview(self.buf)[n:end] = data
+        self.n = end
 
-    return file
+    def take(self):
+        code = bytes(memoryview(self.buf)[: self.n])
+        self.n = 0
+        return code
 
 
-def raw_repl(s, g: dict):
+class _RawStdout:
     """
-    This function is blocking to prevent other
-    async tasks from writing to the stdio stream and
-    breaking the raw repl session.
+    While the raw REPL runs it owns print(): other tasks keep running but
+    what they print is held back, so it cannot land in the middle of the
+    protocol, and is written when the raw REPL exits.
     """
-    heading = "raw REPL; CTRL-B to exit\n"
-    line = ""
-    sys.stdout.write(heading)
 
+    def __init__(self):
+        self.out = sys.stdout
+        self.held = []
+        self.held_n = 0
+        self.dropped = 0
+        self._print = None
+
+    def write(self, s):
+        self.out.write(s)
+
+    def _hold_print(self, *args, sep=" ", end="\n", file=None):
+        if file is not None and file is not sys.stdout:
+            self._print(*args, sep=sep, end=end, file=file)
+            return
+        s = sep.join([str(a) for a in args]) + end
+        if self.held_n + len(s) > _HOLD_LIMIT:
+            self.dropped += 1
+            return
+        self.held.append(s)
+        self.held_n += len(s)
+
+    def hold(self):
+        if self._print is None:
+            try:
+                self._print = builtins.print
+                builtins.print = self._hold_print
+            except (AttributeError, TypeError):
+                # builtins cannot be overridden on this port
+                self._print = None
+
+    def release(self, flush=True):
+        if self._print is not None:
+            builtins.print = self._print
+            self._print = None
+        if flush:
+            for s in self.held:
+                self.out.write(s)
+            if self.dropped:
+                self.out.write("[{} prints dropped during raw REPL]\n".format(self.dropped))
+            self.held = []
+            self.held_n = 0
+            self.dropped = 0
+
+
+_stdout = _RawStdout()
+
+
+async def raw_paste(inp, window=512):
+    out = _stdout
+    out.write("R\x01")  # supported
+    out.write(bytearray([window & 0xFF, window >> 8, 0x01]).decode())
+    remain = window
     while True:
-        line = ""
-        sys.stdout.write(">")
+        data = await inp.read(remain)
+        if not data:
+            return None
+        end = -1
+        for i in range(len(data)):
+            c = data[i]
+            if c == CHAR_CTRL_C or c == CHAR_CTRL_D:
+                end = i
+                break
+        if end >= 0:
+            # end of file
+            inp.add(memoryview(data)[:end])
+            inp.rest = data[end + 1 :]
+            out.write(chr(CHAR_CTRL_D))
+            if c == CHAR_CTRL_C:
+                inp.n = 0
+                raise KeyboardInterrupt
+            return inp.take()
+        inp.add(data)
+        remain -= len(data)
+        if remain <= 0:
+            remain = window
+            out.write("\x01")  # indicate window available to host
+
+
+async def raw_repl(s, g: dict):
+    """
+    Raw REPL (and raw-paste mode) as used by mpremote.
+
+    Input is awaited, so the rest of the application keeps running while
+    a command is received; their print() output is held until the raw
+    REPL exits. The received command itself is executed synchronously.
+    """
+    out = _stdout
+    heading = "raw REPL; CTRL-B to exit\n"
+    inp = _RawInput(s)
+    out.hold()
+    try:
+        out.write(heading)
         while True:
-            b = s.read(1)
-            c = ord(b)
-            if c == CHAR_CTRL_A:
-                rline = line
-                line = ""
-
-                if len(rline) == 2 and ord(rline[0]) == CHAR_CTRL_E:
-                    if rline[1] == "A":
-                        line = raw_paste(s)
+            inp.n = 0
+            code = None
+            out.write(">")
+            while code is None:
+                data = await inp.read(_RAW_BUF)
+                if not data:
+                    return 0
+                start = 0
+                for i in range(len(data)):
+                    c = data[i]
+                    if c < CHAR_CTRL_A or c > CHAR_CTRL_D:
+                        # let through any other raw 8-bit value
+                        continue
+                    inp.add(memoryview(data)[start:i])
+                    start = i + 1
+                    if c == CHAR_CTRL_A:
+                        if inp.n == 2 and inp.buf[0] == CHAR_CTRL_E and inp.buf[1] == 0x41:
+                            inp.n = 0
+                            inp.rest = data[i + 1 :]
+                            try:
+                                code = await raw_paste(inp)
+                            except KeyboardInterrupt:
+                                out.write(">")
+                            break
+                        # reset raw REPL
+                        inp.n = 0
+                        out.write(heading)
+                        out.write(">")
+                    elif c == CHAR_CTRL_B:
+                        # exit raw REPL
+                        out.write("\n")
+                        return 0
+                    elif c == CHAR_CTRL_C:
+                        # clear line
+                        inp.n = 0
+                    elif c == CHAR_CTRL_D:
+                        # entry finished
+                        # indicate reception of command
+                        out.write("OK")
+                        inp.rest = data[i + 1 :]
+                        code = inp.take()
                         break
                 else:
-                    # reset raw REPL
-                    sys.stdout.write(heading)
-                    sys.stdout.write(">")
-                continue
-            elif c == CHAR_CTRL_B:
-                # exit raw REPL
-                sys.stdout.write("\n")
-                return 0
-            elif c == CHAR_CTRL_C:
-                # clear line
-                line = ""
-            elif c == CHAR_CTRL_D:
-                # entry finished
-                # indicate reception of command
-                sys.stdout.write("OK")
-                break
-            else:
-                # let through any other raw 8-bit value
-                line += b
-
-        if len(line) == 0:
-            # Normally used to trigger soft-reset but stay in raw mode.
-            # Fake it for aiorepl / mpremote.
-            sys.stdout.write("Ignored: soft reboot\n")
-            sys.stdout.write(heading)
-
-        try:
-            result = exec(line, g)
-            if result is not None:
-                sys.stdout.write(repr(result))
-            sys.stdout.write(chr(CHAR_CTRL_D))
-        except Exception as ex:
-            print(line)
-            sys.stdout.write(chr(CHAR_CTRL_D))
-            sys.print_exception(ex, sys.stdout)
-        sys.stdout.write(chr(CHAR_CTRL_D))
\ No newline at end of file
+                    inp.add(memoryview(data)[start:])
+
+            if not code:
+                # Normally used to trigger soft-reset but stay in raw mode.
+                # Fake it for aiorepl / mpremote.
+                out.write("Ignored: soft reboot\n")
+                out.write(heading)
+
+            # Let the command print to the host, then take print() back.
+            out.release(False)
+            try:
+                result = exec(code, g)
+                if result is not None:
+                    out.write(repr(result))
+                out.write(chr(CHAR_CTRL_D))
+            except Exception as ex:
+                out.write(chr(CHAR_CTRL_D))
+                sys.print_exception(ex, out.out)
+            finally:
+                out.hold()
+            out.write(chr(CHAR_CTRL_D))
+    finally:
+        out.release()
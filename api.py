@@ -0,0 +1,215 @@
+# api.py
+import uasyncio as asyncio
+from httpreq import RequestParser, HTTPError, REASONS, reject, close
+from timeline import Sequence
+from status_stream import StatusStream
+
+_OK = b'{"ok":true}'
+# Fixed-width status body: values are patched in place, so the length
+# (and with it the whole header) never changes.
+_STATUS = b'{"on":[0,0,0,0,0,0,0,0,0],"width":[  0,  0,  0,  0,  0,  0,  0,  0,  0],"playing":0}'
+_ON = _STATUS.index(b'[') + 1
+_WIDTH = _STATUS.index(b'[', _ON) + 1
+_PLAYING = _STATUS.index(b'"playing":') + 10
+
+
+def _head(status, length, keep, ctype='application/json'):
+    return ('HTTP/1.1 %d %s\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n' % (
+        status, REASONS.get(status, 'OK'), ctype, length,
+        'keep-alive' if keep else 'close')).encode()
+
+
+def _name(part):
+    # sequence names map to seq/<name>.seq; no path tricks
+    for c in part:
+        if not (48 <= c <= 57 or 97 <= c <= 122 or 65 <= c <= 90 or c == 95):
+            raise HTTPError(400)
+    return part.decode()
+
+
+class MenorahAPI:
+    """HTTP/1.1 control and status API for a MenorahController.
+
+        GET /status                  {"on":[...],"width":[...],"playing":0|1}
+        GET /events                  live state, see status_stream.py
+        /light/<n>  /extinguish/<n>  /light_all  /off_all
+        /width/<n>/<percent>
+        /play/<name>                 seq/<name>.seq on the timeline
+        /sequence/light  /sequence/extinguish  /stop
+
+    Commands answer {"ok":true}; GET and POST are treated alike so a plain
+    URL works from a browser or a home-automation poller. Connections are
+    kept open unless the client asks to close them, and pipelined requests
+    are answered from the bytes already buffered with a single drain per
+    batch. Every response is built once up front; a status poll rewrites
+    the digits of a fixed-width reply in a scratch buffer and only copies
+    it when something changed.
+    """
+
+    def __init__(self, menorah, seq_dir='seq', events_hz=10):
+        self.menorah = menorah
+        self.seq_dir = seq_dir
+        self.stream = StatusStream(menorah.candles, events_hz)
+        self._seq = None
+        self._clients = 0
+        self._max_clients = 0
+        self._timeout_ms = 0
+        self._parsers = []
+        self.requests = 0
+
+        self._ok = {}
+        self._status = {}   # scratch buffer per keep-alive mode
+        self._sent = {}     # last status reply, immutable
+        self._error = {}
+        for keep in (False, True):
+            self._ok[keep] = _head(200, len(_OK), keep) + _OK
+            self._sent[keep] = _head(200, len(_STATUS), keep) + _STATUS
+            self._status[keep] = bytearray(self._sent[keep])
+            for code, reason in REASONS.items():
+                self._error[code, keep] = _head(code, len(reason), keep, 'text/plain') + reason.encode()
+
+    async def serve(self, listen_addr='0.0.0.0', port=8080, max_clients=4, timeout_ms=5000):
+        """Serve on the running event loop until cancelled.
+
+        At most `max_clients` connections are open at once (others get a
+        503, see httpreq.reject) and an idle keep-alive connection is closed after
+        `timeout_ms`."""
+        self._clients = 0
+        self._max_clients = max_clients
+        self._timeout_ms = timeout_ms
+        self._parsers = [RequestParser(max_header=512, max_body=64) for _ in range(max_clients)]
+        server = await asyncio.start_server(self._client, listen_addr, port, backlog=max_clients)
+        print('Menorah API on port', port)
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            self.stream.close()
+            server.close()
+            await server.wait_closed()
+
+    # --- Responses ---
+    def _status_reply(self, keep):
+        buf = self._status[keep]
+        base = len(buf) - len(_STATUS)
+        i = base + _ON
+        w = base + _WIDTH
+        for c in self.menorah.candles:
+            buf[i] = 49 if c.is_on else 48
+            i += 2
+            v = int(c.width)
+            v = 0 if v < 0 else 999 if v > 999 else v
+            buf[w] = 48 + v // 100 if v >= 100 else 32
+            buf[w + 1] = 48 + v // 10 % 10 if v >= 10 else 32
+            buf[w + 2] = 48 + v % 10
+            w += 4
+        buf[base + _PLAYING] = 49 if self.playing else 48
+        # The stream may hold on to what it is given, so hand out an
+        # immutable copy, made only when the state actually changed.
+        if buf != self._sent[keep]:
+            self._sent[keep] = bytes(buf)
+        return self._sent[keep]
+
+    @property
+    def playing(self):
+        return self._seq is not None and not self._seq.done()
+
+    def _run(self, coro):
+        # one sequence at a time; a new one replaces the running one
+        self.stop()
+        self._seq = asyncio.create_task(coro)
+
+    def stop(self):
+        if self.playing:
+            self._seq.cancel()
+        self._seq = None
+
+    def _dispatch(self, path, keep):
+        m = self.menorah
+        if path == b'/status':
+            return self._status_reply(keep)
+        parts = path.split(b'/')
+        cmd = parts[1] if len(parts) > 1 else b''
+        try:
+            if len(parts) == 2:
+                if cmd == b'light_all':
+                    m.light_all()
+                elif cmd == b'off_all':
+                    m.off_all()
+                elif cmd == b'stop':
+                    self.stop()
+                else:
+                    raise HTTPError(404)
+            elif len(parts) == 3:
+                arg = parts[2]
+                if cmd == b'light':
+                    m.light(int(arg))
+                elif cmd == b'extinguish':
+                    m.extinguish(int(arg))
+                elif cmd == b'play':
+                    self._run(m.play(Sequence.load('%s/%s.seq' % (self.seq_dir, _name(arg)))))
+                elif cmd == b'sequence' and arg == b'light':
+                    self._run(m.light_sequence())
+                elif cmd == b'sequence' and arg == b'extinguish':
+                    self._run(m.extinguish_sequence())
+                else:
+                    raise HTTPError(404)
+            elif len(parts) == 4 and cmd == b'width':
+                width = int(parts[3])
+                if not 0 <= width <= 100:
+                    raise HTTPError(400)
+                m.width_set(int(parts[2]), width)
+            else:
+                raise HTTPError(404)
+        except ValueError:
+            raise HTTPError(400)
+        return self._ok[keep]
+
+    # --- Connections ---
+    async def _client(self, reader, writer):
+        if self._clients >= self._max_clients:
+            await reject(reader, writer, self._error[503, False], self._timeout_ms)
+            return
+        self._clients += 1
+        req = self._parsers.pop()
+        more = False
+        events = False
+        try:
+            while await req.read(reader, self._timeout_ms, more):
+                more = True
+                keep = req.keep_alive
+                try:
+                    method = req.method()
+                    if method == b'GET' and req.path() == b'/events':
+                        events = True
+                        break
+                    if method != b'GET' and method != b'POST':
+                        raise HTTPError(405)
+                    writer.write(self._dispatch(req.path(), keep))
+                except HTTPError as e:
+                    writer.write(self._error[e.status, keep])
+                except OSError:
+                    # e.g. a missing .seq file
+                    writer.write(self._error[404, keep])
+                self.requests = (self.requests + 1) & 0x3FFFFFFF
+                if not req.pending():
+                    await writer.drain()
+                if not keep:
+                    break
+        except HTTPError as e:
+            writer.write(self._error[e.status, False])
+            try:
+                await writer.drain()
+            except Exception:
+                pass
+        except asyncio.TimeoutError:
+            pass  # idle keep-alive connection
+        except Exception as e:
+            print('API client error:', repr(e))
+        finally:
+            # a stream subscriber gives its request slot back while it listens
+            self._parsers.append(req)
+            self._clients -= 1
+        if events:
+            await self.stream.subscribe(writer)
+        await close(writer)
@@ -0,0 +1,114 @@
+# bam_out.py
+from machine import Pin, Timer
+from pwm_out import Writer
+
+
+class ShiftRegisterSink:
+    """A chain of 74HC595s on SPI: clock a plane out, then pulse the latch.
+
+    The first byte sent ends up in the register furthest from the board,
+    so outputs 0-7 are on the last register of the chain."""
+
+    def __init__(self, spi, latch):
+        self.spi = spi
+        self.latch = latch
+        latch.value(0)
+
+    def show(self, plane):
+        self.spi.write(plane)
+        self.latch.value(1)
+        self.latch.value(0)
+
+
+class PinSink:
+    """Plain GPIOs, output i on pins[i]."""
+
+    def __init__(self, pins):
+        self.pins = [Pin(p, Pin.OUT) for p in pins]
+
+    def show(self, plane):
+        for i, p in enumerate(self.pins):
+            p.value(plane[i >> 3] >> (i & 7) & 1)
+
+
+class BAMWriter(Writer):
+    """Software PWM by bit-angle modulation, one timer for every output.
+
+    A drop-in for PWMWriter when there are more candles than LEDC
+    channels: build the engine with FlickerEngine(writer=BAMWriter(...))
+    and give candles (or a MenorahController) output numbers 0..outputs-1
+    as pins.
+
+    Duties keep their top `bits` bits, stored as bit planes: plane k
+    holds bit k of every output, packed eight outputs to a byte. The
+    timer ticks at `freq` and plane k is shown for 2**k ticks, so a cycle
+    is 2**bits - 1 ticks and an output is on for its duty's share of it.
+    The timer callback only counts down and hands `sink` a prepared plane
+    when one starts: `bits` writes of (outputs + 7) // 8 bytes per cycle,
+    however many candles are lit. flush(), on the engine's task, flips the
+    bits of outputs whose level changed.
+
+    Five bits at 2 kHz refresh at 64 Hz. Levels below MAX >> bits are off,
+    so keep gamma and width in mind at low brightness. A flush that lands
+    mid-cycle shows a mix of old and new bits for that one cycle.
+    """
+
+    def __init__(self, sink, outputs, bits=5, freq=2000, timer=0, deadband=0):
+        if not 1 <= bits <= 8:
+            raise ValueError('bits must be 1..8')
+        super().__init__(outputs, deadband)
+        self.sink = sink
+        self.outputs = outputs
+        self.bits = bits
+        self.freq = freq
+        self._shift = 16 - bits
+        nb = (outputs + 7) // 8
+        self._nb = nb
+        self._buf = bytearray(nb * bits)
+        mv = memoryview(self._buf)
+        self._planes = [mv[k * nb:(k + 1) * nb] for k in range(bits)]
+        self._level = bytearray(outputs)
+        self._k = bits - 1
+        self._left = 1
+        self.cycles = 0
+
+        self._timer = Timer(timer)
+        self._timer.init(mode=Timer.PERIODIC, freq=freq, callback=self._tick)
+
+    def _tick(self, _):
+        left = self._left - 1
+        if left:
+            self._left = left
+            return
+        k = self._k + 1
+        if k == self.bits:
+            k = 0
+            self.cycles = (self.cycles + 1) & 0x3FFFFFFF
+        self._k = k
+        self._left = 1 << k
+        self.sink.show(self._planes[k])
+
+    def deinit(self):
+        self._timer.deinit()
+        for p in self._planes:
+            for i in range(len(p)):
+                p[i] = 0
+        self.sink.show(self._planes[0])
+
+    def _out(self, ch, duty):
+        # flip the plane bits of `ch` whose level bit changed
+        level = duty >> self._shift
+        flip = level ^ self._level[ch]
+        if not flip:
+            return False  # same level once cut to `bits`; nothing to show
+        self._level[ch] = level
+        buf = self._buf
+        nb = self._nb
+        i = ch >> 3
+        mask = 1 << (ch & 7)
+        while flip:
+            if flip & 1:
+                buf[i] ^= mask
+            flip >>= 1
+            i += nb
+        return True
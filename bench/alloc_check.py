@@ -0,0 +1,83 @@
+# alloc_check.py -- prove the flicker hot path does not allocate.
+#
+#   micropython bench/alloc_check.py
+#
+# Needs gc.mem_alloc(), i.e. the MicroPython unix port or a board. CPython
+# boxes every int above 256, so it has nothing useful to say here.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import gc
+import time
+from candle import Candle, TABLE_LEN
+from flicker import FlickerEngine
+from timeline import Sequence, Timeline
+
+STEPS = 20 * TABLE_LEN  # several table refills
+
+
+def run(candles, engine):
+    for _ in range(STEPS):
+        for c in candles:
+            c._step()
+        engine._service()
+        engine.writer.flush()
+
+
+def run_timeline(tl, seq):
+    for t in range(0, seq.duration, tl.frame_ms):
+        tl._frame(seq, t)
+        tl.candles[0].out.flush()
+
+
+def run_fades(engine, t0, ms):
+    for t in range(0, ms + engine.tick_ms, engine.tick_ms):
+        engine._fade_all(time.ticks_add(t0, t))
+        engine.writer.flush()
+
+
+def measure(fn, *args):
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    fn(*args)
+    used = gc.mem_alloc() - before
+    gc.enable()
+    return used
+
+
+def main():
+    if not hasattr(gc, 'mem_alloc'):
+        print('gc.mem_alloc() not available, run under MicroPython')
+        sys.exit(2)
+    engine = FlickerEngine()
+    candles = [Candle(i, width=50, engine=engine) for i in range(9)]
+    for c in candles:
+        c.enabled = True
+        c._queued = True
+        engine._link(c, 0)
+    run(candles, engine)  # warm up
+    used = measure(run, candles, engine)
+    print('bytes allocated over %d steps x %d candles: %d' % (STEPS, len(candles), used))
+
+    seq = Sequence.load('seq/breathe.seq')
+    tl = Timeline(candles)
+    tl._start(seq)
+    frames = measure(run_timeline, tl, seq)
+    print('bytes allocated over %d timeline frames: %d' % (seq.duration // tl.frame_ms, frames))
+
+    for c in candles:
+        c._fade_cancel(256)
+        c.off(500)
+    fades = measure(run_fades, engine, candles[0]._f_t0, 500)
+    print('bytes allocated over a 500 ms fade-out of %d candles: %d' % (len(candles), fades))
+    if used or frames or fades:
+        print('FAIL')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# api_load.py -- keep-alive and pipelined load against the menorah API.
+#
+#   python bench/api_load.py [requests] [connections] [pipeline]
+#
+# Each connection stays open and sends `pipeline` requests per write,
+# mostly /status polls with a command mixed in, against the stub PWM.
+# Then, with every client slot held, one more client must get a 503.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import time
+import uasyncio as asyncio
+from menorah import MenorahController
+from api import MenorahAPI
+
+PORT = 8181
+PATHS = (b'/status', b'/status', b'/status', b'/light/3', b'/status', b'/width/3/40',
+         b'/status', b'/extinguish/3')
+
+
+async def client(count, pipeline, codes):
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    sent = 0
+    while sent < count:
+        batch = min(pipeline, count - sent)
+        writer.write(b''.join(b'GET %s HTTP/1.1\r\nHost: m\r\n\r\n' % PATHS[(sent + k) % len(PATHS)]
+                              for k in range(batch)))
+        await writer.drain()
+        for _ in range(batch):
+            status = int((await reader.readline()).split(b' ', 2)[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b'\r\n':
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line[15:])
+            await reader.readexactly(length)
+            codes[status] = codes.get(status, 0) + 1
+        sent += batch
+    writer.close()
+
+
+async def turned_away(connections):
+    # every slot held by an idle keep-alive connection, one more client
+    # must get the 503 rather than a reset
+    held = [await asyncio.open_connection('127.0.0.1', PORT) for _ in range(connections)]
+    await asyncio.sleep(0.05)
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    writer.write(b'GET /status HTTP/1.1\r\nHost: m\r\n\r\n')
+    try:
+        await writer.drain()
+        resp = await reader.read(-1)
+    except OSError:
+        resp = b''
+    writer.close()
+    for _, w in held:
+        w.close()
+    await asyncio.sleep(0.05)  # let the server see them go
+    return int(resp.split(b' ', 2)[1]) if resp else 0
+
+
+async def run(total, connections, pipeline):
+    m = MenorahController(list(range(9)), width=50)
+    api = MenorahAPI(m)
+    server = asyncio.create_task(api.serve('127.0.0.1', PORT, max_clients=connections))
+    await asyncio.sleep(0.2)
+    codes = {}
+    t0 = time.ticks_us()
+    await asyncio.gather(*[client(total // connections, pipeline, codes) for _ in range(connections)])
+    elapsed = time.ticks_diff(time.ticks_us(), t0) / 1e6
+    busy = await turned_away(connections)
+    codes[busy] = codes.get(busy, 0) + 1
+    server.cancel()
+    m.off_all()
+    return codes, elapsed
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    pipeline = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    codes, elapsed = asyncio.run(run(total, connections, pipeline))
+    done = sum(codes.values())
+    print('%d requests over %d keep-alive connections, pipeline depth %d' % (done, connections, pipeline))
+    print('req/s %.0f' % (done / elapsed))
+    print('status', codes)
+    if set(codes) != {200, 503} or codes[503] != 1:
+        print('FAIL')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
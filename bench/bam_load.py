@@ -0,0 +1,69 @@
+# bam_load.py -- CPU cost of the BAM backend against candle count.
+#
+#   python bench/bam_load.py [seconds] [bits] [freq]
+#
+# For each candle count the candles flicker for `seconds` on a BAMWriter
+# driving a shift register chain on the stub SPI, then on a PWMWriter
+# without a channel limit. "engine" is the flicker task's busy time per
+# second (steps and flush). The stub timer never fires, so the timer
+# callback is timed separately over whole cycles and scaled to `freq`;
+# "total %" is the share of one CPU core both take. These are CPython
+# numbers on the host: they show how the cost grows, not the ESP32's.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import time
+import uasyncio as asyncio
+from machine import Pin, SPI
+from bam_out import BAMWriter, ShiftRegisterSink
+from candle import Candle
+from flicker import FlickerEngine
+from pwm_out import PWMWriter
+
+
+async def flicker(writer, n, seconds):
+    engine = FlickerEngine(writer=writer)
+    candles = [Candle(i, width=50, engine=engine) for i in range(n)]
+    for c in candles:
+        c.on(0)
+    await asyncio.sleep(0.3)  # settle
+    engine.reset_stats()
+    await asyncio.sleep(seconds)
+    busy = engine.busy_us / seconds
+    for c in candles:
+        c.deinit()
+    return busy
+
+
+def isr_us(writer, cycles=200):
+    cb = writer._timer.callback
+    ticks = cycles * ((1 << writer.bits) - 1)
+    t = time.ticks_us()
+    for _ in range(ticks):
+        cb(writer._timer)
+    return time.ticks_diff(time.ticks_us(), t) / ticks
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    bits = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    freq = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    print('%d-bit BAM at %d Hz: %.0f Hz refresh' % (bits, freq, freq / ((1 << bits) - 1)))
+    print('%8s %16s %12s %10s %8s %16s' % (
+        'candles', 'bam engine us/s', 'isr us/tick', 'isr us/s', 'total %', 'pwm engine us/s'))
+    for n in (9, 32, 64, 128, 256):
+        spi = SPI(1)
+        bam = BAMWriter(ShiftRegisterSink(spi, Pin(5)), n, bits=bits, freq=freq)
+        busy = asyncio.run(flicker(bam, n, seconds))
+        tick = isr_us(bam)
+        isr = tick * freq
+        bam.deinit()
+        pwm = asyncio.run(flicker(PWMWriter(max_channels=None), n, seconds))
+        print('%8d %16.0f %12.2f %10.0f %8.2f %16.0f' % (
+            n, busy, tick, isr, (busy + isr) / 10000, pwm))
+
+
+if __name__ == '__main__':
+    main()
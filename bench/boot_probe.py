@@ -0,0 +1,61 @@
+# boot_probe.py -- import main.py on the host and time the first candle light.
+#
+#   python bench/boot_probe.py
+#
+# Prints one JSON object: ms from the start of `import main` to the first
+# non-zero duty write, whether that met TARGET_MS, which deferred modules
+# had already been imported by then (should be none) and main.py's
+# bootprof steps up to that point. aiorepl is swapped for an idle task
+# since there is no console to read. It runs from an empty directory, as
+# with hanukkah.bin next to it main.py stays dark for the scheduler.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import os
+import tempfile
+import time
+import uasyncio as asyncio
+from machine import PWM
+
+# Host budget for import-to-first-light; the ESP32 is slower by an order
+# of magnitude, compare on-device runs with bootprof.show() instead.
+TARGET_MS = 15
+DEFERRED = ('wifi_manager', 'api', 'aiorepl')
+
+repl = type(sys)('aiorepl')
+
+
+async def _idle_repl(g=None, prompt='--> '):
+    await asyncio.Event().wait()
+
+repl.task = _idle_repl
+sys.modules['aiorepl'] = repl
+
+t0 = time.ticks_us()
+
+
+def _first_light(pwm, duty):
+    if duty:
+        ms = time.ticks_diff(time.ticks_us(), t0) / 1000
+        sys.stdout = sys.__stdout__
+        import json
+        import bootprof
+        done = [name.split()[1] for name, _ in bootprof.steps if name.startswith('import ')]
+        print(json.dumps({
+            'boot_to_first_light_ms': round(ms, 2),
+            'target_ms': TARGET_MS,
+            'met': ms <= TARGET_MS,
+            'imported_early': [m for m in DEFERRED if m in done or m in sys.modules and m != 'aiorepl'],
+            'profile_ms': [[name, round(us / 1000, 2)] for name, us in bootprof.steps],
+        }))
+        sys.stdout.flush()
+        os._exit(0)
+
+
+PWM.on_write = _first_light
+sys.path[:2] = [os.path.abspath(p) for p in sys.path[:2]]
+os.chdir(tempfile.mkdtemp())
+sys.stdout = open(os.devnull, 'w')  # main.py is chatty
+import main
@@ -0,0 +1,120 @@
+# fade_check.py -- interrupting fades, on a virtual clock.
+#
+#   python bench/fade_check.py
+#
+# One candle on the stub PWM, fades of 400 ms. on() during a fade-out
+# and off() during a fade-in must turn the fade round from where it is,
+# without a jump, and finish at the new target; on(0) and off(0) in
+# the middle of a fade must land at once. No interruption may start a
+# task of its own, and the engine must end with an empty fade list.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import asyncio as _asyncio
+import vclock
+
+FADE_MS = 400
+
+
+def main():
+    clock = vclock.install()
+    import uasyncio as asyncio
+    from candle import Candle
+    from flicker import FlickerEngine
+    from pwm_out import PWMWriter
+
+    fails = []
+
+    def check(ok, what):
+        print('%-44s %s' % (what, 'ok' if ok else 'FAIL'))
+        if not ok:
+            fails.append(what)
+
+    async def track(c, ms):
+        # fade values every tick for `ms`; the largest step between them
+        seen = [c.fade]
+        for _ in range(ms // 5):
+            await asyncio.sleep_ms(5)
+            seen.append(c.fade)
+        return seen, max(abs(b - a) for a, b in zip(seen, seen[1:]))
+
+    async def run():
+        engine = FlickerEngine(writer=PWMWriter())
+        c = Candle(1, width=50, engine=engine, seed=7)
+        c.fade_set(FADE_MS, FADE_MS)
+        c.on()
+        await asyncio.sleep_ms(10)
+        tasks = len(_asyncio.all_tasks())
+        # most a whole 400 ms 'inout' fade moves in one engine tick (twice
+        # the linear rate at its steepest)
+        smooth = 2 * 256 * engine.tick_ms // FADE_MS + 1
+
+        # off() half way through the fade-in
+        await asyncio.sleep_ms(FADE_MS // 2 - 10)
+        before = c.fade
+        c.off()
+        seen, step = await track(c, FADE_MS + 50)
+        check(0 < before < 256 and abs(seen[0] - before) <= smooth and step <= smooth,
+              'off() during fade-in turns round smoothly')
+        check(seen[-1] == 0 and not c.enabled and c.out.last(c.ch) == 0,
+              'off() during fade-in ends dark')
+
+        # on() half way through a fade-out
+        c.on(0)
+        await asyncio.sleep_ms(50)
+        c.off()
+        await asyncio.sleep_ms(FADE_MS // 2)
+        before = c.fade
+        c.on()
+        seen, step = await track(c, FADE_MS + 50)
+        check(0 < before < 256 and abs(seen[0] - before) <= smooth and step <= smooth,
+              'on() during fade-out turns round smoothly')
+        check(seen[-1] == 256 and c.is_on, 'on() during fade-out ends lit')
+
+        # on(0) in the middle of a fade-out
+        c.off()
+        await asyncio.sleep_ms(FADE_MS // 2)
+        c.on(0)
+        await asyncio.sleep_ms(10)
+        check(c.fade == 256 and c.is_on and engine._fades is None, 'on(0) mid fade-out lands lit')
+
+        # off(0) in the middle of a fade-in
+        c.off(0)
+        c.on()
+        await asyncio.sleep_ms(FADE_MS // 2)
+        c.off(0)
+        check(c.out.last(c.ch) == 0, 'off(0) mid fade-in writes 0 at once')
+        await asyncio.sleep_ms(50)
+        check(c.fade == 0 and not c.enabled and c.out.last(c.ch) == 0, 'off(0) mid fade-in stays dark')
+
+        # back and forth faster than a fade
+        c.on()
+        grew = 0
+        for k in range(20):
+            await asyncio.sleep_ms(37)
+            if k % 2:
+                c.off()
+            else:
+                c.on()
+            grew = max(grew, len(_asyncio.all_tasks()) - tasks)
+        check(not grew, 'no task per interruption')
+        c.off()
+        await asyncio.sleep_ms(FADE_MS + 50)
+        check(c.fade == 0 and not c.enabled, 'rapid on/off ends dark')
+        check(engine._fades is None, 'fade list empty at the end')
+        check(len(_asyncio.all_tasks()) <= tasks, 'task count not grown')
+        c.deinit()
+        await asyncio.sleep_ms(100)
+
+    try:
+        vclock.run(run(), clock)
+    finally:
+        hostenv.install()
+    print('OK' if not fails else 'FAILED')
+    sys.exit(1 if fails else 0)
+
+
+if __name__ == '__main__':
+    main()
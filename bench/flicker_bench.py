@@ -0,0 +1,46 @@
+# flicker_bench.py -- wakeups and scheduler CPU per second for N candles.
+#
+#   python bench/flicker_bench.py [seconds] [deadband]
+#
+# "steps/s" is also the number of wakeups the old one-task-per-candle
+# loop would have needed for the same flicker.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import uasyncio as asyncio
+from candle import Candle
+from flicker import FlickerEngine
+from pwm_out import PWMWriter
+
+
+async def run(n, seconds, deadband):
+    # the stub has no LEDC channel limit
+    engine = FlickerEngine(writer=PWMWriter(deadband, max_channels=None))
+    candles = [Candle(i, width=50, engine=engine) for i in range(n)]
+    for c in candles:
+        c.on()
+    await asyncio.sleep(0.5)  # settle
+    engine.reset_stats()
+    engine.writer.reset_stats()
+    await asyncio.sleep(seconds)
+    out = engine.writer
+    r = (engine.wakeups, engine.serviced, engine.busy_us, out.issued, out.suppressed)
+    for c in candles:
+        c.off()
+    return [v / seconds for v in r]
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    deadband = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    print('%8s %10s %10s %12s %10s %12s' % (
+        'candles', 'wakeups/s', 'steps/s', 'cpu us/s', 'writes/s', 'suppressed/s'))
+    for n in (9, 32, 128):
+        w, s, b, i, x = asyncio.run(run(n, seconds, deadband))
+        print('%8d %10.1f %10.1f %12.0f %10.1f %12.1f' % (n, w, s, b, i, x))
+
+
+if __name__ == '__main__':
+    main()
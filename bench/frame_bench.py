@@ -0,0 +1,86 @@
+# frame_bench.py -- per-channel PWM writes against one frame per tick.
+#
+#   python bench/frame_bench.py [seconds]
+#
+# N candles flicker for `seconds` on a PWMWriter (one duty_u16 call per
+# changed channel), a FrameWriter in 'u8' captured by
+# host/frame_capture.py, and a FrameWriter in 'grb' on a NeoPixelSink
+# over the stub machine.bitstream. "calls/s" is output calls into the
+# hardware layer. Every captured frame is then checked against the
+# writer's cached duties, and a MenorahController is run on a frame
+# backend of its own.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import uasyncio as asyncio
+import machine
+from candle import Candle
+from flicker import FlickerEngine
+from frame_capture import CaptureSink
+from frame_out import FrameWriter, NeoPixelSink
+from menorah import MenorahController
+from pwm_out import PWMWriter
+
+
+async def flicker(writer, n, seconds):
+    engine = FlickerEngine(writer=writer)
+    candles = [Candle(i, width=50, engine=engine) for i in range(n)]
+    for c in candles:
+        c.on(0)
+    await asyncio.sleep(0.3)  # settle
+    engine.reset_stats()
+    writer.reset_stats()
+    await asyncio.sleep(seconds)
+    busy = engine.busy_us / seconds
+    for c in candles:
+        c.off(0)
+    return busy
+
+
+def check(writer, cap):
+    # the frame on the wire matches what the writer believes it sent
+    frame = cap.last()
+    return all(cap.value(frame, ch) == writer.last(ch) >> 8 for ch in range(writer.channels))
+
+
+async def menorah_check():
+    cap = CaptureSink()
+    m = MenorahController(list(range(9)), width=50, writer=FrameWriter(cap, 9))
+    m.light_all()
+    await asyncio.sleep(0.5)
+    lit = check(m.engine.writer, cap) and any(cap.last())
+    m.off_all()
+    await asyncio.sleep(0.7)
+    return lit and not any(cap.last())
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    print('%8s %10s %10s %10s %10s %10s %10s %8s' % (
+        'candles', 'pwm us/s', 'calls/s', 'u8 us/s', 'calls/s', 'grb us/s', 'calls/s', 'frames'))
+    ok = True
+    for n in (9, 32, 128):
+        pwm = PWMWriter(max_channels=None)
+        p_busy = asyncio.run(flicker(pwm, n, seconds))
+        cap = CaptureSink()
+        u8 = FrameWriter(cap, n)
+        u_busy = asyncio.run(flicker(u8, n, seconds))
+        ok = ok and check(u8, cap)
+        before = machine.bitstreams
+        grb = FrameWriter(NeoPixelSink(4), n, 'grb')
+        g_busy = asyncio.run(flicker(grb, n, seconds))
+        print('%8d %10.0f %10.1f %10.0f %10.1f %10.0f %10.1f %8s' % (
+            n, p_busy, pwm.issued / seconds, u_busy, u8.frames / seconds,
+            g_busy, (machine.bitstreams - before) / seconds, 'ok' if ok else 'MISMATCH'))
+    good = asyncio.run(menorah_check())
+    print('MenorahController on a FrameWriter: %s' % ('ok' if good else 'FAIL'))
+    ok = ok and good
+    print('OK' if ok else 'FAIL')
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# gamma_bench.py -- check the gamma LUT and time the duty write path.
+#
+#   python bench/gamma_bench.py [iterations]
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import time
+import curves
+from machine import Pin, PWM
+
+
+# Table entries at a few levels, worked out once and kept; a change to
+# curves' rounding or scaling shows here even if the formula still agrees
+ANCHORS = {
+    1.0: {0: 0, 1: 257, 128: 32896, 255: 65535},
+    1.8: {1: 3, 16: 449, 64: 5443, 128: 18953, 192: 39323, 254: 65073},
+    2.2: {1: 0, 16: 148, 64: 3131, 128: 14386, 192: 35103, 254: 64971},
+    2.8: {1: 0, 16: 28, 64: 1366, 128: 9514, 192: 29608, 254: 64818},
+}
+
+
+def check(gamma):
+    # against the formula written out here, not curves.reference(), which
+    # built the table
+    t = curves.get(gamma)
+    worst = 0
+    for i in range(256):
+        err = abs(t[i] - round(65535 * (i / 255) ** gamma))
+        if err > worst:
+            worst = err
+    if len(t) != 256 or t[0] != 0 or t[255] != 65535 or worst:
+        print('FAIL gamma %s: max error %d' % (gamma, worst))
+        sys.exit(1)
+    for i, want in ANCHORS[gamma].items():
+        if t[i] != want:
+            print('FAIL gamma %s: level %d is %d, want %d' % (gamma, i, t[i], want))
+            sys.exit(1)
+    for i in range(1, 256):
+        if t[i] < t[i - 1]:
+            print('FAIL gamma %s: not monotonic at %d' % (gamma, i))
+            sys.exit(1)
+
+
+def linear(led, n):
+    for d in range(n):
+        led.duty_u16(d & 0xFFFF)
+
+
+def lut(led, n):
+    curve = curves.get()
+    for d in range(n):
+        led.duty_u16(curve[(d & 0xFFFF) >> curves.SHIFT])
+
+
+def timed(fn, led, n):
+    t0 = time.ticks_us()
+    fn(led, n)
+    return time.ticks_diff(time.ticks_us(), t0) / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for g in (1.0, 1.8, 2.2, 2.8):
+        check(g)
+    print('LUT matches the gamma formula and anchors')
+    led = PWM(Pin(0))
+    a = timed(linear, led, n)
+    b = timed(lut, led, n)
+    print('linear write %.3f us, LUT write %.3f us (+%.3f us)' % (a, b, b - a))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# governor_sim.py -- the governor holding its budgets, on a virtual clock.
+#
+#   python bench/governor_sim.py [seconds]
+#
+# Nine candles at width 90 on the stub PWM (about 100 mA at 20 mA per
+# candle), first unmanaged, then under a 60 mA and 40 steps/s budget
+# with each policy. Current is measured from the recorded duty trace
+# over the second half of the run, not from the governor's own estimate.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import vclock
+from duty_trace import Recorder, stats
+
+PINS = list(range(9))
+MA_FULL = 20
+
+
+def run(seconds, policy, max_ma=60, max_steps=40):
+    clock = vclock.install()
+    import uasyncio as asyncio
+    from flicker import FlickerEngine
+    from governor import Governor
+    from menorah import MenorahController
+    from pwm_out import PWMWriter
+
+    rec = Recorder(PINS)
+    out = {}
+
+    async def main():
+        engine = FlickerEngine(writer=PWMWriter())
+        m = MenorahController(PINS, width=90, engine=engine, seed=3)
+        g = None
+        if policy:
+            g = Governor(m.candles, engine, max_ma=max_ma, max_steps=max_steps, policy=policy)
+            g.start()
+        m.light_all()
+        await asyncio.sleep_ms(seconds * 500)
+        s0, t0 = engine.serviced, clock.ticks_ms()
+        await asyncio.sleep_ms(seconds * 500)
+        out['steps'] = (engine.serviced - s0) * 1000 / (clock.ticks_ms() - t0)
+        out['start'] = t0
+        if g:
+            out['summary'] = g.summary()
+            out['dim_ms'] = g.dim_ms
+            g.stop()
+        m.off_all()
+        await asyncio.sleep_ms(1000)
+
+    try:
+        vclock.run(main(), clock)
+    finally:
+        trace = rec.stop()
+        hostenv.install()
+    # second half only, once the governor has settled
+    half = type(trace)(trace.channels)
+    for k in range(len(trace)):
+        if trace.t[k] >= out['start']:
+            half.add(trace.t[k] - out['start'], trace.ch[k], trace.duty[k])
+    rows = stats(half, seconds * 500)
+    out['ma'] = sum(r['mean'] for r in rows) * MA_FULL
+    out['shamash'] = rows[0]['mean']
+    out['others'] = sum(r['mean'] for r in rows[1:]) / 8
+    return out
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    print('%-14s %8s %9s %9s %9s' % ('policy', 'mA', 'steps/s', 'shamash', 'others'))
+    ok = True
+    for policy in (None, 'shamash_last', 'shamash_first', 'equal'):
+        r = run(seconds, policy)
+        print('%-14s %8.1f %9.1f %9.3f %9.3f' % (
+            policy or 'none', r['ma'], r['steps'], r['shamash'], r['others']))
+        if policy:
+            print('  ' + r['summary'])
+            ok = ok and r['ma'] <= 60 * 1.05 and r['steps'] <= 40 * 1.1 and r['dim_ms'] > 0
+            if policy == 'shamash_last':
+                ok = ok and r['shamash'] > r['others']
+            if policy == 'shamash_first':
+                ok = ok and r['shamash'] < r['others']
+        else:
+            ok = ok and r['ma'] > 60
+    print('OK' if ok else 'FAIL')
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# httpreq_bench.py -- request parsing throughput, old readline path vs RequestParser.
+#
+#   python bench/httpreq_bench.py [requests]
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import time
+import uasyncio as asyncio
+from httpreq import RequestParser
+
+BODY = b'ssid_select=&ssid_manual=My+Home+Network%21&password=correct%20horse%20battery%20staple'
+REQUEST = (b'POST / HTTP/1.1\r\nHost: 192.168.4.1\r\nUser-Agent: Mozilla/5.0 (X11; Linux x86_64)\r\n'
+           b'Accept: text/html,application/xhtml+xml\r\nAccept-Language: en-US,en;q=0.5\r\n'
+           b'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: %d\r\n'
+           b'Connection: close\r\n\r\n' % len(BODY)) + BODY
+
+
+class MemReader:
+    """Minimal stream over a bytes object, with both read styles."""
+
+    def __init__(self, data, chunk=536):  # one lwIP TCP segment
+        self.data = data
+        self.pos = 0
+        self.chunk = chunk
+
+    async def readline(self):
+        i = self.data.find(b'\n', self.pos)
+        i = len(self.data) if i < 0 else i + 1
+        line = self.data[self.pos:i]
+        self.pos = i
+        return line
+
+    async def readexactly(self, n):
+        out = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return out
+
+    async def readinto(self, buf):
+        n = min(len(buf), self.chunk, len(self.data) - self.pos)
+        buf[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+def _urldecode(s):
+    # The portal's decoder before RequestParser, kept for comparison
+    if not s:
+        return ''
+    s = s.replace('+', ' ')
+    res = ''
+    i = 0
+    L = len(s)
+    while i < L:
+        ch = s[i]
+        if ch == '%' and i + 2 < L:
+            try:
+                hexv = s[i+1:i+3]
+                res += chr(int(hexv, 16))
+                i += 3
+                continue
+            except Exception:
+                pass
+        res += ch
+        i += 1
+    return res
+
+
+async def old_path(reader):
+    # As the async portal read requests before RequestParser
+    request_line = await asyncio.wait_for_ms(reader.readline(), 5000)
+    headers = b''
+    while True:
+        line = await asyncio.wait_for_ms(reader.readline(), 5000)
+        if not line or line == b'\r\n':
+            break
+        headers += line
+    request_line.decode('utf-8').split(' ')[0]
+    length = 0
+    for hline in headers.split(b'\r\n'):
+        if hline.lower().startswith(b'content-length:'):
+            length = int(hline.split(b':', 1)[1].strip())
+            break
+    body = (await asyncio.wait_for_ms(reader.readexactly(length), 5000)).decode('utf-8')
+    params = {}
+    for pair in body.split('&'):
+        if '=' in pair:
+            k, v = pair.split('=', 1)
+            params[k] = v
+    return _urldecode(params.get('ssid_manual')), _urldecode(params.get('password', ''))
+
+
+async def new_path(reader, parser):
+    await parser.read(reader)
+    parser.method()
+    f = parser.form()
+    return bytes(f[b'ssid_manual']).decode(), bytes(f[b'password']).decode()
+
+
+async def run(n):
+    parser = RequestParser()
+    assert await old_path(MemReader(REQUEST)) == await new_path(MemReader(REQUEST), parser)
+    t0 = time.ticks_us()
+    for _ in range(n):
+        await old_path(MemReader(REQUEST))
+    t1 = time.ticks_us()
+    for _ in range(n):
+        await new_path(MemReader(REQUEST), parser)
+    t2 = time.ticks_us()
+    return time.ticks_diff(t1, t0), time.ticks_diff(t2, t1)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    old, new = asyncio.run(run(n))
+    print('%d requests of %d bytes' % (n, len(REQUEST)))
+    print('old readline path  %8.0f req/s  %6.1f us/req' % (n * 1e6 / old, old / n))
+    print('RequestParser      %8.0f req/s  %6.1f us/req' % (n * 1e6 / new, new / n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# httpreq_fuzz.py -- throw mutated and random requests at RequestParser.
+#
+#   python bench/httpreq_fuzz.py [iterations] [seed]
+#
+# Every input must either parse or raise HTTPError, and decoded form fields
+# must match a straightforward reference decoder.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import random
+from httpreq import RequestParser, HTTPError
+
+ALPHABET = b'abcXYZ019 %+=&:-\r\n\t\xff\x00'
+
+
+def reference_form(body):
+    fields = {}
+    for pair in body.split(b'&'):
+        if b'=' in pair:
+            k, v = pair.split(b'=', 1)
+        else:
+            k, v = pair, b''
+        k = _unquote(k)
+        if k:
+            fields[k] = _unquote(v)
+    return fields
+
+
+def _unquote(s):
+    s = s.replace(b'+', b' ')
+    out = bytearray()
+    i = 0
+    while i < len(s):
+        if s[i] == 37 and i + 2 < len(s) and _ishex(s[i + 1]) and _ishex(s[i + 2]):
+            out.append(int(s[i + 1:i + 3], 16))
+            i += 3
+        else:
+            out.append(s[i])
+            i += 1
+    return bytes(out)
+
+
+def _ishex(c):
+    return chr(c) in '0123456789abcdefABCDEF'
+
+
+def rand_bytes(rng, n):
+    return bytes(rng.choice(ALPHABET) for _ in range(n))
+
+
+def valid_request(rng):
+    body = b'&'.join(rand_bytes(rng, rng.randrange(0, 8)).replace(b'\r', b'').replace(b'\n', b'')
+                     for _ in range(rng.randrange(0, 5)))
+    headers = [b'Host: x', b'Content-Length: %d' % len(body), b'X-Pad: ' + b'p' * rng.randrange(0, 40)]
+    rng.shuffle(headers)
+    if rng.random() < 0.3:
+        headers = [h.upper() for h in headers]
+    return b'POST /?a=1 HTTP/1.1\r\n' + b'\r\n'.join(headers) + b'\r\n\r\n' + body, body
+
+
+def mutate(rng, data):
+    data = bytearray(data)
+    for _ in range(rng.randrange(1, 6)):
+        op = rng.randrange(3)
+        i = rng.randrange(len(data) + 1)
+        if op == 0 and data:
+            del data[min(i, len(data) - 1)]
+        elif op == 1:
+            data[i:i] = rand_bytes(rng, rng.randrange(1, 6))
+        elif data:
+            data[min(i, len(data) - 1)] = rng.choice(ALPHABET)
+    return bytes(data)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(int(sys.argv[2]) if len(sys.argv) > 2 else 1)
+    p = RequestParser(max_header=256, max_body=128)
+    ok = errors = 0
+    for it in range(iterations):
+        data, body = valid_request(rng)
+        kind = it % 3
+        if kind == 1:
+            data = mutate(rng, data)
+        elif kind == 2:
+            data = rand_bytes(rng, rng.randrange(0, 300))
+        try:
+            p.feed(data)
+        except HTTPError:
+            errors += 1
+            continue
+        except Exception as e:
+            print('FAIL: %r on %r' % (e, data))
+            sys.exit(1)
+        ok += 1
+        got = {k: bytes(v) for k, v in p.form().items()}
+        if kind == 0:
+            want = reference_form(body)
+            if got != want:
+                print('FAIL: form %r != %r for %r' % (got, want, body))
+                sys.exit(1)
+    print('%d inputs: %d parsed, %d rejected with HTTPError' % (iterations, ok, errors))
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
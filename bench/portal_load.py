@@ -0,0 +1,91 @@
+# portal_load.py -- concurrent GET/POST load against a local config portal.
+#
+#   python bench/portal_load.py [requests] [concurrency] [max_clients]
+#
+# Clients over max_clients must get a 503, as long as no more than
+# httpreq.REJECT_SLOTS of them are waiting at once; a connection reset
+# without any reply then fails the run. Past that, resets are expected
+# and only counted.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import time
+import uasyncio as asyncio
+from network import WLAN
+from wifi_manager import WiFiManager
+from httpreq import REJECT_SLOTS
+
+PORT = 8180
+FORM = b'ssid_manual=Bench+Net&password=secret'
+
+
+async def request(i):
+    t0 = time.ticks_us()
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    if i % 4:
+        writer.write(b'GET / HTTP/1.0\r\nHost: x\r\n\r\n')
+    else:
+        writer.write(b'POST / HTTP/1.0\r\nContent-Length: %d\r\n\r\n%s' % (len(FORM), FORM))
+    try:
+        await writer.drain()
+        resp = await reader.read(-1)
+    except OSError:
+        resp = b''  # reset before the reply was read: counted as 0, a failure
+    writer.close()
+    status = int(resp.split(b' ', 2)[1]) if resp else 0
+    return status, time.ticks_diff(time.ticks_us(), t0)
+
+
+async def worker(queue, results):
+    while queue:
+        results.append(await request(queue.pop()))
+
+
+async def run(total, concurrency, max_clients, config):
+    WLAN.aps = {'Net%02d' % i: {'password': 'pw', 'rssi': -40 - i} for i in range(20)}
+    wm = WiFiManager(config_file=config)
+    portal = asyncio.create_task(wm.config_portal('127.0.0.1', PORT, noap=True,
+                                                  max_clients=max_clients))
+    await asyncio.sleep(0.2)
+    queue = list(range(total))
+    results = []
+    t0 = time.ticks_us()
+    await asyncio.gather(*[worker(queue, results) for _ in range(concurrency)])
+    elapsed = time.ticks_diff(time.ticks_us(), t0) / 1e6
+    await asyncio.sleep(1.2)  # let pending post-save "reboots" fire
+    portal.cancel()
+    return results, elapsed
+
+
+def pct(sorted_vals, p):
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * p))]
+
+
+def main():
+    import os
+    import tempfile
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    max_clients = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    config = os.path.join(tempfile.mkdtemp(), 'wifi.json')
+    results, elapsed = asyncio.run(run(total, concurrency, max_clients, config))
+    lat = sorted(us for _, us in results)
+    codes = {}
+    for status, _ in results:
+        codes[status] = codes.get(status, 0) + 1
+    print('%d requests, concurrency %d, max_clients %d' % (total, concurrency, max_clients))
+    print('req/s %.0f' % (len(results) / elapsed))
+    print('latency ms p50 %.2f p90 %.2f p99 %.2f max %.2f' % (
+        pct(lat, 0.5) / 1000, pct(lat, 0.9) / 1000, pct(lat, 0.99) / 1000, lat[-1] / 1000))
+    print('status', codes)
+    if codes.get(0):
+        if concurrency <= max_clients + REJECT_SLOTS:
+            print('FAIL: %d connections reset without a reply' % codes[0])
+            sys.exit(1)
+        print('%d clients past the reject slots closed without a reply' % codes[0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# prng_bench.py -- flicker table generation: random.randint vs prng.
+#
+#   python bench/prng_bench.py [frames]
+#   micropython bench/prng_bench.py [frames]
+#
+# Generates a duty and a sleep per frame, the way the old per-candle
+# loop did with two randint calls, then with XorShift16.next() and with
+# one fill2() call per 32-frame table.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import random
+import time
+from array import array
+import prng
+
+LO, SPAN, SLEEP_LO, SLEEP_SPAN = 16000, 32000, 50, 101
+
+
+def with_randint(duty, sleep, frames):
+    for _ in range(frames // len(duty)):
+        for i in range(len(duty)):
+            duty[i] = random.randint(LO, LO + SPAN - 1)
+            sleep[i] = random.randint(SLEEP_LO, SLEEP_LO + SLEEP_SPAN - 1)
+
+
+def with_next(duty, sleep, frames):
+    g = prng.XorShift16(1)
+    for _ in range(frames // len(duty)):
+        for i in range(len(duty)):
+            duty[i] = LO + g.next() % SPAN
+            sleep[i] = SLEEP_LO + g.next() % SLEEP_SPAN
+
+
+def with_fill(duty, sleep, frames):
+    g = prng.XorShift16(1)
+    for _ in range(frames // len(duty)):
+        g.fill2(duty, LO, SPAN, sleep, SLEEP_LO, SLEEP_SPAN)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 64000
+    duty = array('H', bytes(64))
+    sleep = array('H', bytes(64))
+    print('%d frames on %s' % (frames, sys.implementation.name))
+    base = None
+    for name, fn in (('random.randint', with_randint), ('XorShift16.next', with_next),
+                     ('XorShift16.fill2', with_fill)):
+        t0 = time.ticks_us()
+        fn(duty, sleep, frames)
+        us = time.ticks_diff(time.ticks_us(), t0)
+        base = base or us
+        print('%-18s %8.3f us/frame  %5.1fx' % (name, us / frames, base / us))
+
+
+if __name__ == '__main__':
+    main()
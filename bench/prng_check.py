@@ -0,0 +1,101 @@
+# prng_check.py -- golden sequences for prng.XorShift16 and candle flicker.
+#
+#   python bench/prng_check.py
+#
+# The numbers below are the flicker a given seed must produce on every
+# port and build; a change to any of them breaks replay and multi-node
+# sync (sync.py), so update them only on purpose.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+from array import array
+import prng
+from candle import Candle
+from menorah import MenorahController
+from flicker import FlickerEngine
+from pwm_out import PWMWriter
+
+GOLDEN_NEXT = [54031, 61861, 5940, 65394, 5969, 12686, 1013, 61449]        # seed 0xACE1
+GOLDEN_FILL = [103, 109, 101, 137, 144, 115, 121, 113]                     # seed 1, 100 + x % 50
+GOLDEN_FILL_STATE = 17913
+GOLDEN_DUTY = [14384, 14376, 13624, 9813, 32328, 11939, 34666, 30607]      # Candle seed 0x1234, width 50
+GOLDEN_SLEEP = [82, 74, 90, 82, 119, 71, 140, 87]
+GOLDEN_MENORAH = [[30133, 8284, 24487], [58262, 7415, 34052]]             # seed 7, candles 7 and 8
+
+failures = []
+
+
+def check(name, got, want):
+    if got != want:
+        failures.append(name)
+        print('%-28s FAIL got %r' % (name, got))
+    else:
+        print('%-28s ok' % name)
+
+
+def run_steps(m, n):
+    # drive the candles without the event loop; the writes are the output
+    out = []
+    for _ in range(n):
+        for c in m.candles:
+            c._step()
+            out.append(c.out._pending[c.ch])
+    return out
+
+
+def main():
+    g = prng.XorShift16(0xACE1)
+    check('next()', [g.next() for _ in range(8)], GOLDEN_NEXT)
+
+    g = prng.XorShift16(1)
+    a = array('H', bytes(16))
+    g.fill(a, 100, 50)
+    check('fill()', (list(a), g.x), (GOLDEN_FILL, GOLDEN_FILL_STATE))
+
+    g = prng.XorShift16(1)
+    n = 1
+    while g.next() != 1:
+        n += 1
+    check('period', n, 65535)
+
+    g = prng.XorShift16(0xACE1)
+    for _ in range(prng.JUMP):
+        g.next()
+    check('jump()', prng.jump(0xACE1), g.x)
+
+    e = FlickerEngine(writer=PWMWriter())
+    c = Candle(5, width=50, engine=e, seed=0x1234)
+    check('Candle table', (list(c._duty[:8]), list(c._sleep[:8])), (GOLDEN_DUTY, GOLDEN_SLEEP))
+
+    m = MenorahController(list(range(9)), width=50, engine=e, seed=7)
+    check('MenorahController seed', [list(k._duty[:3]) for k in m.candles[-2:]], GOLDEN_MENORAH)
+
+    # No candle may reach another's starting state within JUMP draws, or
+    # it would replay that candle's flicker some frames behind it
+    g = prng.XorShift16(7)
+    starts = set(g.jump() for _ in range(9))
+    near = 0
+    for x in starts:
+        g = prng.XorShift16(x)
+        for _ in range(prng.JUMP - 1):
+            if g.next() in starts:
+                near += 1
+    check('candle streams apart', near, 0)
+
+    # Same seed, same output, across table refills and after reseed()
+    m2 = MenorahController(list(range(9)), width=50, engine=FlickerEngine(writer=PWMWriter()), seed=7)
+    first = run_steps(m, 100)
+    check('replay', run_steps(m2, 100), first)
+    m.reseed(7)
+    check('reseed()', run_steps(m, 100), first)
+
+    if failures:
+        print('FAIL')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# probe_cost.py -- CPU the event-loop probe adds to a flickering menorah.
+#
+#   python bench/probe_cost.py [seconds]
+#
+# Runs 9 candles with and without the probe and compares process CPU
+# time; the difference is reported as a share of wall time (target < 1%).
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import time
+import uasyncio as asyncio
+from candle import Candle
+from flicker import FlickerEngine
+from probe import Probe
+
+
+async def run(seconds, probed):
+    engine = FlickerEngine()
+    candles = [Candle(i, width=50, engine=engine) for i in range(9)]
+    for c in candles:
+        c.on(0)
+    p = Probe()
+    if probed:
+        p.start(engine)
+    await asyncio.sleep(0.5)  # settle
+    cpu = time.process_time()
+    await asyncio.sleep(seconds)
+    cpu = time.process_time() - cpu
+    summary = p.summary() if probed else None
+    p.stop()
+    for c in candles:
+        c.off(0)
+    return cpu, summary
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    base, _ = asyncio.run(run(seconds, False))
+    probed, summary = asyncio.run(run(seconds, True))
+    print(summary)
+    share = (probed - base) / seconds * 100
+    print('cpu without probe %.1f ms/s, with %.1f ms/s, overhead %.2f%% of wall time' % (
+        base / seconds * 1000, probed / seconds * 1000, share))
+    if share >= 1:
+        print('FAIL')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+# raw_repl_replay.py -- replay an mpremote raw-paste session against aiorepl.
+#
+#   python bench/raw_repl_replay.py [script_kb] [baud]
+#
+# The host side follows mpremote's pyboard.py byte for byte: enter the raw
+# REPL, ask for raw-paste with \x05A\x01, send the script within the flow
+# control window, end with \x04 and read the output and error sections.
+# It pastes a large script, one that raises, sends one command in plain
+# raw mode and exits with Ctrl-B, pacing its writes like a serial line of
+# `baud`. Meanwhile nine candles flicker on the stub PWM and a task keeps
+# printing; its output must stay out of the protocol and appear after the
+# raw REPL exits. The line's read(n) waits for all n bytes, as stdin
+# does on the ports, so a device that asks for more than was sent
+# stalls. Written for CPython and the unix port; stdout is swapped for a
+# pipe, which the unix port does not allow, so only the CPython run is
+# complete there.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import time
+import uasyncio as asyncio
+import aiorepl
+from flicker import FlickerEngine
+from pwm_out import PWMWriter
+from menorah import MenorahController
+
+HEADING = b'raw REPL; CTRL-B to exit\n'
+
+
+class Pipe:
+    """One direction of the serial line."""
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.log = bytearray()
+        self._event = asyncio.Event()
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.buf += data
+        self.log += data
+        self._event.set()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def waiting(self):
+        return len(self.buf)
+
+    async def read(self, n):
+        # like stdin on the ports: wait for all n bytes, not just some
+        while len(self.buf) < n:
+            self._event.clear()
+            await self._event.wait()
+        data = bytes(self.buf[:n])
+        del self.buf[:n]
+        return data
+
+
+class Host:
+    def __init__(self, to_dev, from_dev, baud):
+        self.tx = to_dev
+        self.rx = from_dev
+        self.byte_s = 10 / baud
+        self.credits = 0
+        self.chunks = 0
+
+    async def write(self, data):
+        self.tx.write(data)
+        await asyncio.sleep(len(data) * self.byte_s)
+
+    async def read_until(self, ending):
+        data = b''
+        while not data.endswith(ending):
+            data += await self.rx.read(1)
+        return data
+
+    async def exec_paste(self, script):
+        await self.read_until(b'>')
+        await self.write(b'\x05A\x01')
+        assert await self.rx.read(2) == b'R\x01', 'raw-paste not offered'
+        head = await self.rx.read(2)
+        window = head[0] | head[1] << 8
+        remain = window
+        i = 0
+        while i < len(script):
+            while remain == 0 or self.rx.waiting():
+                b = await self.rx.read(1)
+                if b == b'\x01':
+                    remain += window
+                    self.credits += 1
+                elif b == b'\x04':
+                    await self.write(b'\x04')
+                    raise AssertionError('device ended the paste early')
+                else:
+                    raise AssertionError('unexpected byte during paste: %r' % b)
+            chunk = script[i:i + remain]
+            await self.write(chunk)
+            self.chunks += 1
+            remain -= len(chunk)
+            i += len(chunk)
+        await self.write(b'\x04')
+        assert await self.read_until(b'\x04') == b'\x04', 'paste end not acknowledged'
+        return window, await self.follow()
+
+    async def exec_raw(self, script):
+        await self.read_until(b'>')
+        await self.write(script + b'\x04')
+        assert await self.rx.read(2) == b'OK', 'command not acknowledged'
+        return await self.follow()
+
+    async def follow(self):
+        out = (await self.read_until(b'\x04'))[:-1]
+        err = (await self.read_until(b'\x04'))[:-1]
+        return out, err
+
+
+def big_script(kb):
+    lines = ['t = 0']
+    i = 0
+    while sum(len(x) + 1 for x in lines) < kb * 1024:
+        lines.append('t += %d  # line %d of a long pasted script' % (i, i))
+        i += 1
+    lines.append('print("sum", t)')
+    return ('\n'.join(lines) + '\n').encode(), i * (i - 1) // 2
+
+
+async def chatter(state):
+    while True:
+        await asyncio.sleep_ms(20)
+        state['ticks'] += 1
+        print('tick', state['ticks'])
+
+
+async def run(kb, baud):
+    dev_in, dev_out = Pipe(), Pipe()
+    aiorepl._stdout.out = dev_out
+    real = sys.stdout
+    sys.stdout = dev_out
+    engine = FlickerEngine(writer=PWMWriter())
+    m = MenorahController(list(range(9)), width=50, engine=engine)
+    m.light_all()
+    state = {'ticks': 0}
+    noise = None
+    host = Host(dev_in, dev_out, baud)
+    script, total = big_script(kb)
+    res = {}
+    try:
+        repl = asyncio.create_task(aiorepl.raw_repl(dev_in, {}))
+        await host.read_until(HEADING)
+        first = len(dev_out.log)
+        noise = asyncio.create_task(chatter(state))
+
+        w0, t0 = engine.wakeups, state['ticks']
+        start = time.ticks_ms()
+        window, (out, err) = await host.exec_paste(script)
+        res['paste_ms'] = time.ticks_diff(time.ticks_ms(), start)
+        res['wakeups'] = engine.wakeups - w0
+        res['ticks'] = state['ticks'] - t0
+        res['window'] = window
+        res['big'] = out == b'sum %d\n' % total and err == b''
+
+        out, err = (await host.exec_paste(b'print("before")\n1/0\n'))[1]
+        res['error'] = out == b'before\n' and b'ZeroDivisionError' in err
+
+        out, err = await host.exec_raw(b'print(6 * 7)')
+        res['raw'] = out == b'42\n' and err == b''
+
+        await host.read_until(b'>')
+        mark = len(dev_out.log)
+        await host.write(b'\x02')
+        await repl
+    finally:
+        sys.stdout = real
+        aiorepl._stdout.out = real
+        if noise:
+            noise.cancel()
+    protocol, after = bytes(dev_out.log[first:mark]), bytes(dev_out.log[mark:])
+    res['clean'] = b'tick' not in protocol
+    res['flushed'] = after.startswith(b'\n') and b'tick' in after
+    res['size'] = len(script)
+    res['credits'], res['chunks'] = host.credits, host.chunks
+    return res
+
+
+def main():
+    kb = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    baud = int(sys.argv[2]) if len(sys.argv) > 2 else 115200
+    try:
+        r = asyncio.run(asyncio.wait_for(run(kb, baud), 60))
+    except asyncio.TimeoutError:
+        sys.exit('FAIL: session stalled (device waiting on a read that cannot complete?)')
+    print('pasted %d bytes at %d baud in %d ms: window %d, %d credits, %d writes' % (
+        r['size'], baud, r['paste_ms'], r['window'], r['credits'], r['chunks']))
+    print('during the paste: %d flicker wakeups, %d ticks of another task' % (
+        r['wakeups'], r['ticks']))
+    checks = [
+        ('large script output', r['big']),
+        ('exception section', r['error']),
+        ('plain raw mode', r['raw']),
+        ('no foreign output in protocol', r['clean']),
+        ('held output written on exit', r['flushed']),
+        ('event loop kept running', r['wakeups'] > 0 and r['ticks'] > 0),
+    ]
+    ok = True
+    for name, good in checks:
+        print('%-32s %s' % (name, 'ok' if good else 'FAIL'))
+        ok = ok and good
+    print('OK' if ok else 'FAIL')
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# schedule_sim.py -- a Hanukkah on the scheduler, on a virtual clock.
+#
+#   python bench/schedule_sim.py [year]
+#
+# Checks hanukkah.bin against host/hanukkah_table.py, then runs the
+# Scheduler from noon a few days before Hanukkah until after it, at
+# UTC+2 with an early Friday and a late Saturday, and once more started
+# halfway through a night. Every night must light the Shamash plus that
+# night's candles at the right minute and put them out `duration_min`
+# later, and the task must wake no more than about hourly in between.
+# Last, it boots with the clock unset: the task must not wake at all
+# until set_clock(), then catch up with the night it lands in.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import datetime
+import vclock
+import hanukkah_table
+
+TZ_MIN = 120
+AT = (17 * 60,) * 4 + (15 * 60 + 45, 18 * 60 + 30, 17 * 60)  # Monday first
+DURATION_MIN = 20
+UNIX_2000 = 946684800
+
+
+def unix(d, minutes=0):
+    # local date `d` at `minutes` past midnight, as a UTC timestamp
+    return (d.toordinal() - hanukkah_table.DAY0) * 86400 + UNIX_2000 + (minutes - TZ_MIN) * 60
+
+
+def run(start, end, unset_s=0):
+    """Run a Scheduler from `start` to `end` (UTC timestamps); returns what it did.
+
+    With `unset_s` the clock reads 1970 for that long first, then is set
+    to `start` as NTP would."""
+    clock = vclock.install(vclock.Clock(wall=0 if unset_s else start))
+    import uasyncio as asyncio
+    import schedule
+    from flicker import FlickerEngine
+    from menorah import MenorahController
+    from pwm_out import PWMWriter
+
+    log = []
+    naps = []
+
+    class Counted:
+        # schedule's view of uasyncio, counting its sleeps
+        def __getattr__(self, name):
+            return getattr(asyncio, name)
+
+        @staticmethod
+        def sleep_ms(ms):
+            naps.append(ms)
+            return asyncio.sleep_ms(ms)
+
+    async def main():
+        m = MenorahController(list(range(9)), seed=5, engine=FlickerEngine(writer=PWMWriter()))
+        m.light_all()
+        s = schedule.Scheduler(m, at=AT, tz_min=TZ_MIN, duration_min=DURATION_MIN, delay_ms=100)
+        light, out = m.light_sequence, m.extinguish_sequence
+
+        async def lit(delay_ms, n):
+            await light(delay_ms, n)
+            log.append(('on', clock.time(), sum(m.status().values())))
+
+        async def put_out(delay_ms=500):
+            log.append(('off', clock.time(), sum(m.status().values())))
+            await out(delay_ms)
+
+        m.light_sequence, m.extinguish_sequence = lit, put_out
+        t = s.start()
+        if unset_s:
+            await asyncio.sleep_ms(unset_s * 1000)
+            log.append(('unset', len(naps), sum(m.status().values())))
+            clock.wall = start - clock.time()
+            s.set_clock()
+        await asyncio.sleep_ms(1000)
+        log.append(('start', clock.time(), sum(m.status().values())))
+        await asyncio.sleep_ms((end - clock.time()) * 1000)
+        log.append(('end', clock.time(), s.lit))
+        s.show()
+        s.stop()
+        try:
+            await t
+        except asyncio.CancelledError:
+            pass
+
+    saved = schedule.asyncio
+    schedule.asyncio = Counted()
+    try:
+        vclock.run(main(), clock)
+    finally:
+        schedule.asyncio = saved
+        hostenv.install()
+    return log, naps
+
+
+def main():
+    year = int(sys.argv[1]) if len(sys.argv) > 1 else 2025
+    ok = True
+
+    from schedule import NightTable
+    table = NightTable('hanukkah.bin')
+    want = [hanukkah_table.first_night(y).toordinal() - hanukkah_table.DAY0
+            for y in range(table.first_year, table.first_year + len(table.starts))]
+    if list(table.starts) != want or list(table.counts) != list(range(1, 9)):
+        print('FAIL: hanukkah.bin does not match host/hanukkah_table.py, rebuild it')
+        ok = False
+    print('hanukkah.bin: %d-%d' % (table.first_year, table.first_year + len(table.starts) - 1))
+
+    first = hanukkah_table.first_night(year)
+    nights = []
+    for k in range(8):
+        d = first + datetime.timedelta(days=k)
+        nights.append((unix(d, AT[d.weekday()]), k + 1))
+
+    start = unix(first - datetime.timedelta(days=3), 12 * 60)
+    end = unix(first + datetime.timedelta(days=10))
+    log, naps = run(start, end)
+    ons = [(t, n) for ev, t, n in log if ev == 'on']
+    offs = [(t, n) for ev, t, n in log if ev == 'off']
+    print('%s: first night %s, %d nights lit, %d sleeps, longest %.1f h' % (
+        year, first, len(ons), len(naps), max(naps) / 3600000))
+    if log[0] != ('start', start + 1, 0):
+        print('FAIL: candles not put out at start:', log[0])
+        ok = False
+    for (on, k), lit, put_out in zip(nights, ons, offs):
+        # the last candle is lit k * delay_ms after `on`
+        if not on <= lit[0] <= on + 2 or lit[1] != k + 1:
+            print('FAIL: night %d: want %d candles at %d, got %s' % (k, k + 1, on, lit))
+            ok = False
+        if put_out[0] != on + DURATION_MIN * 60 or put_out[1] != k + 1:
+            print('FAIL: night %d: want out at %d, got %s' % (k, on + DURATION_MIN * 60, put_out))
+            ok = False
+    if len(ons) != 8 or len(offs) != 8 or log[-1][2] != 8:
+        print('FAIL: want 8 nights, got %d on, %d off' % (len(ons), len(offs)))
+        ok = False
+    days = (end - start) / 86400
+    if len(naps) > days * 24 + 8 * 3 + 8:
+        print('FAIL: %d sleeps in %.0f days, more than hourly' % (len(naps), days))
+        ok = False
+
+    # started in the middle of night 4: lit at once, out on time
+    on, k = nights[3]
+    log, naps = run(on + 600, on + 3 * 3600)
+    lit = [e for e in log if e[0] == 'on']
+    out = [e for e in log if e[0] == 'off']
+    if not lit or lit[0][1] > on + 602 or lit[0][2] != 5 or not out or out[0][1] != on + DURATION_MIN * 60:
+        print('FAIL: started mid-night:', log)
+        ok = False
+    print('started mid-night 4: %s' % log)
+
+    # booted with no clock, NTP an hour later, in the middle of night 4
+    log, naps = run(on + 600, on + 3 * 3600, unset_s=3600)
+    lit = [e for e in log if e[0] == 'on']
+    if log[0] != ('unset', 0, 9) or not lit or lit[0][1] > on + 602 or lit[0][2] != 5:
+        print('FAIL: clock set late:', log)
+        ok = False
+    print('clock set an hour after boot: %s' % log)
+    print('OK' if ok else 'FAILED')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# stream_load.py -- /events fan-out cost and slow-subscriber handling.
+#
+#   python bench/stream_load.py [seconds]
+#
+# Runs 9 flickering candles and measures the status stream's CPU per
+# event with 1, 4 and 8 subscribers, then adds a subscriber that never
+# reads and checks it gets dropped while the others keep up.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import socket
+import uasyncio as asyncio
+from menorah import MenorahController
+from api import MenorahAPI
+
+PORT = 8182
+
+
+def apply(state, line):
+    rec = line[5:].strip()
+    for k in range(0, len(rec), 6):
+        state[int(rec[k:k + 1], 16)] = (rec[k + 1] == 49, int(rec[k + 2:k + 6], 16))
+
+
+async def listener(state):
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    writer.write(b'GET /events HTTP/1.1\r\n\r\n')
+    await writer.drain()
+    while await reader.readline() != b'\r\n':
+        pass
+    events = 0
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        if line.startswith(b'data:'):
+            apply(state, line)
+            events += 1
+    writer.close()
+    return events
+
+
+async def stalled():
+    # tiny receive buffer and no reads: the server's writes back up
+    s = socket.socket()
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+    s.setblocking(False)
+    await asyncio.get_event_loop().sock_connect(s, ('127.0.0.1', PORT))
+    s.send(b'GET /events HTTP/1.1\r\n\r\n')
+    return s
+
+
+def small_sndbuf(stream):
+    # lwIP-sized send buffers, so a stalled client backs up in seconds
+    # rather than after the host kernel's megabytes
+    subscribe = stream.subscribe
+
+    async def wrapped(writer):
+        writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        await subscribe(writer)
+    stream.subscribe = wrapped
+
+
+async def run(seconds, listeners, slow=False, hz=50):
+    m = MenorahController(list(range(9)), width=50)
+    api = MenorahAPI(m, events_hz=hz)
+    small_sndbuf(api.stream)
+    server = asyncio.create_task(api.serve('127.0.0.1', PORT, max_clients=8))
+    m.light_all()
+    await asyncio.sleep(0.2)
+    states = [{} for _ in range(listeners)]
+    tasks = [asyncio.create_task(listener(st)) for st in states]
+    if slow:
+        sock = await stalled()
+    await asyncio.sleep(0.5)
+    st = api.stream
+    f0, b0 = st.frames, st.busy_us
+    await asyncio.sleep(seconds)
+    frames, busy = st.frames - f0, st.busy_us - b0
+    # every listener must have tracked the candles exactly
+    m.off_all()
+    await asyncio.sleep(0.8)
+    truth = {i: (c.is_on, c.out.last(c.ch)) for i, c in enumerate(m.candles)}
+    ok = all(s == truth for s in states)
+    dropped = st.dropped
+    if slow:
+        sock.close()
+    server.cancel()
+    await asyncio.gather(*tasks)  # closing the API ends the streams
+    return frames, busy, dropped, ok
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    print('%12s %10s %14s %8s %8s' % ('subscribers', 'events/s', 'us per event', 'dropped', 'in sync'))
+    for n in (1, 4, 8):
+        frames, busy, dropped, ok = asyncio.run(run(seconds, n))
+        print('%12d %10.1f %14.1f %8d %8s' % (n, frames / seconds, busy / max(frames, 1), dropped, ok))
+    frames, busy, dropped, ok = asyncio.run(run(seconds * 2, 4, slow=True, hz=200))
+    print('4 + 1 stalled at 200 Hz: dropped %d, others in sync %s' % (dropped, ok))
+    if not ok or dropped != 1:
+        print('FAIL')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
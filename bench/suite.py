@@ -0,0 +1,156 @@
+# suite.py -- host benchmark suite; results as JSON for comparing commits.
+#
+#   python bench/suite.py [-o results.json] [-c baseline.json] [-s seconds]
+#
+# Run from the repository root. Measures flicker engine wakeups and time per
+# tick, heap allocation per tick, portal request latency and boot-to-first-
+# flicker time, control API throughput and the event-loop probe's overhead, all against the fakes in host/.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import gc
+import json
+import subprocess
+import uasyncio as asyncio
+
+import flicker_bench
+import portal_load
+import api_load
+import probe_cost
+from candle import Candle
+from flicker import FlickerEngine
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def bench_flicker(seconds):
+    out = {}
+    for n in (9, 32, 128):
+        w, steps, busy, issued, suppressed = asyncio.run(flicker_bench.run(n, seconds, 0))
+        out['wakeups_per_s_%d' % n] = round(w, 1)
+        out['steps_per_s_%d' % n] = round(steps, 1)
+        out['us_per_wakeup_%d' % n] = round(busy / w, 2) if w else None
+        out['pwm_writes_per_s_%d' % n] = round(issued, 1)
+    return out
+
+
+def _alloc(fn):
+    if hasattr(gc, 'mem_alloc'):
+        gc.collect()
+        gc.disable()
+        before = gc.mem_alloc()
+        fn()
+        used = gc.mem_alloc() - before
+        gc.enable()
+        return used
+    import tracemalloc
+    tracemalloc.start()
+    fn()
+    used = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return used
+
+
+def bench_alloc(ticks=2000):
+    engine = FlickerEngine()
+    candles = [Candle(i, width=50, engine=engine) for i in range(9)]
+    for c in candles:
+        c.enabled = True
+        c._queued = True
+        engine._link(c, 0)
+
+    def run():
+        for _ in range(ticks):
+            engine._service()
+            engine.writer.flush()
+            engine._pos = (engine._pos + 1) % engine.slots
+
+    run()
+    # gc.mem_alloc() on MicroPython; tracemalloc peak on CPython, where
+    # boxed ints make this an upper bound rather than a real count.
+    return {'alloc_bytes_per_tick': round(_alloc(run) / ticks, 3)}
+
+
+def bench_portal(total=1000, concurrency=8):
+    import os
+    import tempfile
+    config = os.path.join(tempfile.mkdtemp(), 'wifi.json')
+    results, elapsed = asyncio.run(portal_load.run(total, concurrency, concurrency, config))
+    lat = sorted(us for _, us in results)
+    return {
+        'portal_req_per_s': round(len(results) / elapsed, 1),
+        'portal_p50_ms': round(portal_load.pct(lat, 0.5) / 1000, 3),
+        'portal_p99_ms': round(portal_load.pct(lat, 0.99) / 1000, 3),
+    }
+
+
+def bench_probe(seconds):
+    base, _ = asyncio.run(probe_cost.run(seconds, False))
+    probed, _ = asyncio.run(probe_cost.run(seconds, True))
+    return {'probe_overhead_pct': round((probed - base) / seconds * 100, 3)}
+
+
+def bench_api(total=8000, connections=4):
+    out = {}
+    for depth in (1, 8):
+        codes, elapsed = asyncio.run(api_load.run(total, connections, depth))
+        out['api_req_per_s_pipeline_%d' % depth] = round(sum(codes.values()) / elapsed, 1)
+    return out
+
+
+def bench_boot(runs=5):
+    best = None
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, 'bench/boot_probe.py'], timeout=30)
+        ms = json.loads(out.decode().strip().splitlines()[-1])['boot_to_first_light_ms']
+        best = ms if best is None or ms < best else best
+    return {'boot_to_first_light_ms': best}
+
+
+def compare(base, cur):
+    print('%-28s %12s %12s %8s' % ('metric', 'baseline', 'current', 'change'))
+    for k in sorted(cur):
+        a, b = base.get(k), cur[k]
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) and a:
+            print('%-28s %12s %12s %+7.1f%%' % (k, a, b, (b - a) * 100 / a))
+        else:
+            print('%-28s %12s %12s' % (k, a, b))
+
+
+def main():
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-o', '--out', help='write results JSON here')
+    ap.add_argument('-c', '--compare', help='baseline results JSON to compare against')
+    ap.add_argument('-s', '--seconds', type=float, default=2)
+    args = ap.parse_args()
+
+    results = {}
+    results.update(bench_flicker(args.seconds))
+    results.update(bench_alloc())
+    results.update(bench_portal())
+    results.update(bench_api())
+    results.update(bench_probe(args.seconds))
+    results.update(bench_boot())
+    doc = {'commit': git_rev(), 'python': sys.implementation.name, 'results': results}
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(doc, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f)['results'], results)
+    else:
+        print(json.dumps(doc, indent=1, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# supervisor_sim.py -- WiFiManager.supervise() against a flaky simulated network.
+#
+#   python bench/supervisor_sim.py [seconds]
+#
+# Runs the link supervisor and a lit candle set on one event loop while the
+# stub APs drop out and come back, then prints link stats, radio use and
+# the worst flicker engine lag seen.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import os
+import random
+import tempfile
+import time
+import uasyncio as asyncio
+from network import WLAN
+from candle import Candle
+from flicker import FlickerEngine
+from wifi_manager import WiFiManager
+
+
+async def chaos(seconds):
+    # every ~0.5 s flip a random AP up or down
+    t_end = time.ticks_add(time.ticks_ms(), int(seconds * 1000))
+    while time.ticks_diff(t_end, time.ticks_ms()) > 0:
+        await asyncio.sleep(0.5)
+        ap = WLAN.aps[random.choice(list(WLAN.aps))]
+        ap['up'] = not ap['up']
+    for ap in WLAN.aps.values():
+        ap['up'] = True
+
+
+async def lag_probe(state):
+    while True:
+        t = time.ticks_ms()
+        await asyncio.sleep_ms(10)
+        lag = time.ticks_diff(time.ticks_ms(), t) - 10
+        if lag > state['max_lag']:
+            state['max_lag'] = lag
+
+
+async def run(seconds):
+    WLAN.aps = {
+        'Home': {'password': 'h', 'rssi': -50, 'up': True, 'assoc_ms': 300},
+        'Flaky': {'password': 'f', 'rssi': -40, 'up': True, 'fail_rate': 0.7, 'assoc_ms': 100},
+        'Far': {'password': 'x', 'rssi': -85, 'up': True, 'assoc_ms': 800},
+    }
+    wm = WiFiManager(config_file=os.path.join(tempfile.mkdtemp(), 'wifi.json'))
+    for ssid, ap in WLAN.aps.items():
+        wm._add_or_update_network(ssid, ap['password'])
+    print('initial connect:', await wm.connect(per_network_timeout=2), wm.metrics)
+
+    engine = FlickerEngine()
+    candles = [Candle(i, engine=engine) for i in range(9)]
+    for c in candles:
+        c.on()
+    state = {'max_lag': 0}
+    probe = asyncio.create_task(lag_probe(state))
+    sup = asyncio.create_task(wm.supervise(check_ms=200, min_backoff_ms=200,
+                                           max_backoff_ms=3000, per_network_timeout=1))
+    scans, connects = WLAN.scans, WLAN.connects
+    await chaos(seconds)
+    await asyncio.sleep(4)  # let it settle with every AP back up
+    sup.cancel()
+    probe.cancel()
+    for c in candles:
+        c.off()
+    print('link:', wm.link)
+    print('connected at end:', wm.adapter['sta'].isconnected())
+    print('scans %d, connect calls %d, radio busy %.1f%% of %.0f s' % (
+        WLAN.scans - scans, WLAN.connects - connects,
+        wm.link['radio_ms'] / (seconds + 4) / 10, seconds + 4))
+    print('flicker steps %d, max event loop lag %d ms' % (engine.serviced, state['max_lag']))
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    random.seed(1)
+    asyncio.run(run(seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# sync_sim.py -- one leader and two followers over loopback multicast.
+#
+#   python bench/sync_sim.py [seconds]
+#
+# Each node has its own engine, writer and candles on the stub PWM and
+# talks through real UDP sockets on 127.0.0.1. One follower's clock is
+# made to drift by 5000 ppm. Every leader duty write should show up on
+# the followers with the same value within a couple of ticks, also
+# across the leader moving its epoch, which it does every 4 s here.
+import sys
+sys.path[:0] = ['host', '.']
+import hostenv
+hostenv.install()
+
+import time
+import uasyncio as asyncio
+from machine import PWM
+from flicker import FlickerEngine
+from pwm_out import PWMWriter
+from menorah import MenorahController
+from sync import FlickerSync
+
+WINDOW_US = 45000
+
+
+def node(base):
+    engine = FlickerEngine(writer=PWMWriter())
+    m = MenorahController(list(range(base, base + 9)), width=50, engine=engine)
+    return m, FlickerSync(m.candles, engine, iface='127.0.0.1', rekey_ms=2000, rebase_ms=4000)
+
+
+async def drift(engine, ppm):
+    # a slow local clock looks like the group clock running ahead
+    step = 1000000 // ppm
+    while True:
+        await asyncio.sleep_ms(step)
+        engine.offset += 1
+
+
+def matched(lead, follow, t0, t1):
+    hit = n = 0
+    j = 0
+    for t, v in lead:
+        if not t0 <= t <= t1:
+            continue
+        n += 1
+        while j < len(follow) and follow[j][0] < t - WINDOW_US:
+            j += 1
+        k = j
+        while k < len(follow) and follow[k][0] <= t + WINDOW_US:
+            if follow[k][1] == v:
+                hit += 1
+                break
+            k += 1
+    return hit, n
+
+
+async def run(seconds):
+    PWM.record = True
+    nodes = [node(0), node(100), node(200)]
+    (lm, ls), followers = nodes[0], nodes[1:]
+    tasks = [asyncio.create_task(s.follow()) for _, s in followers]
+    await asyncio.sleep(0.1)
+    tasks.append(asyncio.create_task(ls.lead(seed=0x1234)))
+    tasks.append(asyncio.create_task(drift(followers[1][1].engine, 5000)))
+    await lm.light_sequence(delay_ms=150)
+    t0 = time.ticks_us() + 1000000
+    await asyncio.sleep(seconds)
+    t1 = time.ticks_us() - 200000
+    worst = [0, 0]
+    for _ in range(int(seconds * 10)):
+        await asyncio.sleep(0.1)
+    for k, (_, s) in enumerate(followers):
+        worst[k] = abs(s.error)
+    out = []
+    for m, s in followers:
+        hit = n = 0
+        for lc, fc in zip(lm.candles, m.candles):
+            h, c = matched(lc.led.log, fc.led.log, t0, t1)
+            hit += h
+            n += c
+        same = [c.is_on for c in m.candles] == [c.is_on for c in lm.candles]
+        out.append((hit, n, s.received, s.steps, same))
+    for t in tasks:
+        t.cancel()
+    await asyncio.sleep(0)
+    PWM.record = False
+    return out, ls.sent, ls.rebases, worst
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    out, sent, rebases, worst = asyncio.run(run(seconds))
+    print('leader beacons sent: %d in %.0f s, epoch moved %d times' % (sent, seconds + 1.5, rebases))
+    ok = rebases > 0
+    for k, (hit, n, received, steps, same) in enumerate(out):
+        pct = hit * 100 / n if n else 0
+        print('follower %d%s: %d/%d leader writes matched (%.1f%%), beacons %d, clock steps %d, '
+              'offset error %d ms, lit set %s' % (
+                  k + 1, ' (5000 ppm drift)' if k else '', hit, n, pct, received, steps,
+                  worst[k], 'same' if same else 'DIFFERENT'))
+        ok = ok and pct >= 95 and steps == 0 and same
+    print('OK' if ok else 'FAIL')
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
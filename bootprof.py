@@ -0,0 +1,54 @@
+# bootprof.py
+#
+# Startup profile. main.py imports this first and records each import and
+# init step with imp() and lap(); show() prints the table from the REPL.
+# It only appends to a list, so it stays on in normal boots.
+import os
+import time
+
+# ticks count from reset, so this is the firmware and boot.py's share
+before_ms = time.ticks_ms()
+_t0 = time.ticks_us()
+_last = _t0
+steps = []
+
+
+def lap(name):
+    """Record the time since the previous step as step `name`."""
+    global _last
+    now = time.ticks_us()
+    steps.append((name, time.ticks_diff(now, _last)))
+    _last = now
+
+
+def _kind(m):
+    # a frozen module's __file__ is not on the filesystem
+    f = getattr(m, '__file__', '')
+    if f.endswith('.mpy'):
+        return 'mpy'
+    try:
+        os.stat(f)
+        return 'py'
+    except (OSError, TypeError, ValueError):
+        return 'frozen'
+
+
+def imp(name):
+    """Import module `name`, recording the time and whether it came from .py, .mpy or frozen."""
+    m = __import__(name)
+    lap('import %s (%s)' % (name, _kind(m)))
+    return m
+
+
+def elapsed_ms():
+    """ms since main.py started."""
+    return time.ticks_diff(time.ticks_us(), _t0) // 1000
+
+
+def show():
+    print('%-32s %8s %8s' % ('step', 'ms', 'at ms'))
+    print('%-32s %8d %8d' % ('before main.py', before_ms, before_ms))
+    at = 0
+    for name, us in steps:
+        at += us
+        print('%-32s %8.1f %8.1f' % (name, us / 1000, before_ms + at / 1000))
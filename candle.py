@@ -1,40 +1,197 @@
 # candle.py
-import uasyncio as asyncio
-import random
-from machine import Pin, PWM
+from array import array
+import time
+import flicker
+import curves
+import prng
 
+# Entries per flicker table; refilled in bulk when the ring wraps.
+TABLE_LEN = 32
 
 class Candle:
     MAX = 65535
+    SLEEP_MIN = 50
+    SLEEP_MAX = 150
+    FADE_IN_MS = 300
+    FADE_OUT_MS = 500
 
-    def __init__(self, pin, width=80, freq=5000):
+    def __init__(self, pin, width=80, freq=5000, engine=None, gamma=None, seed=None):
         self.pin = pin
-        self.width = width
+        self.gamma_set(gamma)
 
         self.current_duty = 0
-        self.task = None
-        self.led = PWM(Pin(pin), freq=freq)
-        self.led.duty_u16(0)
-
-        # Start the flicker loop immediately
-        #loop = asyncio.get_event_loop()
-        #self.task = loop.create_task(self._loop())
-    async def _loop(self):
-        while True:
-            base = int(self.MAX * (self.width / 100))
-            rng = int(self.MAX * (1-self.width / 100))
-            duty = max(0, min(self.MAX, base + random.randint(-rng, rng)))
-            self.current_duty = duty
-            self.led.duty_u16(duty)
-            await asyncio.sleep_ms(random.randint(50, 150))
+        self.enabled = False
+        # Brightness scale on top of the flicker, 256 = 100% (see timeline.py)
+        self.level = 256
+        # Fade multiplier applied after level, 0..256, stepped by the engine
+        self.fade = 0
+        # governor.py: output cap after gamma (256 = none) and flicker
+        # frame stretch (256 = normal, 512 = half as many frames)
+        self.limit = 256
+        self.slow = 256
+        self.fade_set()
+
+        # Flicker is driven by a shared FlickerEngine instead of a task per
+        # candle; duty writes go through the engine's PWMWriter.
+        self.engine = engine or flicker.get_engine()
+        self.out = self.engine.writer
+        self.ch = self.out.channel(pin, freq)
+        self.led = self.out.pwm(self.ch)
+        self._next = None
+        self._queued = False
+        self._due = 0
+        # sync.py: position in the group and the seed epoch being played
+        self._sync_id = 0
+        self._epoch = 0
+        self._epoch_end = 0
+        self._fnext = None
+        self._fading = False
+        self._f_from = 0
+        self._f_to = 0
+        self._f_t0 = 0
+        self._f_ms = 0
+
+        # Precomputed flicker frames, see width setter. Each candle has its
+        # own generator so its flicker can be replayed from `seed`.
+        self.rng = prng.XorShift16(prng.next_seed() if seed is None else seed)
+        self._duty = array('H', bytes(2 * TABLE_LEN))
+        self._sleep = array('H', bytes(2 * TABLE_LEN))
+        self._i = 0
+        self.width = width
+
+    @property
+    def width(self):
+        return self._width
+
+    @width.setter
+    def width(self, width):
+        # All float math happens here, once, instead of on every tick;
+        # integer widths (as set by the timeline) avoid it altogether.
+        # Checked before anything changes: a bad span would only fail at
+        # the next refill, inside the engine task every candle shares.
+        if not 0 <= width <= 100:
+            raise ValueError('width must be 0..100')
+        self._width = width
+        if isinstance(width, int):
+            base = self.MAX * width // 100
+            rng = self.MAX * (100 - width) // 100
+        else:
+            base = int(self.MAX * (width / 100))
+            rng = int(self.MAX * (1 - width / 100))
+        lo = max(0, base - rng)
+        hi = min(self.MAX, base + rng)
+        self._lo = lo
+        self._span = hi - lo + 1
+        self._refill()
+
+    def gamma_set(self, gamma=None):
+        # None picks curves.DEFAULT_GAMMA; tables are shared between candles
+        self.gamma = gamma
+        self._curve = curves.get(gamma)
+
+    def fade_set(self, fade_in_ms=None, fade_out_ms=None, curve='inout'):
+        # None keeps the class default; 0 switches instantly
+        self.fade_in_ms = self.FADE_IN_MS if fade_in_ms is None else fade_in_ms
+        self.fade_out_ms = self.FADE_OUT_MS if fade_out_ms is None else fade_out_ms
+        self._f_ease = curves.EASE[curves.EASE_NAMES.index(curve)]
+
+    def seed(self, x):
+        """Restart the flicker from PRNG state `x`."""
+        self.rng.seed(x)
+        self._refill()
+
+    def _refill(self):
+        self.rng.fill2(self._duty, self._lo, self._span,
+                       self._sleep, self.SLEEP_MIN, self.SLEEP_MAX - self.SLEEP_MIN + 1)
+        self._i = 0
+
+    def _skip(self):
+        # consume one frame without writing it (sync.py catching up)
+        i = self._i + 1
+        if i == TABLE_LEN:
+            self._refill()
+        else:
+            self._i = i
+
+    def _step(self):
+        """Write one flicker frame; returns ms until the next one."""
+        i = self._i
+        self.current_duty = self._duty[i]
+        self._emit()
+        delay = self._sleep[i] * self.slow >> 8
+        i += 1
+        if i == TABLE_LEN:
+            self._refill()
+        else:
+            self._i = i
+        return delay
+
+    def _emit(self):
+        duty = (self.current_duty * self.level >> 8) * self.fade >> 8
+        self.out.stage(self.ch, self._curve[duty >> curves.SHIFT] * self.limit >> 8)
+
+    def _fade_to(self, target, ms):
+        # Restarting from the current value makes a reversal seamless; the
+        # candle is linked into the engine's fade list at most once.
+        self._f_from = self.fade
+        self._f_to = target
+        self._f_t0 = time.ticks_ms()
+        self._f_ms = ms
+        self.engine.fade(self)
+
+    def _fade_step(self, now):
+        """Advance the fade to `now`; returns True once it is finished."""
+        t = time.ticks_diff(now, self._f_t0)
+        if t >= self._f_ms:
+            self.fade = self._f_to
+            if not self.fade:
+                self.enabled = False
+                self.out.stage(self.ch, 0)
+                return True
+            self._emit()
+            return True
+        f0 = self._f_from
+        self.fade = f0 + (self._f_to - f0) * self._f_ease[t * 256 // self._f_ms] // 256
+        self._emit()
+        return False
+
+    def _fade_cancel(self, value):
+        # Jump straight to `value`; a pending fade finishes there on the
+        # engine's next tick instead of being unlinked here.
+        self.fade = self._f_to = value
+        self._f_t0 = time.ticks_ms()
+        self._f_ms = 0
 
     # --- REPL-friendly methods ---
-    def on(self):
+    @property
+    def is_on(self):
+        # lit or fading in; a candle fading out already counts as off
+        return self.enabled and self._f_to != 0
+
+    def on(self, fade_ms=None):
+        ms = self.fade_in_ms if fade_ms is None else fade_ms
+        if not self.enabled:
+            self.fade = self._f_to = 0
         self.enabled = True
-        self.task=asyncio.create_task(self._loop())
-    def off(self):
-        self.enabled = False
-        if self.task is not None:
-            self.task.cancel()
-        self.led.duty_u16(0)
+        self.engine.add(self)
+        if not ms:
+            self._fade_cancel(256)
+        elif self._f_to != 256:
+            self._fade_to(256, ms)
+    def off(self, fade_ms=None):
+        ms = self.fade_out_ms if fade_ms is None else fade_ms
+        if not self.enabled or not ms:
+            self.enabled = False
+            self._fade_cancel(0)
+            self.out.write(self.ch, 0)
+        elif self._f_to:
+            self._fade_to(0, ms)
 
+    def deinit(self):
+        """Switch off now and give the output channel back to the writer."""
+        self.off(0)
+        # a disabled candle leaves the wheel untouched, but a fade would
+        # still write its last step to the channel
+        self.engine.unfade(self)
+        self.out.release(self.ch)
+        self.led = None
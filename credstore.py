@@ -0,0 +1,168 @@
+# credstore.py
+import os
+import ujson
+
+
+class CredentialStore:
+    """Saved WiFi networks, loaded once and kept in memory.
+
+    The file keeps the original wifi.json layout,
+        {"networks": [{"ssid": ..., "password": ...}, ...], "last": {...}}
+    and entries may carry optional metadata: "rssi" (last seen), "ok"
+    (time.time() of the last successful connect) and "priority" (higher
+    first). An SSID index avoids list scans. save() only writes when
+    something changed, via a temp file and rename so a reset mid-write
+    cannot leave a truncated file behind; load() picks up the temp file
+    if a reset on FAT came between removing the old file and the rename.
+    """
+
+    def __init__(self, path='wifi.json'):
+        self.path = path
+        self._cfg = None
+        self._index = {}
+        self._sig = None
+        self._dirty = False
+        # bumped on every load or change; lets callers cache derived data
+        self.gen = 0
+
+    def _stat(self):
+        # size and mtime, enough to notice the file edited behind our back
+        try:
+            st = os.stat(self.path)
+            return (st[6], st[8])
+        except OSError:
+            return None
+
+    def _read(self, path):
+        try:
+            with open(path, 'r') as f:
+                return ujson.load(f)
+        except Exception:
+            return None
+
+    def load(self):
+        cfg = self._read(self.path)
+        if cfg is None and self._stat() is None:
+            # A reset between save()'s remove and rename on FAT leaves
+            # only the complete temp file; finish the rename
+            tmp = self.path + '.tmp'
+            cfg = self._read(tmp)
+            if cfg is not None:
+                try:
+                    os.rename(tmp, self.path)
+                except OSError:
+                    pass
+        if not isinstance(cfg, dict) or not isinstance(cfg.get('networks'), list):
+            cfg = {'networks': []}
+        self._cfg = cfg
+        self._index = {}
+        for n in cfg['networks']:
+            self._index[n.get('ssid')] = n
+        self._sig = self._stat()
+        self._dirty = False
+        self.gen += 1
+
+    def _ensure(self):
+        if self._cfg is None:
+            self.load()
+        return self._cfg
+
+    def refresh(self):
+        """Reload if the file changed on disk since it was read or written."""
+        if self._cfg is None or self._stat() != self._sig:
+            self.load()
+
+    def save(self):
+        if not self._dirty:
+            return False
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            ujson.dump(self._cfg, f)
+        try:
+            os.rename(tmp, self.path)
+        except OSError:
+            # FAT will not rename over an existing file
+            os.remove(self.path)
+            os.rename(tmp, self.path)
+        self._sig = self._stat()
+        self._dirty = False
+        return True
+
+    def _changed(self):
+        self._dirty = True
+        self.gen += 1
+
+    # --- Networks ---
+    def networks(self):
+        return self._ensure()['networks']
+
+    def get(self, ssid):
+        self._ensure()
+        return self._index.get(ssid)
+
+    def put(self, ssid, password):
+        self._ensure()
+        n = self._index.get(ssid)
+        if n is None:
+            n = {'ssid': ssid, 'password': password}
+            self._cfg['networks'].append(n)
+            self._index[ssid] = n
+        elif n.get('password') == password:
+            return
+        else:
+            n['password'] = password
+        self._changed()
+
+    def note(self, ssid, **meta):
+        """Update metadata (rssi, ok, priority) of a saved network."""
+        n = self.get(ssid)
+        if n is None:
+            return
+        for k, v in meta.items():
+            if n.get(k) != v:
+                n[k] = v
+                self._changed()
+
+    def connected(self, ssid, when, rssi=None):
+        """Note a successful connect to `ssid` at `when`.
+
+        "ok" only breaks ties in ordered(), so it is written out only when
+        `ssid` was not already the latest network to connect; otherwise,
+        like "rssi", it is kept in memory and a routine reconnect does not
+        rewrite the file."""
+        n = self.get(ssid)
+        if n is None:
+            return
+        latest = None
+        for m in self._cfg['networks']:
+            if 'ok' in m and (latest is None or m['ok'] > latest['ok']):
+                latest = m
+        if rssi is not None:
+            n['rssi'] = rssi
+        n['ok'] = when
+        if latest is not n:
+            self._changed()
+
+    def ordered(self, seen):
+        """Saved networks present in `seen` ({ssid: rssi}), best first.
+
+        Higher priority wins, then stronger signal, then the most recent
+        success."""
+        out = []
+        for n in self.networks():
+            rssi = seen.get(n.get('ssid'))
+            if rssi is not None:
+                out.append((n.get('priority', 0), rssi, n.get('ok', 0), n))
+        out.sort(key=lambda x: (x[0], x[1], x[2]), reverse=True)
+        return [x[3] for x in out]
+
+    # --- Last good AP ---
+    @property
+    def last(self):
+        return self._ensure().get('last') or {}
+
+    @last.setter
+    def last(self, value):
+        if self._ensure().get('last') != value:
+            self._cfg['last'] = value
+            self._changed()
@@ -0,0 +1,53 @@
+# curves.py
+from array import array
+
+# duty_u16 >> SHIFT indexes a table of SIZE output duties
+SIZE = 256
+SHIFT = 8
+MAX = 65535
+
+DEFAULT_GAMMA = 2.2
+
+_cache = {}
+
+
+def reference(i, gamma):
+    return int(MAX * (i / (SIZE - 1)) ** gamma + 0.5)
+
+
+def get(gamma=None):
+    """Shared lookup table mapping perceptual level to duty_u16; 1.0 is linear."""
+    if gamma is None:
+        gamma = DEFAULT_GAMMA
+    t = _cache.get(gamma)
+    if t is None:
+        t = array('H', bytes(2 * SIZE))
+        for i in range(SIZE):
+            t[i] = reference(i, gamma)
+        _cache[gamma] = t
+    return t
+
+
+# Easing curves as 257-entry tables: progress 0..256 in, 0..256 out
+EASE_NAMES = ('linear', 'in', 'out', 'inout', 'step')
+
+
+def _ease_table(kind):
+    t = array('H', bytes(2 * 257))
+    for i in range(257):
+        x = i / 256
+        if kind == 1:
+            y = x * x
+        elif kind == 2:
+            y = 1 - (1 - x) * (1 - x)
+        elif kind == 3:
+            y = x * x * (3 - 2 * x)
+        elif kind == 4:
+            y = 1 if i == 256 else 0
+        else:
+            y = x
+        t[i] = int(y * 256 + 0.5)
+    return t
+
+
+EASE = [_ease_table(k) for k in range(len(EASE_NAMES))]
@@ -0,0 +1,204 @@
+# flicker.py
+import uasyncio as asyncio
+import time
+import pwm_out
+
+
+class FlickerEngine:
+    """One asyncio task that drives every lit Candle.
+
+    Candles are parked on a timing wheel of `slots` buckets spaced
+    `tick_ms` apart. Each bucket is a linked list threaded through
+    Candle._next, so (re)scheduling a candle never allocates. The task
+    sleeps until the next occupied bucket and services only the candles
+    found there, then flushes their duty writes together through `writer`.
+
+    Candles fading in or out sit on a second list (Candle._fnext); while
+    it is non-empty the task wakes every tick and steps all of them
+    together, in the same pass and flush as the flicker.
+    """
+
+    def __init__(self, tick_ms=20, slots=16, writer=None):
+        self.writer = writer or pwm_out.get_writer()
+        self.tick_ms = tick_ms
+        self.slots = slots
+        self._wheel = [None] * slots
+        self._pos = 0        # next bucket to service
+        self._pos_t = 0      # ticks_ms at which bucket _pos is due
+        self._wake_pos = 0   # bucket the task will service on its next wakeup
+        self._count = 0      # candles currently linked into the wheel
+        self._fades = None   # head of the list of candles mid-fade
+        self._task = None
+        # probe.Probe while one is running; times each candle step
+        self.probe = None
+        # sync.FlickerSync while this node plays a shared flicker; candle
+        # due times are then on the group's clock, `offset` ms ahead of ours
+        self.sync = None
+        self.offset = 0
+
+        # Stats, readable from the REPL
+        self.wakeups = 0
+        self.serviced = 0
+        self.busy_us = 0
+
+    def add(self, candle):
+        if candle._queued:
+            return
+        candle._queued = True
+        self._count += 1
+        if self._task is None:
+            self._pos_t = time.ticks_ms()
+            self._wake_pos = self._pos
+        # Join whatever bucket the task wakes for next so on() is never
+        # delayed past the current sleep.
+        if self.sync is None:
+            candle._due = time.ticks_add(self._pos_t, self.offset)
+        else:
+            self.sync.place(candle, time.ticks_add(self._pos_t, self.offset))
+        candle._next = self._wheel[self._wake_pos]
+        self._wheel[self._wake_pos] = candle
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def fade(self, candle):
+        if candle._fading:
+            return
+        candle._fading = True
+        candle._fnext = self._fades
+        self._fades = candle
+
+    def unfade(self, candle):
+        """Drop `candle` from the fade list without a final step."""
+        if not candle._fading:
+            return
+        prev = None
+        c = self._fades
+        while c is not candle:
+            prev = c
+            c = c._fnext
+        if prev is None:
+            self._fades = c._fnext
+        else:
+            prev._fnext = c._fnext
+        c._fnext = None
+        c._fading = False
+
+    def reset_stats(self):
+        self.wakeups = 0
+        self.serviced = 0
+        self.busy_us = 0
+
+    def _link(self, candle, delay_ms):
+        n = (delay_ms + self.tick_ms - 1) // self.tick_ms
+        if n < 1:
+            n = 1
+        elif n >= self.slots:
+            n = self.slots - 1
+        i = (self._pos + n) % self.slots
+        candle._next = self._wheel[i]
+        self._wheel[i] = candle
+
+    def _service(self):
+        wheel = self._wheel
+        slot_t = time.ticks_add(self._pos_t, self.offset)
+        probe = self.probe
+        sync = self.sync
+        c = wheel[self._pos]
+        wheel[self._pos] = None
+        while c is not None:
+            nxt = c._next
+            c._next = None
+            if not c.enabled:
+                # off() only clears the flag; the candle drops out here.
+                c._queued = False
+                self._count -= 1
+            else:
+                wait = time.ticks_diff(c._due, slot_t)
+                if wait >= self.tick_ms:
+                    # Parked beyond the wheel horizon, go round again.
+                    self._link(c, wait)
+                else:
+                    self.serviced += 1
+                    if probe is None:
+                        delay = c._step()
+                    else:
+                        t = time.ticks_us()
+                        delay = c._step()
+                        probe.step_done(time.ticks_diff(time.ticks_us(), t))
+                    if sync is None:
+                        c._due = time.ticks_add(slot_t, delay)
+                    else:
+                        # Keep the exact schedule rather than rounding to
+                        # ticks, so every node reaches the same frames.
+                        c._due = time.ticks_add(c._due, delay)
+                        if time.ticks_diff(c._due, c._epoch_end) >= 0:
+                            sync.rekey(c, c._epoch + 1)
+                        delay = time.ticks_diff(c._due, slot_t)
+                    self._link(c, delay)
+            c = nxt
+
+    def _fade_all(self, now):
+        prev = None
+        c = self._fades
+        while c is not None:
+            nxt = c._fnext
+            if c._fade_step(now):
+                c._fading = False
+                c._fnext = None
+                if prev is None:
+                    self._fades = nxt
+                else:
+                    prev._fnext = nxt
+            else:
+                prev = c
+            c = nxt
+
+    async def _run(self):
+        wheel = self._wheel
+        slots = self.slots
+        tick = self.tick_ms
+        try:
+            while self._count or self._fades is not None:
+                now = time.ticks_ms()
+                t0 = time.ticks_us()
+                self.wakeups += 1
+                n = 0
+                while n < slots and time.ticks_diff(now, self._pos_t) >= 0:
+                    self._service()
+                    self._pos = (self._pos + 1) % slots
+                    self._pos_t = time.ticks_add(self._pos_t, tick)
+                    n += 1
+                if n == slots:
+                    # A whole revolution behind (e.g. blocking REPL call), resync.
+                    self._pos_t = now
+                if self._fades is not None:
+                    self._fade_all(now)
+                self.writer.flush()
+                if not self._count and self._fades is None:
+                    break
+
+                # Skip empty buckets, then sleep until the next occupied one.
+                i = self._pos
+                skip = 0
+                # Fades need every tick; otherwise skip to the next occupied bucket.
+                while self._fades is None and wheel[i] is None and skip < slots - 1:
+                    i = (i + 1) % slots
+                    skip += 1
+                self._wake_pos = i
+                # Masked so the counter stays a small int (no heap allocation).
+                self.busy_us = (self.busy_us + time.ticks_diff(time.ticks_us(), t0)) & 0x3FFFFFFF
+
+                wait = time.ticks_diff(time.ticks_add(self._pos_t, skip * tick), time.ticks_ms())
+                await asyncio.sleep_ms(wait if wait > 0 else 0)
+        finally:
+            self._task = None
+
+
+_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = FlickerEngine()
+    return _engine
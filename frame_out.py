@@ -0,0 +1,81 @@
+# frame_out.py
+from machine import Pin
+from pwm_out import MAX, Writer
+
+# bytes per channel for each frame format
+FORMATS = {'u8': 1, 'u16': 2, 'grb': 3, 'rgb': 3}
+
+
+class NeoPixelSink:
+    """WS2812-style strip on `pin`: the whole frame in one machine.bitstream().
+
+    Same timings as neopixel.NeoPixel; `timing=0` is the 400 kHz parts."""
+
+    def __init__(self, pin, timing=1):
+        from machine import bitstream
+        self._bitstream = bitstream
+        self.pin = Pin(pin, Pin.OUT)
+        self.timing = (400, 850, 800, 450) if timing else (800, 1700, 1600, 900)
+
+    def show(self, frame):
+        self._bitstream(self.pin, 0, self.timing, frame)
+
+
+class FrameWriter(Writer):
+    """Output layer that renders every channel into one frame per flush.
+
+    For addressable strips and driver chips that take all their channels
+    in one transfer. Channel i occupies bytes i * size .. (i + 1) * size
+    of a preallocated frame, in `fmt`:
+
+        'u8'    top byte of the duty (8-bit PWM driver chips)
+        'u16'   the duty, big-endian (16-bit drivers)
+        'grb'   one pixel, `color` scaled by the duty (WS2812)
+        'rgb'   the same in RGB order (APA106 and friends)
+
+    stage() only records duties, as with any pwm_out.Writer. flush()
+    encodes the changed channels into the frame and, if any changed,
+    passes `sink` a memoryview of it in one show() call: NeoPixelSink, a
+    driver chip's bus, or a capture on the host. Channels are numbered by
+    position, so a candle's pin is its index in the frame.
+
+    Plain shift registers (74HC595) cannot dim: a frame byte per channel
+    would only show that byte's bits on eight outputs. Drive them with
+    bam_out.BAMWriter instead.
+    """
+
+    def __init__(self, sink, channels, fmt='u8', color=(255, 120, 24), deadband=0):
+        super().__init__(channels, deadband)
+        self.sink = sink
+        self.channels = channels
+        self.fmt = fmt
+        self.size = FORMATS[fmt]
+        self._buf = bytearray(channels * self.size)
+        self.frame = memoryview(self._buf)
+        r, g, b = color
+        self._color = bytes((g, r, b) if fmt == 'grb' else (r, g, b))
+        self.frames = 0
+
+    def _out(self, ch, duty):
+        buf = self._buf
+        size = self.size
+        j = ch * size
+        if size == 1:
+            buf[j] = duty >> 8
+        elif size == 2:
+            buf[j] = duty >> 8
+            buf[j + 1] = duty & 0xFF
+        else:
+            color = self._color
+            buf[j] = color[0] * duty // MAX
+            buf[j + 1] = color[1] * duty // MAX
+            buf[j + 2] = color[2] * duty // MAX
+        return True
+
+    def _show(self):
+        self.sink.show(self.frame)
+        self.frames = (self.frames + 1) & 0x3FFFFFFF
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.frames = 0
@@ -0,0 +1,187 @@
+# governor.py
+import time
+import uasyncio as asyncio
+import flicker
+
+FULL = 256      # Candle.limit / Candle.slow for no throttling
+POLICIES = ('shamash_last', 'shamash_first', 'equal')
+
+
+def _cut(raw, keep, tiers, excess, floor):
+    # Take `excess` off the candles' `raw` values, tier by tier, never
+    # leaving one below `floor` (of FULL) of its raw value. Sets the
+    # factor (of FULL) for each candle in `keep`, returns what could not
+    # be cut.
+    for i in range(len(keep)):
+        keep[i] = FULL
+    for tier in tiers:
+        if excess <= 0:
+            break
+        total = 0
+        for i in tier:
+            total += raw[i]
+        if not total:
+            continue
+        cut = total * (FULL - floor) // FULL
+        if cut > excess:
+            cut = excess
+        f = FULL - cut * FULL // total
+        for i in tier:
+            keep[i] = f
+        excess -= cut
+    return excess
+
+
+class Governor:
+    """Keeps the menorah inside a current and a flicker-rate budget.
+
+    Every `period_ms` it estimates the LED current from the duty each
+    candle is actually driving (`ma_full` mA for a candle at full duty,
+    smoothed over a few periods) and measures candle steps per second
+    from the FlickerEngine. Over `max_ma` it caps candles' output
+    (Candle.limit, applied after gamma); when the lit candles' frames
+    would exceed `max_steps` per second it stretches them (Candle.slow).
+    Both are taken from candles in the order `policy` gives: 'shamash_last' throttles candles 1-8
+    before the Shamash, 'shamash_first' the reverse, 'equal' all alike.
+    No candle is capped below `floor` or slowed past `max_slow` (both in
+    1/256ths); a budget that cannot be met then shows in `over_ms`.
+    Throttling eases off by `recover` per period once there is room.
+
+    Frames are not stretched while sync.py is playing a shared flicker,
+    since every node has to step the same frames.
+    """
+
+    def __init__(self, candles, engine=None, max_ma=None, max_steps=None, ma_full=20,
+                 policy='shamash_last', floor=32, max_slow=1024, recover=16, period_ms=100):
+        if policy not in POLICIES:
+            raise ValueError('policy must be one of %s' % (POLICIES,))
+        self.candles = candles
+        self.engine = engine or flicker.get_engine()
+        self.max_ma = max_ma
+        self.max_steps = max_steps
+        self.ma_full = ma_full
+        self.policy = policy
+        self.floor = floor
+        self.max_slow = max_slow
+        self.recover = recover
+        self.period_ms = period_ms
+        n = len(candles)
+        rest = list(range(1, n))
+        if policy == 'shamash_last':
+            self._tiers = (rest, [0])
+        elif policy == 'shamash_first':
+            self._tiers = ([0], rest)
+        else:
+            self._tiers = (list(range(n)),)
+        self._duty = [0] * n    # smoothed output duty per candle
+        self._raw = [0] * n
+        self._steps = 0
+        self._keep = [0] * n
+        self._task = None
+
+        # Readings and totals, ms
+        self.ma = 0             # estimated current
+        self.steps = 0          # candle steps per second
+        self.dim_ms = 0         # time with any candle capped
+        self.slow_ms = 0        # time with any candle's frames stretched
+        self.over_ms = 0        # time a budget was still exceeded
+
+    @property
+    def enabled(self):
+        return self._task is not None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for c in self.candles:
+            c.limit = FULL
+            c.slow = FULL
+
+    def reset(self):
+        self.dim_ms = self.slow_ms = self.over_ms = 0
+
+    # --- Control ---
+    def _power(self):
+        # raw: what each candle would draw without its cap, in 1/256 mA
+        raw = self._raw
+        total = 0
+        for i, c in enumerate(self.candles):
+            d = c.out.last(c.ch) if c.enabled else 0
+            self._duty[i] += (d - self._duty[i]) >> 3
+            total += self._duty[i]
+            raw[i] = (self._duty[i] * self.ma_full >> 8) * FULL // (c.limit or 1)
+        self.ma = total * self.ma_full // 65535
+        if self.max_ma is None:
+            return False
+        left = _cut(raw, self._keep, self._tiers, sum(raw) - self.max_ma * FULL, self.floor)
+        self._apply(self._keep, 'limit', -1)
+        return left > 0
+
+    def _rate(self, steps):
+        # measured rate, smoothed; 1/256 steps/s
+        self._steps += (steps * FULL - self._steps) >> 3
+        self.steps = self._steps >> 8
+        if self.max_steps is None or self.engine.sync is not None:
+            return False
+        # Size the stretch from each lit candle's mean frame length rather
+        # than the measured rate, which lags a change of `slow` by a frame
+        # and would be cut again for it.
+        raw = self._raw
+        for i, c in enumerate(self.candles):
+            raw[i] = 512000 // (c.SLEEP_MIN + c.SLEEP_MAX) if c.enabled else 0
+        keep = self._keep
+        left = _cut(raw, keep, self._tiers, sum(raw) - self.max_steps * FULL,
+                    FULL * FULL // self.max_slow)
+        # a rate kept at k/256 means frames stretched by 256/k
+        for i in range(len(keep)):
+            keep[i] = FULL * FULL // (keep[i] or 1)
+        self._apply(keep, 'slow', 1)
+        return left > 0
+
+    def _apply(self, want, attr, sign):
+        # cut at once, ease back by `recover` per period
+        step = self.recover
+        for i, c in enumerate(self.candles):
+            cur = getattr(c, attr)
+            w = want[i]
+            if (w - cur) * sign > 0:
+                setattr(c, attr, w)
+            elif cur != w:
+                setattr(c, attr, max(w, cur - step) if sign > 0 else min(w, cur + step))
+
+    async def _run(self):
+        e = self.engine
+        period = self.period_ms
+        last = time.ticks_ms()
+        served = e.serviced
+        while True:
+            await asyncio.sleep_ms(period)
+            now = time.ticks_ms()
+            dt = time.ticks_diff(now, last) or 1
+            steps = max(0, e.serviced - served) * 1000 // dt
+            last = now
+            served = e.serviced
+            over = self._power()
+            over = self._rate(steps) or over
+            if any(c.limit < FULL for c in self.candles):
+                self.dim_ms += dt
+            if any(c.slow > FULL for c in self.candles):
+                self.slow_ms += dt
+            if over:
+                self.over_ms += dt
+
+    # --- REPL ---
+    def summary(self):
+        return ('%d mA (budget %s), %d steps/s (budget %s), limit %s, slow %s; '
+                'dimmed %d ms, slowed %d ms, over budget %d ms') % (
+            self.ma, self.max_ma, self.steps, self.max_steps,
+            [c.limit for c in self.candles], [c.slow for c in self.candles],
+            self.dim_ms, self.slow_ms, self.over_ms)
+
+    def show(self):
+        print(self.summary())
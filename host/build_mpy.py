@@ -0,0 +1,88 @@
+# build_mpy.py -- precompile the device modules to .mpy and deploy them.
+#
+#   python host/build_mpy.py [-o build/mpy] [--deploy] [--port PORT]
+#
+# Compiles every module listed in manifest.py with mpy-cross, which must
+# match the firmware's MicroPython version (pip install mpy-cross==1.26.*
+# or a binary on PATH). -march=xtensawin keeps the native and viper code
+# paths. Loading bytecode skips parsing and compiling on the board,
+# which is most of an import's time and heap.
+#
+# --deploy copies the .mpy files with mpremote and removes the .py files
+# of the same name from the board: when both exist the .py is imported.
+# main.py is left alone; the firmware runs it as source. hanukkah.bin,
+# the night table schedule.py reads, is copied along with them.
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def modules():
+    names = []
+    env = {
+        'include': lambda path: None,
+        'module': lambda path, base_path='.', opt=None: names.append(path[:-3]),
+    }
+    with open(os.path.join(ROOT, 'manifest.py')) as f:
+        exec(f.read(), env)
+    return names
+
+
+def mpy_cross():
+    exe = shutil.which('mpy-cross')
+    if exe:
+        return [exe]
+    try:
+        import mpy_cross  # noqa: F401
+    except ImportError:
+        sys.exit('mpy-cross not found: pip install mpy-cross matching the firmware version')
+    return [sys.executable, '-m', 'mpy_cross']
+
+
+def build(out, march):
+    os.makedirs(out, exist_ok=True)
+    cross = mpy_cross()
+    built = []
+    for name in modules():
+        dst = os.path.join(out, name + '.mpy')
+        subprocess.check_call(cross + ['-march=' + march, '-o', dst, name + '.py'], cwd=ROOT)
+        built.append(dst)
+        print('%-16s %6d -> %6d bytes' % (name, os.path.getsize(os.path.join(ROOT, name + '.py')),
+                                          os.path.getsize(dst)))
+    return built
+
+
+def deploy(built, port):
+    cmd = ['mpremote']
+    if port:
+        cmd += ['connect', port]
+    names = []
+    for path in built:
+        name = os.path.basename(path)
+        cmd += ['cp', path, ':' + name, '+']
+        names.append(name[:-4] + '.py')
+    table = os.path.join(ROOT, 'hanukkah.bin')
+    if os.path.exists(table):
+        cmd += ['cp', table, ':hanukkah.bin', '+']
+    cmd += ['exec', 'import os\nfor f in %r:\n try: os.remove(f)\n except OSError: pass' % names]
+    subprocess.check_call(cmd)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-o', '--out', default=os.path.join(ROOT, 'build', 'mpy'))
+    ap.add_argument('--march', default='xtensawin')
+    ap.add_argument('--deploy', action='store_true')
+    ap.add_argument('--port')
+    args = ap.parse_args()
+    built = build(args.out, args.march)
+    if args.deploy:
+        deploy(built, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+# duty_trace.py -- per-channel duty traces: record, save, load, compare, replay
+# and per-candle statistics.
+#
+# A trace is every duty write in order as (t_ms, channel, duty). On disk
+# it is either CSV ("t_ms,channel,duty" per line) or binary: a header
+# '<4sBB' (b'MTRC', version 1, channels) then one '<IBH' record of
+# t_ms, channel and duty per write, 7 bytes each. The extension picks.
+import cmath
+import math
+import struct
+from array import array
+
+MAGIC = b'MTRC'
+_HEAD = '<4sBB'
+_REC = '<IBH'
+_HEAD_SIZE = struct.calcsize(_HEAD)
+_REC_SIZE = struct.calcsize(_REC)
+MAX = 65535
+
+# Spectrum bands reported by stats(), Hz
+BANDS = ((0.1, 1), (1, 3), (3, 8), (8, 20), (20, 50))
+
+
+class Trace:
+    def __init__(self, channels):
+        self.channels = channels
+        self.t = array('L')
+        self.ch = array('B')
+        self.duty = array('H')
+
+    def __len__(self):
+        return len(self.t)
+
+    def add(self, t_ms, ch, duty):
+        self.t.append(t_ms)
+        self.ch.append(ch)
+        self.duty.append(duty)
+
+    @property
+    def duration_ms(self):
+        return self.t[-1] if self.t else 0
+
+    def save(self, path):
+        if path.endswith('.csv'):
+            with open(path, 'w') as f:
+                f.write('t_ms,channel,duty\n')
+                for k in range(len(self.t)):
+                    f.write('%d,%d,%d\n' % (self.t[k], self.ch[k], self.duty[k]))
+            return
+        buf = bytearray(_HEAD_SIZE + _REC_SIZE * len(self.t))
+        struct.pack_into(_HEAD, buf, 0, MAGIC, 1, self.channels)
+        j = _HEAD_SIZE
+        for k in range(len(self.t)):
+            struct.pack_into(_REC, buf, j, self.t[k], self.ch[k], self.duty[k])
+            j += _REC_SIZE
+        with open(path, 'wb') as f:
+            f.write(buf)
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith('.csv'):
+            rows = []
+            with open(path) as f:
+                next(f)
+                for line in f:
+                    rows.append([int(v) for v in line.split(',')])
+            tr = cls(max(r[1] for r in rows) + 1 if rows else 0)
+            for t, ch, duty in rows:
+                tr.add(t, ch, duty)
+            return tr
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, channels = struct.unpack_from(_HEAD, data)
+        if magic != MAGIC or version != 1:
+            raise ValueError('%s is not a version 1 trace' % path)
+        tr = cls(channels)
+        for t, ch, duty in struct.iter_unpack(_REC, memoryview(data)[_HEAD_SIZE:]):
+            tr.add(t, ch, duty)
+        return tr
+
+    def diff(self, other):
+        """Index of the first write that differs from `other`'s, None if identical."""
+        n = min(len(self), len(other))
+        for k in range(n):
+            if (self.t[k] != other.t[k] or self.ch[k] != other.ch[k]
+                    or self.duty[k] != other.duty[k]):
+                return k
+        return None if len(self) == len(other) else n
+
+    def channel(self, ch):
+        """(times, duties) of one channel's writes."""
+        t = array('L')
+        d = array('H')
+        for k in range(len(self.t)):
+            if self.ch[k] == ch:
+                t.append(self.t[k])
+                d.append(self.duty[k])
+        return t, d
+
+
+class Recorder:
+    """Appends every stub PWM write on `pins` to a Trace, stamped with ticks_ms."""
+
+    def __init__(self, pins):
+        import time
+        from machine import PWM
+        self._ticks_ms = time.ticks_ms
+        self._index = {p: i for i, p in enumerate(pins)}
+        self.trace = Trace(len(pins))
+        self._pwm = PWM
+        PWM.on_write = self._write
+
+    def _write(self, pwm, duty):
+        ch = self._index.get(pwm.pin.id)
+        if ch is not None:
+            self.trace.add(self._ticks_ms(), ch, duty)
+
+    def stop(self):
+        self._pwm.on_write = None
+        return self.trace
+
+
+def replay(trace, pins, clock=None):
+    """Push `trace` into stub PWMs on `pins`, in order.
+
+    With a vclock.Clock the clock is moved to each write's time first,
+    so stub logs and on_write hooks see the original timing. Returns the
+    PWM objects."""
+    from machine import Pin, PWM
+    pwms = [PWM(Pin(p)) for p in pins]
+    for k in range(len(trace.t)):
+        if clock is not None:
+            clock.us = trace.t[k] * 1000
+        pwms[trace.ch[k]].duty_u16(trace.duty[k])
+    return pwms
+
+
+# --- Statistics ---
+def _fft(x):
+    n = len(x)
+    if n == 1:
+        return x
+    even = _fft(x[0::2])
+    odd = _fft(x[1::2])
+    out = [0] * n
+    for k in range(n // 2):
+        w = cmath.exp(-2j * math.pi * k / n) * odd[k]
+        out[k] = even[k] + w
+        out[k + n // 2] = even[k] - w
+    return out
+
+
+def _resample(t, d, end_ms, step_ms):
+    # duty held from each write to the next, sampled every step_ms
+    out = []
+    k = 0
+    v = 0
+    s = 0
+    while s < end_ms:
+        while k < len(t) and t[k] <= s:
+            v = d[k]
+            k += 1
+        out.append(v / MAX)
+        s += step_ms
+    return out
+
+
+def spectrum(samples, rate, seg=256, max_segments=32):
+    """Welch power spectrum of `samples`: (bin width Hz, power per bin)."""
+    if len(samples) < seg:
+        return rate / seg, []
+    win = [0.5 - 0.5 * math.cos(2 * math.pi * i / seg) for i in range(seg)]
+    starts = range(0, len(samples) - seg + 1, seg // 2)
+    if len(starts) > max_segments:
+        # spread the segments over the whole trace
+        stride = len(starts) / max_segments
+        starts = [starts[int(i * stride)] for i in range(max_segments)]
+    power = [0.0] * (seg // 2)
+    for s in starts:
+        x = samples[s:s + seg]
+        mean = sum(x) / seg
+        f = _fft([(v - mean) * w for v, w in zip(x, win)])
+        for k in range(seg // 2):
+            power[k] += abs(f[k]) ** 2
+    n = len(starts)
+    return rate / seg, [p / n for p in power]
+
+
+def stats(trace, end_ms=None, rate=100):
+    """Per channel: mean and range of brightness (duty / MAX), writes per
+    second, the strongest flicker frequency and the share of flicker
+    power in each of BANDS."""
+    end_ms = end_ms or trace.duration_ms or 1
+    out = []
+    for ch in range(trace.channels):
+        t, d = trace.channel(ch)
+        # time-weighted mean of the held duty
+        area = 0
+        for k in range(len(t)):
+            nxt = t[k + 1] if k + 1 < len(t) else end_ms
+            area += d[k] * (min(nxt, end_ms) - t[k])
+        samples = _resample(t, d, end_ms, 1000 // rate)
+        width, power = spectrum(samples, rate)
+        total = sum(power[1:]) or 1
+        peak = max(range(1, len(power)), key=lambda k: power[k]) if len(power) > 1 else 0
+        bands = []
+        for lo, hi in BANDS:
+            bands.append(sum(p for k, p in enumerate(power) if lo <= k * width < hi) / total)
+        out.append({
+            'channel': ch,
+            'mean': area / end_ms / MAX,
+            'min': min(d) / MAX if d else 0,
+            'max': max(d) / MAX if d else 0,
+            'writes_per_s': len(t) * 1000 / end_ms,
+            'peak_hz': peak * width,
+            'bands': bands,
+        })
+    return out
+
+
+def show_stats(rows):
+    print('%3s %6s %6s %6s %9s %8s  %s' % (
+        'ch', 'mean', 'min', 'max', 'writes/s', 'peak Hz',
+        ' '.join('%9s' % ('%g-%g' % b) for b in BANDS)))
+    for r in rows:
+        print('%3d %6.3f %6.3f %6.3f %9.1f %8.2f  %s' % (
+            r['channel'], r['mean'], r['min'], r['max'], r['writes_per_s'], r['peak_hz'],
+            ' '.join('%8.0f%%' % (b * 100) for b in r['bands'])))
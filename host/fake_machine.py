@@ -0,0 +1,103 @@
+# fake_machine.py -- host stand-in for the parts of `machine` we use.
+import time
+
+
+class Pin:
+    OUT = 1
+    IN = 0
+
+    def __init__(self, id, *args, **kwargs):
+        self.id = id
+        self._value = 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = v
+
+
+class PWM:
+    # Class-wide switches so a benchmark can watch every channel:
+    #   record   -- keep (ticks_us, duty) for every write in .log
+    #   on_write -- called as on_write(pwm, duty) after every write
+    record = False
+    on_write = None
+
+    def __init__(self, pin, freq=5000, duty_u16=0):
+        self.pin = pin
+        self.freq = freq
+        self._duty = duty_u16
+        self.writes = 0
+        self.log = []
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+        self.writes += 1
+        if PWM.record:
+            self.log.append((time.ticks_us(), value))
+        if PWM.on_write is not None:
+            PWM.on_write(self, value)
+
+    def deinit(self):
+        pass
+
+
+class Timer:
+    # Never fires by itself; a benchmark calls .callback(timer) to tick.
+    PERIODIC = 1
+    ONE_SHOT = 0
+
+    def __init__(self, id, **kwargs):
+        self.id = id
+        self.callback = None
+        self.freq = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None):
+        self.mode = mode
+        self.freq = freq if freq > 0 else 1000 // period if period > 0 else 0
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+
+class SPI:
+    def __init__(self, id, baudrate=1000000, **kwargs):
+        self.id = id
+        self.baudrate = baudrate
+        self.writes = 0
+        self.bytes = 0
+        self.last = b''
+
+    def write(self, buf):
+        self.writes += 1
+        self.bytes += len(buf)
+        self.last = bytes(buf)
+
+
+# machine.bitstream(), as used by neopixel; the last buffer is kept
+bitstreams = 0
+bitstream_last = b''
+
+
+def bitstream(pin, encoding, timing, buf):
+    global bitstreams, bitstream_last
+    bitstreams += 1
+    bitstream_last = bytes(buf)
+
+
+resets = 0
+
+
+def unique_id():
+    return b'\x24\x0a\xc4\x12\x34\x56'
+
+
+def reset():
+    # The board would reboot here; on the host just count it.
+    global resets
+    resets += 1
@@ -0,0 +1,24 @@
+# fake_micropython.py -- host stand-in for the `micropython` module.
+#
+# Code emitters (native, viper) are deliberately missing so modules fall
+# back to their plain Python paths.
+
+
+def const(x):
+    return x
+
+
+def kbd_intr(chr):
+    pass
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=None):
+    pass
+
+
+def schedule(fn, arg):
+    fn(arg)
@@ -0,0 +1,96 @@
+# fake_network.py -- host stand-in for `network.WLAN`.
+#
+# WLAN.aps is the simulated radio environment shared by every interface:
+#   {ssid: {'password': ..., 'rssi': -60, 'bssid': b'\x00' * 6, 'channel': 6,
+#           'up': True, 'fail_rate': 0.0, 'assoc_ms': 0}}
+# Set 'up' to False to drop the AP, 'fail_rate' to make associations fail
+# at random and 'assoc_ms' to make them take time.
+import random
+import time
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+STAT_NO_AP_FOUND = 201
+STAT_WRONG_PASSWORD = 202
+STAT_CONNECT_FAIL = 203
+
+
+class WLAN:
+    aps = {}
+    # Counters across all interfaces, for tests and benchmarks
+    scans = 0
+    connects = 0
+
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+        self._ap = None
+        self._ready_at = 0
+        self._status = STAT_IDLE
+        self._config = {'essid': '', 'channel': 1}
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        self._active = bool(value)
+        if not self._active:
+            self._ap = None
+            self._status = STAT_IDLE
+
+    def scan(self):
+        WLAN.scans += 1
+        return [(ssid.encode(), ap.get('bssid', b'\x00' * 6), ap.get('channel', 1),
+                 ap.get('rssi', -60), 3, False)
+                for ssid, ap in self.aps.items() if ap.get('up', True)]
+
+    def connect(self, ssid=None, key=None, bssid=None):
+        WLAN.connects += 1
+        ap = self.aps.get(ssid)
+        self._config['essid'] = ssid
+        self._ap = None
+        if ap is None or not ap.get('up', True):
+            self._status = STAT_NO_AP_FOUND
+        elif ap.get('password', '') != (key or ''):
+            self._status = STAT_WRONG_PASSWORD
+        elif random.random() < ap.get('fail_rate', 0):
+            self._status = STAT_CONNECT_FAIL
+        else:
+            self._ap = ap
+            self._ready_at = time.ticks_add(time.ticks_ms(), ap.get('assoc_ms', 0))
+            self._status = STAT_CONNECTING
+
+    def disconnect(self):
+        self._ap = None
+        self._status = STAT_IDLE
+
+    def isconnected(self):
+        return self.status() == STAT_GOT_IP
+
+    def status(self, param=None):
+        ap = self._ap
+        if param == 'rssi':
+            return ap.get('rssi', -60) if ap else 0
+        if not self._active:
+            return STAT_IDLE
+        if ap is not None:
+            if not ap.get('up', True):
+                # beacon loss
+                self._ap = None
+                self._status = STAT_NO_AP_FOUND
+            elif self._status == STAT_CONNECTING and time.ticks_diff(time.ticks_ms(), self._ready_at) >= 0:
+                self._status = STAT_GOT_IP
+        return self._status
+
+    def config(self, *args, **kwargs):
+        if kwargs:
+            self._config.update(kwargs)
+            return
+        return self._config.get(args[0])
+
+    def ipconfig(self, key):
+        if key == 'addr4':
+            return ('192.168.4.1', '255.255.255.0')
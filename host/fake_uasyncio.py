@@ -0,0 +1,21 @@
+# fake_uasyncio.py -- CPython asyncio with the MicroPython extras we use.
+from asyncio import *
+import asyncio as _asyncio
+
+
+async def sleep_ms(ms):
+    await _asyncio.sleep(ms / 1000)
+
+
+def wait_for_ms(aw, ms):
+    return _asyncio.wait_for(aw, ms / 1000)
+
+
+async def _readinto(self, buf):
+    data = await self.read(len(buf))
+    buf[:len(data)] = data
+    return len(data)
+
+
+if not hasattr(StreamReader, 'readinto'):
+    StreamReader.readinto = _readinto
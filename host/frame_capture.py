@@ -0,0 +1,38 @@
+# frame_capture.py -- a FrameWriter sink that keeps the frames it is shown.
+#
+#   from frame_out import FrameWriter
+#   cap = CaptureSink()
+#   engine = FlickerEngine(writer=FrameWriter(cap, 9))
+#
+# Each show() stores (ticks_us, bytes) in a ring of `keep` frames. The
+# copy is made here, on the host; the writer itself hands out the same
+# memoryview every time.
+import time
+
+
+class CaptureSink:
+    def __init__(self, keep=1000):
+        self.keep = keep
+        self.frames = []
+        self.shown = 0
+
+    def show(self, frame):
+        self.shown += 1
+        if len(self.frames) == self.keep:
+            self.frames.pop(0)
+        self.frames.append((time.ticks_us(), bytes(frame)))
+
+    def last(self):
+        return self.frames[-1][1] if self.frames else None
+
+    def value(self, frame, ch, size=1):
+        """Raw value of channel `ch` in a captured frame."""
+        j = ch * size
+        v = 0
+        for b in frame[j:j + size]:
+            v = v << 8 | b
+        return v
+
+    def clear(self):
+        self.frames = []
+        self.shown = 0
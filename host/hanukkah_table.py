@@ -0,0 +1,92 @@
+# hanukkah_table.py -- build the night table schedule.py reads.
+#
+#   python host/hanukkah_table.py [-o hanukkah.bin] [--first 2024] [--years 100] [--show]
+#
+# Works out the first night of Hanukkah, the evening before 25 Kislev,
+# for each Gregorian year from the arithmetic Hebrew calendar, so the
+# board never has to. Layout, little-endian:
+#
+#   '<4sBHB'  b'HNKT', version 1, first year, number of years
+#   8 bytes   candles lit on nights 1-8, not counting the Shamash
+#   '<H' * n  first night of each year, in days since 2000-01-01
+#
+# 216 bytes for a century. Copy it to the board next to main.py.
+import argparse
+import datetime
+import os
+import struct
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MAGIC = b'HNKT'
+VERSION = 1
+HEADER = '<4sBHB'
+COUNTS = bytes(range(1, 9))
+DAY0 = datetime.date(2000, 1, 1).toordinal()
+
+# Fixed day (proleptic Gregorian ordinal, as date.toordinal) of 1 Tishri AM 1
+EPOCH = -1373427
+
+
+def _elapsed(year):
+    # days from the epoch to the molad of Tishri, with the first postponement
+    months = (235 * year - 234) // 19
+    parts = 12084 + 13753 * months
+    days = 29 * months + parts // 25920
+    return days + 1 if (3 * (days + 1)) % 7 < 3 else days
+
+
+def _delay(year):
+    # the remaining postponements keep year lengths to the allowed ones
+    ny0, ny1, ny2 = _elapsed(year - 1), _elapsed(year), _elapsed(year + 1)
+    if ny2 - ny1 == 356:
+        return 2
+    if ny1 - ny0 == 382:
+        return 1
+    return 0
+
+
+def new_year(year):
+    """Fixed day of 1 Tishri of Hebrew `year`."""
+    return EPOCH + _elapsed(year) + _delay(year)
+
+
+def first_night(gyear):
+    """Date of the first candle of Hanukkah in Gregorian year `gyear`."""
+    year = gyear + 3761
+    rosh = new_year(year)
+    length = new_year(year + 1) - rosh
+    # Marheshvan has 30 days in a complete year (355 or 385 days)
+    heshvan = 30 if length % 10 == 5 else 29
+    kislev25 = rosh + 30 + heshvan + 24
+    return datetime.date.fromordinal(kislev25 - 1)
+
+
+def build(first, years):
+    starts = [first_night(y).toordinal() - DAY0 for y in range(first, first + years)]
+    return struct.pack(HEADER, MAGIC, VERSION, first, years) + COUNTS + struct.pack(
+        '<%dH' % years, *starts)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-o', '--out', default=os.path.join(ROOT, 'hanukkah.bin'))
+    ap.add_argument('--first', type=int, default=2024)
+    ap.add_argument('--years', type=int, default=100)
+    ap.add_argument('--show', action='store_true', help='print the dates as well')
+    args = ap.parse_args()
+    if not 0 < args.years < 256:
+        ap.error('--years must be 1..255')
+    if args.first < 2000 or args.first + args.years > 2180:
+        ap.error('years must fall between 2000 and 2179')
+    data = build(args.first, args.years)
+    with open(args.out, 'wb') as f:
+        f.write(data)
+    if args.show:
+        for y in range(args.first, args.first + args.years):
+            print(first_night(y).isoformat())
+    print('wrote', args.out, len(data), 'bytes, %d-%d' % (args.first, args.first + args.years - 1))
+
+
+if __name__ == '__main__':
+    main()
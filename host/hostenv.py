@@ -0,0 +1,57 @@
+# hostenv.py -- run the device modules under CPython or the unix port.
+#
+#   import sys; sys.path[:0] = ['host', '.']
+#   import hostenv; hostenv.install()
+#
+# machine and network are always replaced by the fakes in this directory.
+# Under CPython, uasyncio, micropython, ujson, ubinascii, time.ticks_* and
+# sys.print_exception are provided as well; the unix port has its own.
+import sys
+import time
+import fake_machine
+import fake_network
+
+_time = time.time
+
+
+def _ticks_ms():
+    return time.monotonic_ns() // 1000000
+
+
+def _ticks_us():
+    return time.monotonic_ns() // 1000
+
+
+def _ticks_add(t, delta):
+    return t + delta
+
+
+def _ticks_diff(a, b):
+    return a - b
+
+
+def _print_exception(exc, file=sys.stdout):
+    import traceback
+    traceback.print_exception(type(exc), exc, exc.__traceback__, file=file)
+
+
+def install():
+    if sys.implementation.name != 'micropython':
+        time.ticks_ms = _ticks_ms
+        time.ticks_us = _ticks_us
+        time.ticks_add = _ticks_add
+        time.ticks_diff = _ticks_diff
+        time.time = _time  # vclock may have replaced it
+        sys.print_exception = _print_exception
+
+        import json
+        import binascii
+        import fake_uasyncio
+        import fake_micropython
+        sys.modules['uasyncio'] = fake_uasyncio
+        sys.modules['micropython'] = fake_micropython
+        sys.modules['ujson'] = json
+        sys.modules['ubinascii'] = binascii
+
+    sys.modules['machine'] = fake_machine
+    sys.modules['network'] = fake_network
@@ -0,0 +1,107 @@
+# render.py -- render a MenorahController offline, on a virtual clock.
+#
+#   python host/render.py [-s seconds] [-o trace.bin|trace.csv] [--stats]
+#                         [--seed N] [--width W] [--delay MS] [--sleep MIN-MAX]
+#                         [--gamma G] [--seq seq/breathe.seq] [--against base.bin]
+#   python host/render.py --replay trace.bin [--stats]
+#
+# Lights the menorah with light_sequence(delay), plays --seq if given and
+# keeps it lit until `seconds` of device time have passed, recording every
+# duty write. Nothing sleeps for real, so an hour renders in seconds, and
+# with the same seed and settings the trace is identical every run:
+# --against compares with a saved one. --replay pushes a saved trace
+# back into the stub PWMs instead of rendering.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'host'), ROOT]
+import hostenv
+hostenv.install()
+
+import argparse
+import time
+import vclock
+from duty_trace import Recorder, Trace, replay, show_stats, stats
+
+PINS = list(range(9))
+
+
+def render(seconds, seed=1, width=50, delay_ms=800, sleep=None, gamma=None, seq=None):
+    """Run the menorah for `seconds` of virtual time; returns (trace, real seconds)."""
+    clock = vclock.install()
+    import uasyncio as asyncio
+    from candle import Candle
+    from flicker import FlickerEngine
+    from menorah import MenorahController
+    from pwm_out import PWMWriter
+    from timeline import Sequence
+
+    saved = Candle.SLEEP_MIN, Candle.SLEEP_MAX
+    if sleep:
+        Candle.SLEEP_MIN, Candle.SLEEP_MAX = sleep
+    rec = Recorder(PINS)
+
+    async def main():
+        m = MenorahController(PINS, width=width, gamma=gamma, seed=seed,
+                              engine=FlickerEngine(writer=PWMWriter()))
+        await m.light_sequence(delay_ms)
+        if seq:
+            await m.play(Sequence.load(seq))
+        left = seconds * 1000 - clock.ticks_ms()
+        if left > 0:
+            await asyncio.sleep_ms(left)
+        m.off_all()
+        await asyncio.sleep_ms(1000)
+
+    t0 = time.perf_counter()
+    try:
+        vclock.run(main(), clock)
+    finally:
+        Candle.SLEEP_MIN, Candle.SLEEP_MAX = saved
+        trace = rec.stop()
+        hostenv.install()  # real ticks again
+    return trace, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-s', '--seconds', type=float, default=600)
+    ap.add_argument('-o', '--out')
+    ap.add_argument('--stats', action='store_true')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--width', type=int, default=50)
+    ap.add_argument('--delay', type=int, default=800, help='light_sequence delay_ms')
+    ap.add_argument('--sleep', help='flicker frame length range, ms, e.g. 50-150')
+    ap.add_argument('--gamma', type=float)
+    ap.add_argument('--seq')
+    ap.add_argument('--against', help='saved trace this render must match')
+    ap.add_argument('--replay', help='push a saved trace into the stub PWMs instead')
+    args = ap.parse_args()
+
+    if args.replay:
+        trace = Trace.load(args.replay)
+        pwms = replay(trace, PINS[:trace.channels])
+        print('%s: %d writes over %.1f s, %s writes per channel' % (
+            args.replay, len(trace), trace.duration_ms / 1000, [p.writes for p in pwms]))
+    else:
+        sleep = tuple(int(v) for v in args.sleep.split('-')) if args.sleep else None
+        trace, real = render(args.seconds, args.seed, args.width, args.delay, sleep,
+                             args.gamma, args.seq)
+        print('rendered %.0f s in %.2f s (%.0fx): %d writes' % (
+            trace.duration_ms / 1000, real, trace.duration_ms / 1000 / real, len(trace)))
+        if args.out:
+            trace.save(args.out)
+            print('wrote', args.out, os.path.getsize(args.out), 'bytes')
+    if args.stats:
+        show_stats(stats(trace))
+    if args.against:
+        k = trace.diff(Trace.load(args.against))
+        if k is not None:
+            print('differs from %s at write %d' % (args.against, k))
+            sys.exit(1)
+        print('matches', args.against)
+
+
+if __name__ == '__main__':
+    main()
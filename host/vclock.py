@@ -0,0 +1,75 @@
+# vclock.py -- virtual time for running the device modules faster than real time.
+#
+#   import hostenv; hostenv.install()
+#   import vclock
+#   clock = vclock.install()
+#   vclock.run(main(), clock)
+#
+# time.ticks_ms, ticks_us and time.time read `clock`, and the event loop,
+# instead of waiting for its next timer, moves the clock straight to it.
+# Code that only sleeps (the flicker engine, timelines, sequences) then
+# runs as fast as the host can step it, and identically every time.
+import asyncio
+import math
+import selectors
+import time
+
+
+class Clock:
+    def __init__(self, wall=0):
+        self.us = 0
+        self.wall = wall    # what time.time() reads at us == 0
+
+    def time(self):
+        return self.wall + self.us // 1000000
+
+    def ticks_ms(self):
+        return self.us // 1000
+
+    def ticks_us(self):
+        return self.us
+
+    def advance(self, seconds):
+        self.us += math.ceil(seconds * 1000000)
+
+
+class _Selector(selectors.SelectSelector):
+    def __init__(self, clock):
+        super().__init__()
+        self._clock = clock
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError('virtual clock: nothing left to wake up for')
+        ready = super().select(0)
+        if not ready and timeout > 0:
+            self._clock.advance(timeout)
+        return ready
+
+
+class VirtualLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        self._clock = clock
+        super().__init__(_Selector(clock))
+
+    def time(self):
+        return self._clock.us / 1000000
+
+
+def install(clock=None):
+    """Point time.ticks_ms/us and time.time at `clock` (a new one by default) and return it."""
+    clock = clock or Clock()
+    time.ticks_ms = clock.ticks_ms
+    time.ticks_us = clock.ticks_us
+    time.time = clock.time
+    return clock
+
+
+def run(coro, clock):
+    loop = VirtualLoop(clock)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
@@ -0,0 +1,342 @@
+# httpreq.py
+import uasyncio as asyncio
+
+# Byte scans run as viper code on the board; the host falls back to
+# bytearray.find, which MicroPython's bytearray does not have.
+try:
+    import micropython
+
+    @micropython.viper
+    def _find_byte(buf, i: int, end: int, c: int) -> int:
+        p = ptr8(buf)
+        while i < end:
+            if p[i] == c:
+                return i
+            i += 1
+        return -1
+
+    @micropython.viper
+    def _find_blank(buf, i: int, end: int) -> int:
+        # index just past the first CRLFCRLF in buf[i:end], or -1
+        p = ptr8(buf)
+        end -= 3
+        while i < end:
+            if p[i] == 13 and p[i + 1] == 10 and p[i + 2] == 13 and p[i + 3] == 10:
+                return i + 4
+            i += 1
+        return -1
+except (ImportError, AttributeError):
+    def _find_byte(buf, i, end, c):
+        return buf.find(bytes((c,)), i, end)
+
+    def _find_blank(buf, i, end):
+        j = buf.find(b'\r\n\r\n', i, end)
+        return j + 4 if j >= 0 else -1
+
+_CONTENT_LENGTH = b'content-length:'
+_CONNECTION = b'connection:'
+
+REASONS = {
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    408: 'Request Timeout',
+    413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large',
+    503: 'Service Unavailable',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+# Turned-away clients are read into at most REJECT_SLOTS buffers, kept
+# for reuse; any further ones are closed without a reply
+REJECT_SLOTS = 2
+_DISCARD = 1536
+_spare = []
+_rejecting = 0
+
+
+async def discard(reader, timeout_ms=5000, buf=None):
+    """Read one request and drop it, reading at most len(buf) bytes.
+
+    For a client that is about to be turned away. If the reply is sent and
+    the socket closed while the request is still unread, the TCP stack
+    resets the connection and the client never sees the reply."""
+    if buf is None:
+        buf = bytearray(_DISCARD)
+    limit = len(buf)
+    mv = memoryview(buf)
+    n = 0
+    end = -1
+    while end < 0:
+        if n >= limit:
+            return
+        got = await asyncio.wait_for_ms(reader.readinto(mv[n:]), timeout_ms)
+        if not got:
+            return
+        scanned = n - 3 if n > 3 else 0
+        n += got
+        end = _find_blank(buf, scanned, n)
+    length = 0
+    i = _find_byte(buf, 0, end, 10) + 1
+    while 0 < i < end - 2:
+        j = _match(buf, i, end, _CONTENT_LENGTH)
+        if j >= 0:
+            while 48 <= buf[j] <= 57:
+                length = length * 10 + buf[j] - 48
+                j += 1
+        i = _find_byte(buf, i, end, 10) + 1
+    total = end + length
+    if total > limit:
+        total = limit
+    while n < total:
+        got = await asyncio.wait_for_ms(reader.readinto(mv[n:total]), timeout_ms)
+        if not got:
+            return
+        n += got
+
+
+async def reject(reader, writer, reply, timeout_ms=5000):
+    """Turn a client away: discard() its request, send `reply` and close.
+
+    Shared by every server on the board. At most REJECT_SLOTS clients are
+    read at once, and each gets `timeout_ms` for the whole request rather
+    than per read; past that they are closed at once, without a reply."""
+    global _rejecting
+    if _rejecting >= REJECT_SLOTS:
+        await close(writer)
+        return
+    _rejecting += 1
+    buf = _spare.pop() if _spare else bytearray(_DISCARD)
+    try:
+        await asyncio.wait_for_ms(discard(reader, timeout_ms, buf), timeout_ms)
+        writer.write(reply)
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        _spare.append(buf)
+        _rejecting -= 1
+    await close(writer)
+
+
+async def close(writer):
+    try:
+        writer.close()
+        await writer.wait_closed()
+    except Exception:
+        pass
+
+
+def _hexval(c):
+    if 48 <= c <= 57:
+        return c - 48
+    c |= 0x20
+    if 97 <= c <= 102:
+        return c - 87
+    return -1
+
+
+def _match(buf, i, end, name):
+    # index of the value after header `name` (lowercase, with ':') starting
+    # at i, past any blanks; -1 if the line is another header
+    nlen = len(name)
+    if i + nlen >= end:
+        return -1
+    k = 0
+    while k < nlen and (buf[i + k] | 0x20) == name[k]:
+        k += 1
+    if k < nlen:
+        return -1
+    i += nlen
+    while buf[i] == 32 or buf[i] == 9:
+        i += 1
+    return i
+
+
+class RequestParser:
+    """Streaming HTTP/1.0-1.1 request reader over one preallocated buffer.
+
+    read() fills the buffer straight from the stream with readinto() and
+    scans it once; the request line, Content-Length and body are kept as
+    offsets into the buffer, so nothing is copied until a caller asks for
+    bytes. Headers longer than `max_header` raise HTTPError(431) and
+    bodies longer than `max_body` raise HTTPError(413).
+
+    On a keep-alive connection read(keep=True) starts from whatever the
+    previous read() buffered past its request, so pipelined requests are
+    parsed without touching the stream; `keep_alive` tells whether the
+    client wants the connection kept (HTTP/1.1 default or the
+    Connection header).
+    """
+
+    def __init__(self, max_header=1024, max_body=512):
+        self.max_header = max_header
+        self.max_body = max_body
+        self.buf = bytearray(max_header + max_body)
+        self.mv = memoryview(self.buf)
+        self.n = 0
+        self.method_end = 0
+        self.path_start = 0
+        self.path_end = 0
+        self.header_end = 0
+        self.length = 0
+        self.body_end = 0
+        self.keep_alive = False
+
+    async def read(self, reader, timeout_ms=5000, keep=False):
+        """Read one request. Returns False if the client closed before sending anything."""
+        mv = self.mv
+        rest = self.n - self.body_end if keep else 0
+        if rest > 0:
+            # pipelined bytes from the last read move to the front
+            mv[:rest] = bytes(mv[self.body_end:self.n])
+            self.n = rest
+        else:
+            self.n = 0
+        self.body_end = 0
+        scanned = 0
+        while True:
+            end = self._find_header_end(scanned)
+            if end >= 0:
+                break
+            if self.n >= self.max_header:
+                raise HTTPError(431)
+            scanned = self.n - 3 if self.n > 3 else 0
+            got = await asyncio.wait_for_ms(reader.readinto(mv[self.n:self.max_header]), timeout_ms)
+            if not got:
+                if self.n == 0:
+                    return False
+                raise HTTPError(400)
+            self.n += got
+
+        self._parse_head(end)
+        total = end + self.length
+        while self.n < total:
+            got = await asyncio.wait_for_ms(reader.readinto(mv[self.n:total]), timeout_ms)
+            if not got:
+                raise HTTPError(400)
+            self.n += got
+        self.body_end = total
+        return True
+
+    def pending(self):
+        """True if bytes of a further request are already buffered."""
+        return self.n > self.body_end
+
+    def feed(self, data):
+        """Parse a complete request held in `data` (no stream); used on the host."""
+        if len(data) > len(self.buf):
+            raise HTTPError(413)
+        self.mv[:len(data)] = data
+        self.n = len(data)
+        end = self._find_header_end(0)
+        if end < 0:
+            raise HTTPError(431 if self.n >= self.max_header else 400)
+        self._parse_head(end)
+        if self.n < end + self.length:
+            raise HTTPError(400)
+        self.body_end = end + self.length
+
+    def _find_header_end(self, i):
+        return _find_blank(self.buf, i, self.n)
+
+    def _parse_head(self, end):
+        buf = self.buf
+        # Request line: METHOD SP PATH [SP VERSION] CRLF
+        le = _find_byte(buf, 0, end, 10)
+        sp = _find_byte(buf, 0, le, 32)
+        if sp <= 0:
+            raise HTTPError(400)
+        self.method_end = sp
+        self.path_start = sp + 1
+        pe = _find_byte(buf, sp + 1, le, 32)
+        if pe < 0:
+            pe = le - 1 if buf[le - 1] == 13 else le
+        if pe <= sp + 1:
+            raise HTTPError(400)
+        self.path_end = pe
+        # "HTTP/1.1" keeps the connection unless told otherwise
+        self.keep_alive = le - pe >= 9 and buf[pe + 6] == 49 and buf[pe + 8] == 49
+
+        # Header lines; only Content-Length and Connection are of interest
+        self.length = 0
+        i = le + 1
+        while i < end - 2:
+            j = _match(buf, i, end, _CONNECTION)
+            if j >= 0:
+                # "close" or "keep-alive"; other tokens leave the default
+                c = buf[j] | 0x20
+                if c == 99:
+                    self.keep_alive = False
+                elif c == 107:
+                    self.keep_alive = True
+            j = _match(buf, i, end, _CONTENT_LENGTH)
+            if j >= 0:
+                v = 0
+                start = j
+                while 48 <= buf[j] <= 57:
+                    v = v * 10 + buf[j] - 48
+                    if v > self.max_body:
+                        raise HTTPError(413)
+                    j += 1
+                if j == start:
+                    raise HTTPError(400)
+                self.length = v
+            i = _find_byte(buf, i, end, 10) + 1
+        self.header_end = end
+
+    # --- Accessors ---
+    def method(self):
+        return bytes(self.mv[:self.method_end])
+
+    def path(self):
+        return bytes(self.mv[self.path_start:self.path_end])
+
+    def body(self):
+        return self.mv[self.header_end:self.body_end]
+
+    def form(self):
+        """URL-decode the body in place, in one pass.
+
+        Returns {name: memoryview} where every value is a slice of the
+        request buffer, valid until the next read()."""
+        buf = self.buf
+        mv = self.mv
+        r = w = self.header_end
+        end = self.body_end
+        fields = {}
+        ks = w
+        ke = -1
+        while r <= end:
+            c = buf[r] if r < end else 38
+            if c == 38:  # '&' or end of body closes a field
+                if ke < 0:
+                    ke = w
+                if ke > ks:
+                    fields[bytes(mv[ks:ke])] = mv[ke:w]
+                ks = w
+                ke = -1
+                r += 1
+                continue
+            if c == 61 and ke < 0:  # first '=' splits name and value
+                ke = w
+                r += 1
+                continue
+            if c == 43:  # '+'
+                c = 32
+            elif c == 37 and r + 2 < end:  # '%XX'
+                hi = _hexval(buf[r + 1])
+                lo = _hexval(buf[r + 2])
+                if hi >= 0 and lo >= 0:
+                    c = hi << 4 | lo
+                    r += 2
+            buf[w] = c
+            w += 1
+            r += 1
+        return fields
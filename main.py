@@ -1,61 +1,112 @@
+# Boot order: light the candles first, then bring up the REPL and WiFi.
+# With a night table the candles stay dark for the scheduler instead.
+# bootprof records every import and init step; bootprof.show() prints them.
+import bootprof
+import os
 import uasyncio as asyncio
+bootprof.lap('import uasyncio')
+# One at a time, dependencies first, so each gets its own line in the profile
+for m in ('curves', 'prng', 'pwm_out', 'flicker', 'candle', 'timeline', 'menorah'):
+    bootprof.imp(m)
 from menorah import MenorahController
-from wifi_manager import WiFiManager
-from candle import Candle
 pins = [32, 25, 27, 12, 13, 23, 21, 19, 4]
 transorder=[0,8,7,6,5,1,2,3,4]
 mpins=[pins[i] for i in transorder]
 menorah = MenorahController(mpins,width=50)
-import _thread
-import uasyncio as asyncio
-# Connect to WiFi (or start config portal if no credentials)
-wm = WiFiManager()
-connected = False
+bootprof.lap('init menorah')
+# event-loop health, off until probe.start(); probe.show() prints a summary
+probe = bootprof.imp('probe').get_probe()
+# Set once their tasks have imported them, see wifi() and main()
+wm = None
+api = None
+sched = None
+# With host/hanukkah_table.py's night table on the board the scheduler
+# lights each night of Hanukkah; local time is UTC + tz_min
+SCHEDULE = dict(at=17 * 60, tz_min=0, duration_min=30)
 try:
-    connected = wm.connect()
-except Exception as e:
-    print('WiFi connect error:', e)
-
-if not connected:
-    # This will block and run a small AP + web form; after saving it reboots
-    print('No saved/available networks. Starting config portal...')
-    wm.start_config_portal()
-else:
-    print('WiFi connected — to check or re-run portal call: wm.start_config_portal()')
-# Start the menorah flickering
-#mip.install('aiorepl')
-import aiorepl
-cs=[Candle(i) for i in mpins]
+    os.stat('hanukkah.bin')
+    scheduled = True
+except OSError:
+    scheduled = False
+
+async def first_light():
+    # hold the slow imports back until the first flicker frame is out
+    c = menorah.candles[0]
+    while not c.out.last(c.ch):
+        await asyncio.sleep_ms(1)
+    bootprof.lap('first light')
+    print('First light %d ms after reset' % (bootprof.before_ms + bootprof.elapsed_ms()))
+
+async def wifi():
+    global wm, api
+    wm = bootprof.imp('wifi_manager').WiFiManager()
+    bootprof.lap('init wifi')
+    # Connect to WiFi (or start config portal if no credentials) while the candles run
+    connected = False
+    try:
+        connected = await wm.connect()
+    except Exception as e:
+        print('WiFi connect error:', e)
+
+    if not connected:
+        # Small AP + web form; after saving it reboots
+        print('No saved/available networks. Starting config portal...')
+        await wm.config_portal()
+    else:
+        print('WiFi connected', wm.metrics, '— to check or re-run portal call: await wm.config_portal()')
+        if sched is not None:
+            # the scheduler waits for the clock; NTP blocks while it asks,
+            # so only here, and only until it works
+            for _ in range(3):
+                if sched.set_clock():
+                    break
+                await asyncio.sleep(10)
+        # HTTP control API on port 8080; keep the link up in the background,
+        # wm.link has the stats
+        api = bootprof.imp('api').MenorahAPI(menorah)
+        asyncio.create_task(api.serve())
+        await wm.supervise()
 
 async def go():
     print('in go')
+    tick = probe.task('go')
     while True:
-        for i,c in enumerate(cs):
+        for i,c in enumerate(menorah.candles):
             print('calling on',i)
             c.on()
             print('done on',i)
             await asyncio.sleep(1)
-        for i,c in enumerate(cs):
+            probe.tick(tick)
+        for i,c in enumerate(menorah.candles):
             print('calling off',i)
             c.off()
             print('done off',i)
             await asyncio.sleep(1)
-        #while True:
-    #    print('yield forever')
-    #    await asyncio.sleep(0)
+            probe.tick(tick)
 
 async def main():
+    global sched
     print("Starting tasks...")
 
-    # Start other program tasks.
-    t1 = asyncio.create_task(go())
+    if scheduled:
+        # dark until the first night; wifi() sets the clock over NTP once
+        # connected, sched.show() for the next night
+        sched = bootprof.imp('schedule').Scheduler(menorah, **SCHEDULE)
+        t1 = sched.start()
+    else:
+        # Start the menorah flickering; the Shamash comes on at full level
+        # straight away instead of fading in, so first light is one tick away
+        menorah.candles[0].on(0)
+        t1 = asyncio.create_task(go())
+        await first_light()
 
     # Start the aiorepl task.
+    #mip.install('aiorepl')
+    aiorepl = bootprof.imp('aiorepl')
     repl = asyncio.create_task(aiorepl.task())
 
-    await asyncio.gather(t1, repl)
-
-asyncio.run(main())
-
+    w = asyncio.create_task(wifi())
 
+    await asyncio.gather(t1, repl, w)
 
+asyncio.run(main())
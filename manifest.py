@@ -0,0 +1,15 @@
+# manifest.py -- freeze the menorah modules into a firmware image:
+#
+#   make -C ports/esp32 BOARD=ESP32_GENERIC FROZEN_MANIFEST=/path/to/manifest.py
+#
+# main.py and hanukkah.bin stay on the filesystem. Remove the board's
+# copies of the frozen modules afterwards: '' comes before '.frozen' in
+# sys.path, so a .py (or .mpy) on the filesystem would still be the one
+# imported.
+# host/build_mpy.py reads the module list from here.
+include('$(PORT_DIR)/boards/manifest.py')
+
+for name in ('bootprof', 'curves', 'prng', 'pwm_out', 'bam_out', 'frame_out', 'flicker', 'candle', 'timeline',
+             'menorah', 'governor', 'schedule', 'probe', 'httpreq', 'credstore', 'wifi_manager', 'status_stream',
+             'api', 'sync', 'aiorepl'):
+    module(name + '.py')
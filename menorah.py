@@ -1,12 +1,26 @@
 # menorah.py
 import uasyncio as asyncio
 from candle import Candle
+from timeline import Sequence, Timeline
+import flicker
+import prng
 
 class MenorahController:
-    def __init__(self, pins, width=20):
+    def __init__(self, pins, width=20, engine=None, gamma=None, seed=None, writer=None):
         if len(pins) != 9:
             raise ValueError("Provide exactly 9 pins: 0=Shamash, 1-8=other candles")
-        self.candles = [Candle(p, width=width) for p in pins]
+        # `writer` picks the output backend (pwm_out, bam_out, frame_out);
+        # it gets an engine of its own, pins are then its channel numbers
+        if engine is None:
+            engine = flicker.FlickerEngine(writer=writer) if writer is not None else flicker.get_engine()
+        self.engine = engine
+        # candle seeds come from one generator, so `seed` replays the lot;
+        # they are JUMP draws apart, or each candle would play the next
+        # one's flicker a frame later
+        self.rng = prng.XorShift16(prng.next_seed() if seed is None else seed)
+        self.candles = [Candle(p, width=width, engine=self.engine, gamma=gamma, seed=self.rng.jump())
+                        for p in pins]
+        self.timeline = Timeline(self.candles)
 
     # --- Synchronous REPL controls ---
     def light(self, n):
@@ -26,10 +40,11 @@ class MenorahController:
             c.off()
 
     # --- Async sequences ---
-    async def light_sequence(self, delay_ms=800):
+    async def light_sequence(self, delay_ms=800, n=8):
+        """Light the Shamash, then candles 1..n (n = the night of Hanukkah)."""
         self.light(0)  # Shamash first
         await asyncio.sleep_ms(delay_ms)
-        for i in range(1, 9):
+        for i in range(1, n + 1):
             self.light(i)
             await asyncio.sleep_ms(delay_ms)
 
@@ -38,6 +53,12 @@ class MenorahController:
             self.extinguish(i)
             await asyncio.sleep_ms(delay_ms)
 
+    async def play(self, seq):
+        """Play a timeline.Sequence, or load one from a .seq file path."""
+        if isinstance(seq, str):
+            seq = Sequence.load(seq)
+        await self.timeline.play(seq)
+
     # --- Status / debug ---
     def status(self):
         return {i: c.is_on for i, c in enumerate(self.candles)}
@@ -45,3 +66,21 @@ class MenorahController:
     def width_set(self, n, width):
         if 0 <= n < 9:
             self.candles[n].width = width
+
+    def gamma_set(self, n, gamma):
+        if 0 <= n < 9:
+            self.candles[n].gamma_set(gamma)
+
+    def gamma_all(self, gamma):
+        for c in self.candles:
+            c.gamma_set(gamma)
+
+    def reseed(self, seed):
+        """Restart every candle's flicker from `seed`, as if built with it."""
+        self.rng.seed(seed)
+        for c in self.candles:
+            c.seed(self.rng.jump())
+
+    def fade_all(self, fade_in_ms=None, fade_out_ms=None, curve='inout'):
+        for c in self.candles:
+            c.fade_set(fade_in_ms, fade_out_ms, curve)
@@ -0,0 +1,102 @@
+# prng.py
+#
+# 16-bit xorshift (7, 9, 8): period 65535, a handful of shifts per value
+# and every intermediate below 2**16, so generating never allocates.
+# Unlike `random`, each generator carries its own state, so a sequence
+# can be replayed from its seed.
+try:
+    import micropython
+    _native = micropython.native
+except (ImportError, AttributeError):
+    def _native(f):
+        return f
+
+
+def step(x):
+    x ^= (x << 7) & 0xFFFF
+    x ^= x >> 9
+    x ^= (x << 8) & 0xFFFF
+    return x
+
+
+@_native
+def _fill(x, out, lo, span):
+    for i in range(len(out)):
+        x ^= (x << 7) & 0xFFFF
+        x ^= x >> 9
+        x ^= (x << 8) & 0xFFFF
+        out[i] = lo + x % span
+    return x
+
+
+@_native
+def _fill2(x, a, a_lo, a_span, b, b_lo, b_span):
+    for i in range(len(a)):
+        x ^= (x << 7) & 0xFFFF
+        x ^= x >> 9
+        x ^= (x << 8) & 0xFFFF
+        a[i] = a_lo + x % a_span
+        x ^= (x << 7) & 0xFFFF
+        x ^= x >> 9
+        x ^= (x << 8) & 0xFFFF
+        b[i] = b_lo + x % b_span
+    return x
+
+
+# step() applied JUMP times is linear over GF(2): bit b of the state
+# contributes _JUMP[b]. Generators started JUMP draws apart split the
+# period evenly between nine candles, so none plays another's flicker
+# for JUMP draws.
+JUMP = 7281     # 65535 // 9
+_JUMP = (0x7DB3, 0x1141, 0x22B1, 0xBB41, 0xDCBE, 0x74AA, 0x9FCE, 0x6570,
+         0xA8A4, 0x917C, 0x10D6, 0xFC66, 0x6E40, 0xC677, 0x61B5, 0x7506)
+
+
+def jump(x):
+    """The state JUMP draws after `x`, in 16 steps instead of 7281."""
+    r = 0
+    for c in _JUMP:
+        if x & 1:
+            r ^= c
+        x >>= 1
+    return r
+
+
+class XorShift16:
+    def __init__(self, seed=0xACE1):
+        self.seed(seed)
+
+    def seed(self, seed):
+        # 0 is the one state xorshift never leaves
+        self.x = (seed & 0xFFFF) or 1
+
+    def next(self):
+        """Next value, 1..65535."""
+        self.x = step(self.x)
+        return self.x
+
+    def jump(self):
+        """Skip JUMP draws; returns the new state, a seed for another generator."""
+        self.x = jump(self.x)
+        return self.x
+
+    def below(self, n):
+        return self.next() % n
+
+    def fill(self, out, lo=0, span=0x10000):
+        """out[i] = lo + next() % span for the whole of `out`, in one call."""
+        self.x = _fill(self.x, out, lo, span)
+
+    def fill2(self, a, a_lo, a_span, b, b_lo, b_span):
+        """Fill `a` and `b` (same length) with interleaved draws.
+
+        This is the flicker table layout: a duty and a sleep per frame."""
+        self.x = _fill2(self.x, a, a_lo, a_span, b, b_lo, b_span)
+
+
+# Hands out seeds to candles created without one, JUMP draws apart
+_seeds = XorShift16()
+
+
+def next_seed():
+    return _seeds.jump()
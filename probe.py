@@ -0,0 +1,193 @@
+# probe.py
+from array import array
+import gc
+import time
+import uasyncio as asyncio
+import flicker
+
+# Lag histogram buckets: <1 ms, 1, 2-3, 4-7, ... 512-1023, >=1024 ms
+BUCKETS = 12
+RING = 64
+
+_mem_free = getattr(gc, 'mem_free', None)
+
+
+def _bucket(ms):
+    b = 0
+    while ms and b < BUCKETS - 1:
+        ms >>= 1
+        b += 1
+    return b
+
+
+def _push(ring, pos, value):
+    ring[pos] = value if value < 0xFFFF else 0xFFFF
+    return (pos + 1) % len(ring)
+
+
+class Probe:
+    """Event-loop health counters, off until start().
+
+    A probe task sleeps `period_ms` and records how late it woke up, as a
+    histogram and a ring of recent samples; a late wakeup means some task
+    held the loop. While running it also times every candle step in the
+    FlickerEngine and samples gc.mem_free(). A rise in free memory between
+    two samples means a collection ran in between, and that sample's lag
+    is kept as the pause estimate; collect() times an explicit one.
+
+    Tasks report their own wakeups with tick(task(name)). Everything is
+    fixed-size, so a running probe does not allocate; summary() formats
+    the lot for the REPL.
+    """
+
+    def __init__(self, period_ms=100, tasks=8):
+        self.period_ms = period_ms
+        self.lag_hist = array('L', [0] * BUCKETS)
+        self.lag = array('H', [0] * RING)        # ms
+        self.step = array('H', [0] * RING)       # us per candle step
+        self.mem = array('L', [0] * RING)        # bytes free
+        self.gc_pause = array('H', [0] * RING)   # ms
+        self._lag_i = self._step_i = self._mem_i = self._gc_i = 0
+        self.lag_max = 0
+        self.step_max = 0
+        self.step_n = 0
+        self.step_us = 0
+        self.gc_n = 0
+        self.samples = 0
+        self.names = []
+        self.ticks = array('L', [0] * tasks)
+        self._t = 0
+        self._wakeups = 0
+        self._task = None
+        self._engine = None
+
+    @property
+    def enabled(self):
+        return self._task is not None
+
+    def start(self, engine=None):
+        if self._task is not None:
+            return
+        self._engine = engine or flicker.get_engine()
+        self._engine.probe = self
+        self.reset()
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        self._engine.probe = None
+
+    def reset(self):
+        for a in (self.lag_hist, self.lag, self.step, self.mem, self.gc_pause, self.ticks):
+            for i in range(len(a)):
+                a[i] = 0
+        self._lag_i = self._step_i = self._mem_i = self._gc_i = 0
+        self.lag_max = self.step_max = self.step_n = self.step_us = self.gc_n = self.samples = 0
+        self._t = time.ticks_ms()
+        self._wakeups = self._engine.wakeups if self._engine else 0
+
+    # --- Feeds ---
+    def task(self, name):
+        """Index of the tick counter for `name`, registering it on first use."""
+        if name in self.names:
+            return self.names.index(name)
+        if len(self.names) == len(self.ticks):
+            raise ValueError('probe task table full')
+        self.names.append(name)
+        return len(self.names) - 1
+
+    def tick(self, i):
+        self.ticks[i] = (self.ticks[i] + 1) & 0x3FFFFFFF
+
+    def step_done(self, us):
+        # called by FlickerEngine around each Candle._step()
+        self._step_i = _push(self.step, self._step_i, us)
+        self.step_n = (self.step_n + 1) & 0x3FFFFFFF
+        self.step_us = (self.step_us + us) & 0x3FFFFFFF
+        if us > self.step_max:
+            self.step_max = us
+
+    def _gc(self, ms):
+        self._gc_i = _push(self.gc_pause, self._gc_i, ms)
+        self.gc_n += 1
+
+    def collect(self):
+        t = time.ticks_us()
+        gc.collect()
+        self._gc(time.ticks_diff(time.ticks_us(), t) // 1000)
+
+    async def _run(self):
+        me = self.task('probe')
+        period = self.period_ms
+        free = _mem_free() if _mem_free else 0
+        due = time.ticks_add(time.ticks_ms(), period)
+        while True:
+            await asyncio.sleep_ms(time.ticks_diff(due, time.ticks_ms()))
+            now = time.ticks_ms()
+            lag = time.ticks_diff(now, due)
+            if lag < 0:
+                lag = 0
+            self.tick(me)
+            self.samples += 1
+            self.lag_hist[_bucket(lag)] += 1
+            self._lag_i = _push(self.lag, self._lag_i, lag)
+            if lag > self.lag_max:
+                self.lag_max = lag
+            if _mem_free:
+                f = _mem_free()
+                if f > free:
+                    self._gc(lag)
+                free = f
+                # stored whole: _push() caps at 0xFFFF, for the 'H' rings
+                self.mem[self._mem_i] = f
+                self._mem_i = (self._mem_i + 1) % RING
+            # next deadline from now, so one long stall counts once
+            due = time.ticks_add(now, period)
+
+    # --- REPL ---
+    def percentile(self, p):
+        """Upper bound, in ms, of the lag bucket holding the p-th percentile."""
+        total = sum(self.lag_hist)
+        if not total:
+            return 0
+        want = total * p // 100
+        seen = 0
+        for b in range(BUCKETS):
+            seen += self.lag_hist[b]
+            if seen > want:
+                return min((1 << b) - 1, self.lag_max) if b < BUCKETS - 1 else self.lag_max
+        return self.lag_max
+
+    def summary(self):
+        secs = time.ticks_diff(time.ticks_ms(), self._t) / 1000 or 1
+        lines = ['lag ms: p50<=%d p99<=%d max %d  hist %s' % (
+            self.percentile(50), self.percentile(99), self.lag_max, list(self.lag_hist))]
+        ticks = ['%s %.1f' % (n, self.ticks[i] / secs) for i, n in enumerate(self.names)]
+        if self._engine is not None:
+            ticks.append('flicker %.1f' % ((self._engine.wakeups - self._wakeups) / secs))
+        lines.append('ticks/s: ' + ', '.join(ticks))
+        if self.step_n:
+            lines.append('candle step us: avg %d max %d' % (self.step_us // self.step_n, self.step_max))
+        if _mem_free and self.samples:
+            mem = self.mem[:min(self.samples, RING)]
+            lines.append('mem_free: last %d min %d' % (self.mem[(self._mem_i - 1) % RING], min(mem)))
+        if self.gc_n:
+            n = min(self.gc_n, RING)
+            lines.append('gc pauses: %d, max %d ms' % (self.gc_n, max(self.gc_pause[:n])))
+        return '\n'.join(lines)
+
+    def show(self):
+        print(self.summary())
+
+
+_probe = None
+
+
+def get_probe():
+    global _probe
+    if _probe is None:
+        _probe = Probe()
+    return _probe
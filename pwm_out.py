@@ -0,0 +1,178 @@
+# pwm_out.py
+from array import array
+from machine import Pin, PWM
+
+MAX = 65535
+
+
+class Writer:
+    """Staging shared by the output backends; they only implement _out().
+
+    stage() records a duty for a channel and flush() pushes every staged
+    channel in one pass, once per frame. A write is skipped when it matches
+    the cached duty, or moves it by no more than `deadband` (moves to fully
+    off or fully on always go through). Whatever passes is handed to
+    _out(ch, duty), which returns whether it changed the output, and
+    _show() runs once after a flush that changed anything.
+
+    Channels here are fixed positions 0..channels-1, shared by every
+    candle that asks for one and switched off when the last lets go.
+    """
+
+    def __init__(self, channels=0, deadband=0):
+        self.deadband = deadband
+        self._users = bytearray(channels)
+        self._last = array('H', bytes(2 * channels))
+        self._pending = array('H', bytes(2 * channels))
+        self._dirty = bytearray(channels)
+        self._queue = array('H', bytes(2 * channels))
+        self._n = 0
+
+        # Counters wrap at 2**30 so they stay small ints
+        self.issued = 0
+        self.suppressed = 0
+
+    def channel(self, pin, freq=5000):
+        """Channel at position `pin`; `freq` is ignored."""
+        if not 0 <= pin < len(self._users):
+            raise ValueError('no output %s' % pin)
+        self._users[pin] += 1
+        return pin
+
+    def release(self, ch):
+        self._users[ch] -= 1
+        if not self._users[ch]:
+            self.write(ch, 0)
+
+    @property
+    def free(self):
+        return sum(1 for u in self._users if not u)
+
+    def pwm(self, ch):
+        return None
+
+    def last(self, ch):
+        return self._last[ch]
+
+    def stage(self, ch, duty):
+        self._pending[ch] = duty
+        if not self._dirty[ch]:
+            self._dirty[ch] = 1
+            self._queue[self._n] = ch
+            self._n += 1
+
+    def write(self, ch, duty):
+        self.stage(ch, duty)
+        self.flush()
+
+    def _out(self, ch, duty):
+        raise NotImplementedError
+
+    def _show(self):
+        pass
+
+    def flush(self):
+        band = self.deadband
+        changed = False
+        for k in range(self._n):
+            ch = self._queue[k]
+            self._dirty[ch] = 0
+            duty = self._pending[ch]
+            d = duty - self._last[ch]
+            if d == 0 or (-band <= d <= band and duty != 0 and duty != MAX):
+                self.suppressed = (self.suppressed + 1) & 0x3FFFFFFF
+                continue
+            self._last[ch] = duty
+            if self._out(ch, duty):
+                self.issued = (self.issued + 1) & 0x3FFFFFFF
+                changed = True
+            else:
+                self.suppressed = (self.suppressed + 1) & 0x3FFFFFFF
+        self._n = 0
+        if changed:
+            self._show()
+
+    def reset_stats(self):
+        self.issued = 0
+        self.suppressed = 0
+
+
+class PWMWriter(Writer):
+    """Output layer between candles and machine.PWM.
+
+    Channels are handed out per pin: asking again for a pin that already
+    has one shares it, and a released channel's slot is reused. Once
+    `max_channels` pins are in use (the ESP32's 16 LEDC channels by
+    default, None for no limit) further pins are refused; bam_out.py can
+    drive more outputs than that.
+    """
+
+    def __init__(self, deadband=0, max_channels=16):
+        super().__init__(0, deadband)
+        self.max_channels = max_channels
+        self._pins = {}          # pin -> channel
+        self._pwm = []
+
+    def channel(self, pin, freq=5000):
+        """Channel for `pin`; raises ValueError when none is left."""
+        ch = self._pins.get(pin)
+        if ch is not None:
+            self._users[ch] += 1
+            return ch
+        if self.max_channels is not None and len(self._pins) >= self.max_channels:
+            raise ValueError('no free PWM channel for pin %s' % pin)
+        pwm = PWM(Pin(pin), freq=freq)
+        pwm.duty_u16(0)
+        if None in self._pwm:
+            ch = self._pwm.index(None)
+            self._pwm[ch] = pwm
+            self._last[ch] = 0
+        else:
+            ch = len(self._pwm)
+            self._pwm.append(pwm)
+            self._users.append(0)
+            self._last.append(0)
+            self._pending.append(0)
+            self._dirty.append(0)
+            self._queue.append(0)
+        self._users[ch] = 1
+        self._pins[pin] = ch
+        return ch
+
+    def release(self, ch):
+        """Drop one user of `ch`; the last one switches it off and frees it."""
+        self._users[ch] -= 1
+        if self._users[ch]:
+            return
+        if self._dirty[ch]:
+            self.flush()
+        self._pwm[ch].deinit()
+        self._pwm[ch] = None
+        for pin in self._pins:
+            if self._pins[pin] == ch:
+                del self._pins[pin]
+                break
+
+    @property
+    def free(self):
+        """Channels left before new pins are refused, None without a limit."""
+        if self.max_channels is None:
+            return None
+        return self.max_channels - len(self._pins)
+
+    def pwm(self, ch):
+        return self._pwm[ch]
+
+    def _out(self, ch, duty):
+        self._pwm[ch].duty_u16(duty)
+        return True
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = PWMWriter()
+    return _writer
@@ -0,0 +1,159 @@
+# schedule.py
+import struct
+import time
+from array import array
+import uasyncio as asyncio
+
+TABLE = 'hanukkah.bin'
+DAY = 86400
+# Longest single sleep; the wall clock is read again after each, so an
+# NTP correction or a long blocking call cannot make an event late
+_NAP_MS = 3600000
+# Days from the host's time epoch to 2000-01-01, which the ports count from
+_EPOCH = 10957 if time.gmtime(0)[0] == 1970 else 0
+
+
+class NightTable:
+    """Hanukkah first nights and candle counts, as host/hanukkah_table.py writes them.
+
+    No calendar math: `starts` holds the day (since 2000-01-01) of each
+    year's first night, and night k lights `counts[k - 1]` candles.
+    """
+
+    def __init__(self, path=TABLE):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.first_year, n = struct.unpack_from('<4sBHB', data)
+        if magic != b'HNKT' or version != 1 or len(data) != 16 + 2 * n:
+            raise ValueError('not a night table: %s' % path)
+        self.counts = data[8:16]
+        self.starts = array('H', data[16:])
+
+    def next_night(self, day):
+        """First Hanukkah night on or after `day`: (day, night 1-8), or (None, 0)."""
+        for s in self.starts:
+            if day < s + 8:
+                if day < s:
+                    day = s
+                return day, day - s + 1
+        return None, 0
+
+
+class Scheduler:
+    """Lights the menorah each night of Hanukkah and puts it out again.
+
+    At `at` minutes past local midnight (or `at[weekday]`, Monday first,
+    for an earlier Friday and a later Saturday) it runs light_sequence()
+    with that night's candle count, and `duration_min` later
+    extinguish_sequence(). Local time is UTC plus `tz_min`. The task waits
+    while the clock reads earlier than the table's first year, until
+    set_clock() sets it over NTP; call that once WiFi is up, main.py's
+    wifi task does.
+
+    Between events the task sleeps, waking at most hourly to re-read the
+    wall clock. It starts by putting the candles out; started inside a
+    night's window it then lights them straight away for what is left.
+    """
+
+    def __init__(self, menorah, table=TABLE, at=17 * 60, tz_min=0, duration_min=30, delay_ms=800):
+        self.menorah = menorah
+        self.table = NightTable(table) if isinstance(table, str) else table
+        self.at = at
+        self.tz = tz_min * 60
+        self.duration = duration_min * 60
+        self.delay_ms = delay_ms
+        self._task = None
+        self._clock = asyncio.Event()
+
+        self.night = 0      # night being shown, 0 when dark
+        self.next = None    # (on, off, night) of the next event, seconds since 2000
+        self.lit = 0        # nights lit since start
+
+    def _now(self):
+        t = int(time.time())
+        if time.gmtime(t)[0] < self.table.first_year:
+            return None
+        return t - _EPOCH * DAY
+
+    def _on(self, day):
+        at = self.at
+        if not isinstance(at, int):
+            at = at[(day + 5) % 7]  # 2000-01-01 was a Saturday
+        return day * DAY + at * 60 - self.tz
+
+    def next_event(self, now):
+        """(on, off, night) of the first window that has not ended by `now`, or None."""
+        day = (now + self.tz) // DAY - 1  # yesterday's may run past midnight
+        while True:
+            day, night = self.table.next_night(day)
+            if day is None:
+                return None
+            on = self._on(day)
+            if on + self.duration > now:
+                return on, on + self.duration, night
+            day += 1
+
+    def set_clock(self):
+        """Set the clock over NTP and wake the task; True if it is set."""
+        try:
+            import ntptime
+            ntptime.settime()
+        except Exception as e:
+            print('schedule: NTP failed:', e)
+        self._clock.set()
+        return self._now() is not None
+
+    async def _sleep_until(self, t):
+        while True:
+            now = self._now()
+            if now is not None and now >= t:
+                return
+            await asyncio.sleep_ms(_NAP_MS if now is None else min((t - now) * 1000, _NAP_MS))
+
+    async def run(self):
+        m = self.menorah
+        while self._now() is None:
+            self._clock.clear()
+            await self._clock.wait()
+        first = True
+        while True:
+            ev = self.next = self.next_event(self._now())
+            if ev is None:
+                print('schedule: past the end of the night table')
+                return
+            on, off, night = ev
+            if first:
+                m.off_all()
+                first = False
+            await self._sleep_until(on)
+            self.night = night
+            await m.light_sequence(self.delay_ms, self.table.counts[night - 1])
+            await self._sleep_until(off)
+            await m.extinguish_sequence()
+            self.night = 0
+            self.lit += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._clock = asyncio.Event()
+
+    # --- REPL ---
+    def summary(self):
+        if self._now() is None:
+            return 'clock not set, waiting for NTP'
+        if self.next is None:
+            return 'night %d, nothing scheduled, %d nights lit' % (self.night, self.lit)
+        on, off, night = self.next
+        y, mo, d, h, mi = time.gmtime(on + _EPOCH * DAY + self.tz)[:5]
+        return 'night %d, next night %d at %04d-%02d-%02d %02d:%02d for %d min, %d nights lit' % (
+            self.night, night, y, mo, d, h, mi, (off - on) // 60, self.lit)
+
+    def show(self):
+        print(self.summary())
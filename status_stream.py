@@ -0,0 +1,167 @@
+# status_stream.py
+from array import array
+import time
+import uasyncio as asyncio
+
+_HEX = b'0123456789abcdef'
+_REC = 6  # one candle: index, on, duty as 4 hex digits
+
+HEADER = (b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+          b'Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n')
+_PING = b':\n\n'
+
+
+def _backlog(writer):
+    # bytes written but not yet taken by the socket
+    try:
+        return len(writer.out_buf)
+    except AttributeError:
+        return writer.transport.get_write_buffer_size()
+
+
+class StatusStream:
+    """Live candle state pushed as Server-Sent Events.
+
+    Each event is one line of fixed-size records, `data:` followed by
+    "<candle><on><duty>" per candle, all hex, e.g. "31ffff" for candle 3
+    lit at full duty. A new subscriber first gets every candle, after that
+    only candles whose state changed since the previous event are sent.
+
+    One task samples the candles at most `max_hz` times a second, builds
+    the event once into a shared buffer and wakes all subscribers to send
+    that same object, so the per-event work does not depend on how many
+    are listening. A subscriber still sending the previous event when the
+    next one is ready, stuck for longer than `drain_ms`, or with more than
+    `max_backlog` bytes its socket has not taken yet is dropped instead
+    of being buffered for.
+    """
+
+    def __init__(self, candles, max_hz=10, max_clients=8, drain_ms=500, max_backlog=256,
+                 heartbeat_ms=15000):
+        self.candles = candles
+        self.max_hz = max_hz
+        self.max_clients = max_clients
+        self.drain_ms = drain_ms
+        self.max_backlog = max_backlog
+        self.heartbeat_ms = heartbeat_ms
+        n = len(candles)
+        self._on = bytearray(n)
+        self._duty = array('H', [0] * n)
+        self._buf = bytearray(b'data:' + bytes(n * _REC + 2))
+        self.frame = b''
+        self.seq = 0
+        self._event = asyncio.Event()
+        self._clients = 0
+        self._task = None
+        self._closing = False
+
+        # Stats
+        self.frames = 0
+        self.dropped = 0
+        self.busy_us = 0
+
+    def _put(self, j, i):
+        buf = self._buf
+        duty = self._duty[i]
+        buf[j] = _HEX[i & 15]
+        buf[j + 1] = 48 + self._on[i]
+        buf[j + 2] = _HEX[duty >> 12]
+        buf[j + 3] = _HEX[duty >> 8 & 15]
+        buf[j + 4] = _HEX[duty >> 4 & 15]
+        buf[j + 5] = _HEX[duty & 15]
+        return j + _REC
+
+    def _end(self, j):
+        if j == 5:
+            return 0
+        self._buf[j] = 10
+        self._buf[j + 1] = 10
+        return j + 2
+
+    def _delta(self):
+        """Sample the candles and encode the ones that changed; returns the length."""
+        j = 5
+        for i, c in enumerate(self.candles):
+            on = 1 if c.is_on else 0
+            duty = c.out.last(c.ch)
+            if on != self._on[i] or duty != self._duty[i]:
+                self._on[i] = on
+                self._duty[i] = duty
+                j = self._put(j, i)
+        return self._end(j)
+
+    def _full(self):
+        # the state the last event left subscribers in, so the next delta
+        # applies to it exactly
+        j = 5
+        for i in range(len(self.candles)):
+            j = self._put(j, i)
+        return self._end(j)
+
+    async def _run(self):
+        period = 1000 // self.max_hz
+        quiet = 0
+        try:
+            while self._clients:
+                await asyncio.sleep_ms(period)
+                t0 = time.ticks_us()
+                n = self._delta()
+                if n:
+                    quiet = 0
+                    self.frame = bytes(self._buf[:n])
+                else:
+                    quiet += period
+                    if quiet < self.heartbeat_ms:
+                        continue
+                    quiet = 0
+                    self.frame = _PING
+                self.seq = (self.seq + 1) & 0x3FFFFFFF
+                self.frames += 1
+                self._event.set()
+                self._event.clear()
+                self.busy_us = (self.busy_us + time.ticks_diff(time.ticks_us(), t0)) & 0x3FFFFFFF
+        finally:
+            self._task = None
+
+    def close(self):
+        """End every subscription; new ones may follow."""
+        self._closing = True
+        self._event.set()
+        self._event.clear()
+
+    async def subscribe(self, writer):
+        """Stream events to `writer` until it falls behind or goes away."""
+        if self._clients >= self.max_clients:
+            writer.write(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+            return
+        self._clients += 1
+        self._closing = False
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            # no drain here: that would leave a gap in which the next
+            # event could slip past; the first event's drain sends this too
+            seq = self.seq
+            writer.write(HEADER)
+            writer.write(self._buf[:self._full()])
+            while True:
+                await self._event.wait()
+                if self._closing:
+                    return
+                if self.seq != (seq + 1) & 0x3FFFFFFF:
+                    # missed an event while draining
+                    self.dropped += 1
+                    return
+                seq = self.seq
+                writer.write(self.frame)
+                if _backlog(writer) > self.max_backlog:
+                    self.dropped += 1
+                    return
+                await asyncio.wait_for_ms(writer.drain(), self.drain_ms)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+        except OSError:
+            pass  # client went away
+        finally:
+            self._clients -= 1
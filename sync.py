@@ -0,0 +1,232 @@
+# sync.py
+import random
+import socket
+import struct
+import time
+import uasyncio as asyncio
+import flicker
+import prng
+
+# Beacon: magic, version, seed, epoch, rekey_ms, now, lit mask
+_FMT = '>2sBHIHIH'
+_MAGIC = b'MF'
+_SIZE = struct.calcsize(_FMT)
+
+# The esp32 port only has IP_ADD_MEMBERSHIP; lwIP then sends multicast
+# from the default interface. The sender options are set where they exist.
+_MULTICAST_OPTS = ('IP_MULTICAST_IF', 'IP_MULTICAST_TTL', 'IP_MULTICAST_LOOP')
+
+
+def _inet(ip):
+    # socket.inet_aton is not in the esp32 port
+    return bytes(int(x) for x in ip.split('.'))
+
+
+def _mix(seed, epoch, i):
+    # PRNG state of candle i for one epoch; identical on every node
+    x = (seed ^ (epoch * 0x9E37) ^ ((i + 1) * 0x7F4B)) & 0xFFFF or 1
+    for _ in range(4):
+        x = prng.step(x)
+    return x
+
+
+class FlickerSync:
+    """Plays the same flicker on several menorahs from one UDP beacon.
+
+    The leader multicasts a small beacon (seed, epoch start, rekey period,
+    its clock and which candles are lit) every `beacon_ms` and whenever a
+    candle goes on or off. Nothing is sent per flicker frame. Every
+    `rekey_ms` from the epoch start each candle restarts its PRNG from a
+    state derived from (seed, epoch number, candle index), and its frames
+    follow from there on the exact, unrounded schedule of its own sleeps.
+    Any node that knows the group clock can therefore compute the frame
+    due at any moment, and a follower that joins late or lights a candle
+    late only replays at most one rekey period of PRNG steps.
+
+    The leader moves the epoch start up to the latest rekey boundary every
+    `rebase_ms`, with the next seed, and beacons it at once, so epoch
+    numbers stay small and `k * rekey_ms` never leaves the ticks range.
+
+    Followers keep `engine.offset` (group clock minus local ticks_ms)
+    from the beacons. Small errors are slewed out at most `slew_ms` per
+    poll so the flicker never jumps; errors over `step_ms` are stepped.
+    """
+
+    def __init__(self, candles, engine=None, group='239.77.1.1', port=5717, iface='0.0.0.0',
+                 rekey_ms=10000, beacon_ms=1000, poll_ms=50, slew_ms=1, step_ms=250,
+                 rebase_ms=3600000):
+        self.candles = candles
+        self.engine = engine or flicker.get_engine()
+        self.group = group
+        self.port = port
+        self.iface = iface
+        self.rekey_ms = rekey_ms
+        self.beacon_ms = beacon_ms
+        self.poll_ms = poll_ms
+        self.slew_ms = slew_ms
+        self.step_ms = step_ms
+        self.rebase_ms = rebase_ms
+        for i, c in enumerate(candles):
+            c._sync_id = i
+        self.seed = 0
+        self.epoch = 0
+        self._buf = bytearray(_SIZE)
+        self._sock = None
+        self._target = 0
+        self.mask = 0
+
+        # Stats
+        self.sent = 0
+        self.received = 0
+        self.error = 0      # last measured offset error, ms
+        self.steps = 0      # hard clock steps
+        self.rebases = 0    # epoch moves, on the leader
+
+    # --- Schedule, called by FlickerEngine ---
+    def rekey(self, c, k):
+        c._epoch = k
+        start = time.ticks_add(self.epoch, k * self.rekey_ms)
+        c._epoch_end = time.ticks_add(start, self.rekey_ms)
+        c.seed(_mix(self.seed, k, c._sync_id))
+        c._due = start
+
+    def place(self, c, now):
+        """Put candle `c` on the frame the group plays at time `now`."""
+        k = time.ticks_diff(now, self.epoch) // self.rekey_ms
+        self.rekey(c, k if k > 0 else 0)
+        due = c._due
+        while True:
+            nxt = time.ticks_add(due, c._sleep[c._i])
+            if time.ticks_diff(nxt, now) > 0:
+                break
+            c._skip()
+            due = nxt
+        c._due = due
+
+    def _adopt(self, seed, epoch, rekey_ms):
+        self.seed = seed
+        self.epoch = epoch
+        self.rekey_ms = rekey_ms
+        e = self.engine
+        e.sync = self
+        now = time.ticks_add(time.ticks_ms(), e.offset)
+        for c in self.candles:
+            if c._queued:
+                self.place(c, now)
+
+    def _rebase(self, now):
+        # restart the epoch count at the last rekey boundary; the next
+        # seed keeps the new epochs from replaying the old ones
+        k = time.ticks_diff(now, self.epoch) // self.rekey_ms
+        self._adopt(prng.step(self.seed or 1), time.ticks_add(self.epoch, k * self.rekey_ms),
+                    self.rekey_ms)
+        self.rebases += 1
+
+    # --- Network ---
+    def _open(self, leader):
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        iface = _inet(self.iface)
+        if leader:
+            for name, value in zip(_MULTICAST_OPTS, (iface, 1, 1)):
+                opt = getattr(socket, name, None)
+                if opt is not None:
+                    s.setsockopt(socket.IPPROTO_IP, opt, value)
+        else:
+            s.bind(('0.0.0.0', self.port))
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, _inet(self.group) + iface)
+        s.setblocking(False)
+        self._sock = s
+        self._addr = socket.getaddrinfo(self.group, self.port)[0][-1]
+
+    def _mask(self):
+        m = 0
+        for i, c in enumerate(self.candles):
+            if c.is_on:
+                m |= 1 << i
+        return m
+
+    def _send(self, now, mask):
+        struct.pack_into(_FMT, self._buf, 0, _MAGIC, 1, self.seed, self.epoch,
+                         self.rekey_ms, now, mask)
+        try:
+            self._sock.sendto(self._buf, self._addr)
+            self.sent += 1
+        except OSError:
+            pass  # no route yet; the next beacon retries
+
+    def stop(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self.engine.sync = None
+        self.engine.offset = 0
+
+    async def lead(self, seed=None):
+        """Run as the leader until cancelled; the group follows this node's clock."""
+        self._open(True)
+        e = self.engine
+        e.offset = 0
+        self._adopt(seed if seed is not None else random.getrandbits(16), time.ticks_ms(),
+                    self.rekey_ms)
+        last = None
+        quiet = 0
+        try:
+            while True:
+                if time.ticks_diff(time.ticks_ms(), self.epoch) >= self.rebase_ms:
+                    self._rebase(time.ticks_ms())
+                    last = None  # beacon the new epoch now
+                mask = self._mask()
+                if mask != last or quiet >= self.beacon_ms:
+                    self._send(time.ticks_ms(), mask)
+                    last = mask
+                    quiet = 0
+                await asyncio.sleep_ms(self.poll_ms)
+                quiet += self.poll_ms
+        finally:
+            self.stop()
+
+    async def follow(self):
+        """Track the leader's beacons until cancelled."""
+        self._open(False)
+        e = self.engine
+        locked = False
+        try:
+            while True:
+                while True:
+                    try:
+                        data = self._sock.recv(_SIZE + 1)
+                    except OSError:
+                        break  # nothing waiting
+                    if len(data) != _SIZE:
+                        continue
+                    magic, ver, seed, epoch, rekey, now, mask = struct.unpack(_FMT, data)
+                    if magic != _MAGIC or ver != 1:
+                        continue
+                    self.received += 1
+                    self._target = time.ticks_diff(now, time.ticks_ms())
+                    if not locked or seed != self.seed or epoch != self.epoch or rekey != self.rekey_ms:
+                        e.offset = self._target
+                        self._adopt(seed, epoch, rekey)
+                        locked = True
+                    if mask != self.mask:
+                        self.mask = mask
+                        for i, c in enumerate(self.candles):
+                            if mask >> i & 1:
+                                if not c.is_on:
+                                    c.on()
+                            elif c.is_on:
+                                c.off()
+                if locked:
+                    err = self._target - e.offset
+                    self.error = err
+                    if err > self.step_ms or err < -self.step_ms:
+                        e.offset = self._target
+                        self.steps += 1
+                    elif err > 0:
+                        e.offset += self.slew_ms if err > self.slew_ms else err
+                    elif err < 0:
+                        e.offset -= self.slew_ms if -err > self.slew_ms else -err
+                await asyncio.sleep_ms(self.poll_ms)
+        finally:
+            self.stop()
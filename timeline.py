@@ -0,0 +1,197 @@
+# timeline.py
+from array import array
+import time
+import uasyncio as asyncio
+from curves import EASE, EASE_NAMES
+
+NONE = 0xFFFF
+FULL = 256  # Candle.level for 100%
+
+def _candles(spec):
+    # "3", "1-8", "0,2,4" or "*"
+    if spec == '*':
+        return None
+    out = []
+    for part in spec.split(','):
+        if '-' in part:
+            a, b = part.split('-', 1)
+            out.extend(range(int(a), int(b) + 1))
+        else:
+            out.append(int(part))
+    return out
+
+
+class Sequence:
+    """Keyframes for a set of candles, flattened into arrays at load time.
+
+    Text format, one keyframe per line, '#' starts a comment:
+
+        time_ms  candles  level%  [width%|-  [ease]]
+
+    `candles` is an index, a range "1-8", a list "0,2,4" or "*". At
+    `time_ms` each listed candle reaches `level` (0-100, scaling its
+    flicker) and `width`, easing from its previous keyframe with one of
+    linear, in, out, inout or step.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.t = array('l')       # keyframe time, ms from start
+        self.candle = array('B')
+        self.level = array('H')   # 0..FULL
+        self.width = array('b')   # 0..100, -1 keeps the current width
+        self.ease = array('B')
+        self.nxt = array('H')     # next keyframe for the same candle
+        self.first = array('H', [NONE] * n)
+        self.duration = 0
+
+    def add(self, t_ms, candles, level, width=-1, ease='linear'):
+        if candles is None:
+            candles = range(self.n)
+        e = EASE_NAMES.index(ease)
+        if not 0 <= level <= 100:
+            raise ValueError('level must be 0..100')
+        if not -1 <= width <= 100:
+            raise ValueError('width must be 0..100, or -1 to leave it')
+        for c in candles:
+            if not 0 <= c < self.n:
+                raise ValueError('candle %d out of range' % c)
+            self.t.append(t_ms)
+            self.candle.append(c)
+            self.level.append(level * FULL // 100)
+            self.width.append(width)
+            self.ease.append(e)
+        if t_ms > self.duration:
+            self.duration = t_ms
+        return self
+
+    def compile(self):
+        """Order keyframes by time and link each candle's track."""
+        order = sorted(range(len(self.t)), key=lambda k: self.t[k])
+        for name in ('t', 'candle', 'level', 'width', 'ease'):
+            a = getattr(self, name)
+            setattr(self, name, array(a.typecode, [a[k] for k in order]))
+        self.nxt = array('H', [NONE] * len(self.t))
+        self.first = array('H', [NONE] * self.n)
+        last = [NONE] * self.n
+        for k in range(len(self.t)):
+            c = self.candle[k]
+            if last[c] == NONE:
+                self.first[c] = k
+            else:
+                self.nxt[last[c]] = k
+            last[c] = k
+        return self
+
+    @classmethod
+    def parse(cls, lines, n=9):
+        seq = cls(n)
+        for line in lines:
+            line = line.split('#', 1)[0].split()
+            if not line:
+                continue
+            width = -1
+            if len(line) > 3 and line[3] != '-':
+                width = int(line[3])
+            ease = line[4] if len(line) > 4 else 'linear'
+            seq.add(int(line[0]), _candles(line[1]), int(line[2]), width, ease)
+        return seq.compile()
+
+    @classmethod
+    def load(cls, path, n=9):
+        with open(path) as f:
+            return cls.parse(f, n)
+
+
+class Timeline:
+    """Plays a Sequence over a list of candles from one fixed-rate frame loop.
+
+    Frame times come from absolute ticks_ms deadlines measured from the
+    start, so per-frame work never accumulates as drift; late frames are
+    skipped rather than queued. Candles keep flickering underneath: the
+    timeline only moves their level and width. All per-candle state lives
+    in preallocated arrays, so a frame does not allocate.
+    """
+
+    def __init__(self, candles, frame_ms=20):
+        self.candles = candles
+        self.frame_ms = frame_ms
+        n = len(candles)
+        self._key = array('H', [NONE] * n)    # keyframe each candle is heading to
+        self._t0 = array('l', [0] * n)        # start of the current segment
+        self._lv0 = array('H', [0] * n)       # level at segment start
+        self._w0 = array('b', [0] * n)        # width at segment start
+        self.frames = 0
+        self.skipped = 0
+
+    def _start(self, seq):
+        for i, c in enumerate(self.candles):
+            self._key[i] = seq.first[i] if i < seq.n else NONE
+            self._t0[i] = 0
+            self._lv0[i] = c.level if c.enabled else 0
+            self._w0[i] = int(c.width)
+
+    def _frame(self, seq, t):
+        """Advance every candle to time `t`; returns True once all tracks ended."""
+        done = True
+        for i in range(len(self.candles)):
+            k = self._key[i]
+            if k == NONE:
+                continue
+            c = self.candles[i]
+            # hop over keyframes already passed
+            while k != NONE and t >= seq.t[k]:
+                self._t0[i] = seq.t[k]
+                self._lv0[i] = seq.level[k]
+                if seq.width[k] >= 0:
+                    self._w0[i] = seq.width[k]
+                last = k
+                k = seq.nxt[k]
+            self._key[i] = k
+            if k == NONE:
+                # track finished: land exactly on the last keyframe
+                level = seq.level[last]
+                width = self._w0[i]
+            else:
+                done = False
+                span = seq.t[k] - self._t0[i]
+                p = (t - self._t0[i]) * 256 // span if span > 0 else 256
+                e = EASE[seq.ease[k]][p]
+                lv0 = self._lv0[i]
+                level = lv0 + (seq.level[k] - lv0) * e // 256
+                width = self._w0[i]
+                if seq.width[k] >= 0:
+                    width += (seq.width[k] - width) * e // 256
+            if width != c.width:
+                c.width = width
+            if level:
+                c.level = level
+                if not c.enabled:
+                    c.on(0)
+                c._emit()
+            else:
+                c.level = FULL
+                if c.enabled:
+                    c.off(0)
+        return done
+
+    async def play(self, seq):
+        self._start(seq)
+        start = time.ticks_ms()
+        frame = 0
+        while True:
+            t = time.ticks_diff(time.ticks_ms(), start)
+            done = self._frame(seq, t)
+            self.candles[0].out.flush()
+            self.frames += 1
+            if done:
+                return
+            frame += 1
+            wait = time.ticks_diff(time.ticks_add(start, frame * self.frame_ms), time.ticks_ms())
+            if wait < 0:
+                # behind: drop the missed frames instead of running them late
+                missed = -wait // self.frame_ms + 1
+                frame += missed
+                self.skipped += missed
+                wait += missed * self.frame_ms
+            await asyncio.sleep_ms(wait)
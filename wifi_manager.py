@@ -1,50 +1,79 @@
 import network
-import socket
-import ujson
+import ubinascii
 import machine
+import random
 import time
+import uasyncio as asyncio
+from httpreq import RequestParser, HTTPError, REASONS, reject, close
+from credstore import CredentialStore
+
+# Fixed portal page chunks; the SSID options and saved-network items are
+# cached fragments written between them.
+_PAGE_HEAD = (b'<html><head><title>WiFi Setup</title></head><body>'
+              b'<h3>Select a scanned SSID or enter one manually</h3>'
+              b'<form method="post">'
+              b'Scanned: <select name="ssid_select">'
+              b'<option value="">--choose--</option>')
+_PAGE_MID = (b'</select> <a href="/?scan">Rescan</a><br>'
+             b'Or SSID: <input name="ssid_manual"><br>'
+             b'Password: <input name="password" type="password"><br>'
+             b'<input type="submit" value="Add/Update">'
+             b'</form>'
+             b'<p>Saved networks:</p><ul>')
+_PAGE_TAIL = b'</ul></body></html>'
+
+
+# WLAN.status() values that mean "give up on this AP now"
+_FAILED = tuple(getattr(network, n) for n in
+                ('STAT_WRONG_PASSWORD', 'STAT_NO_AP_FOUND', 'STAT_CONNECT_FAIL')
+                if hasattr(network, n))
+
+
+def _escape(s):
+    return s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
 
 
 class WiFiManager:
     CONFIG_FILE = 'wifi.json'
 
-    def __init__(self, ap_ssid=None):
+    def __init__(self, ap_ssid=None, config_file=None):
         uid = ''.join('{:02x}'.format(b) for b in machine.unique_id())
+        self.store = CredentialStore(config_file or self.CONFIG_FILE)
         self.ap_ssid = ap_ssid or ('Candle-Setup-' + uid[-4:])
         self.adapter={'sta': network.WLAN(network.STA_IF),
                     'ap': network.WLAN(network.AP_IF)}
+        # Last scan result and cached portal fragments
+        self._scan_map = {}
+        self._scan_ap = {}  # ssid -> (bssid, channel) of the strongest AP
+        self._ssid_html = None
+        self._ssid_cur = None
+        self._saved_html = None
+        self._saved_gen = None
+        self._scan_t = None  # ticks_ms of the last scan
+        # Phase timings (ms) of the last connect()
+        self.metrics = {}
+        # Link supervisor state, see supervise()
+        self.link = {'rssi': None, 'drops': 0, 'reconnects': 0, 'failures': 0,
+                     'backoff_ms': 0, 'radio_ms': 0}
 
     # ---------- Config file helpers ----------
-    def _load_config(self):
-        try:
-            with open(self.CONFIG_FILE, 'r') as f:
-                cfg = ujson.load(f)
-                if isinstance(cfg, dict) and 'networks' in cfg:
-                    return cfg
-        except Exception:
-            pass
-        return {'networks': []}
+    def _add_or_update_network(self, ssid, password):
+        self.store.put(ssid, password)
+        self.store.save()
 
-    def _save_all(self, cfg):
-        with open(self.CONFIG_FILE, 'w') as f:
-            ujson.dump(cfg, f)
+    def _remember(self, ssid):
+        # Last good AP, tried directly on the next boot before scanning
+        bssid, channel = self._scan_ap.get(ssid, (None, None))
+        self.store.last = {'ssid': ssid,
+                           'bssid': ubinascii.hexlify(bssid).decode() if bssid else None,
+                           'channel': channel}
 
-    def _add_or_update_network(self, ssid, password):
-        cfg = self._load_config()
-        nets = cfg.get('networks', [])
-        # update if exists
-        for n in nets:
-            if n.get('ssid') == ssid:
-                n['password'] = password
-                self._save_all({'networks': nets})
-                return
-        # append new
-        nets.append({'ssid': ssid, 'password': password})
-        self._save_all({'networks': nets})
+    def _succeeded(self, ssid, rssi=None):
+        self.store.connected(ssid, time.time(), rssi)
+        self.store.save()
 
     def get_saved_networks(self):
-        cfg = self._load_config()
-        return cfg.get('networks', [])
+        return self.store.networks()
 
     # ---------- Scanning & connecting ----------
     def _scan(self):
@@ -61,81 +90,219 @@ class WiFiManager:
             ssid = item[0].decode('utf-8') if isinstance(item[0], (bytes, bytearray)) else str(item[0])
             rssi = item[3]
             # keep best rssi per SSID
-            if ssid in result:
-                if rssi > result[ssid]:
-                    result[ssid] = rssi
-            else:
+            if ssid not in result or rssi > result[ssid]:
                 result[ssid] = rssi
+                self._scan_ap[ssid] = (item[1], item[2])
+        self._scan_t = time.ticks_ms()
+        if result != self._scan_map:
+            self._scan_map = result
+            self._ssid_html = None
         return result
 
-    def connect(self, per_network_timeout=8):
-        """Try to connect to saved networks; prefer the strongest available saved network.
-        Returns True on success."""
-        saved = self.get_saved_networks()
-        if not saved:
+    async def _try_connect(self, ssid, pwd, bssid, timeout_ms, poll_ms):
+        sta = self.adapter['sta']
+        try:
+            if bssid:
+                sta.connect(ssid, pwd, bssid=bssid)
+            else:
+                sta.connect(ssid, pwd)
+        except Exception as e:
+            print('Error connecting to', ssid, e)
             return False
+        t0 = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), t0) < timeout_ms:
+            if sta.isconnected():
+                print('Connected to', ssid)
+                return True
+            if sta.status() in _FAILED:
+                break
+            await asyncio.sleep_ms(poll_ms)
+        # if not connected, disconnect and try next
+        try:
+            sta.disconnect()
+        except Exception:
+            pass
+        return False
 
-        scan_map = self._scan()
-        # networks seen with RSSI
-        candidates = []
-        for n in saved:
-            ssid = n.get('ssid')
-            pwd = n.get('password', '')
-            rssi = scan_map.get(ssid, None)
-            candidates.append((ssid, pwd, rssi if rssi is not None else -9999))
+    async def connect(self, per_network_timeout=8, poll_ms=100, rescan=True):
+        """Try to connect to saved networks; returns True on success.
 
-        # prefer highest rssi
-        candidates.sort(key=lambda x: x[2], reverse=True)
+        The AP that worked last time is tried directly first. Failing that,
+        saved networks seen in a scan are tried in CredentialStore.ordered()
+        order (priority, then signal, then last success); with rescan=False
+        the previous scan is reused if there is one. Phase timings in ms are
+        left in self.metrics."""
+        t_start = time.ticks_ms()
+        m = self.metrics = {}
+        store = self.store
+        if not store.networks():
+            return False
 
         sta = self.adapter['sta']
         if not sta.active():
             sta.active(True)
+        timeout_ms = per_network_timeout * 1000
 
-        for ssid, pwd, rssi in candidates:
-            try:
-                print('Trying', ssid, 'rssi', rssi)
-                sta.connect(ssid, pwd)
-                for _ in range(per_network_timeout):
-                    if sta.isconnected():
-                        print('Connected to', ssid)
-                        return True
-                    time.sleep(1)
-                # if not connected, disconnect and try next
+        # fast path: last good AP, no scan
+        last = store.last
+        n = store.get(last.get('ssid'))
+        if n is not None:
+            t = time.ticks_ms()
+            bssid = last.get('bssid')
+            bssid = ubinascii.unhexlify(bssid) if bssid else None
+            print('Trying last', n['ssid'])
+            ok = await self._try_connect(n['ssid'], n.get('password', ''), bssid, timeout_ms, poll_ms)
+            m['fast_ms'] = time.ticks_diff(time.ticks_ms(), t)
+            if ok:
+                self._succeeded(n['ssid'])
+                m['path'] = 'fast'
+                m['total_ms'] = time.ticks_diff(time.ticks_ms(), t_start)
+                return True
+
+        t = time.ticks_ms()
+        scan_map = self._scan() if rescan or self._scan_t is None else self._scan_map
+        m['scan_ms'] = time.ticks_diff(time.ticks_ms(), t)
+        t = time.ticks_ms()
+        ok = False
+        # only saved networks that are actually on the air
+        for n in store.ordered(scan_map):
+            ssid = n['ssid']
+            rssi = scan_map[ssid]
+            print('Trying', ssid, 'rssi', rssi)
+            if await self._try_connect(ssid, n.get('password', ''), None, timeout_ms, poll_ms):
+                self._remember(ssid)
+                self._succeeded(ssid, rssi)
+                m['path'] = 'scan'
+                ok = True
+                break
+        m['connect_ms'] = time.ticks_diff(time.ticks_ms(), t)
+        m['total_ms'] = time.ticks_diff(time.ticks_ms(), t_start)
+        return ok or sta.isconnected()
+
+    async def supervise(self, check_ms=2000, min_backoff_ms=2000, max_backoff_ms=120000,
+                        radio_pct=20, scan_max_age_ms=300000, per_network_timeout=8):
+        """Watch the STA link and reconnect in the background; runs until cancelled.
+
+        Checks isconnected() and RSSI every `check_ms`. After a drop it
+        reconnects with jittered exponential backoff, reusing the cached scan
+        unless it is older than `scan_max_age_ms`. Attempts are spaced so they
+        keep the radio busy at most `radio_pct` percent of the time. State is
+        kept in self.link."""
+        sta = self.adapter['sta']
+        link = self.link
+        fails = 0
+        up = sta.isconnected()
+        radio_free = time.ticks_ms()  # earliest start of the next attempt
+        while True:
+            await asyncio.sleep_ms(check_ms)
+            if sta.isconnected():
+                up = True
+                fails = 0
+                link['backoff_ms'] = 0
                 try:
-                    sta.disconnect()
+                    link['rssi'] = sta.status('rssi')
                 except Exception:
-                    pass
+                    link['rssi'] = None
+                continue
+
+            if up:
+                up = False
+                link['drops'] += 1
+                link['rssi'] = None
+                print('WiFi link lost')
+
+            wait = time.ticks_diff(radio_free, time.ticks_ms())
+            if wait > 0:
+                await asyncio.sleep_ms(wait)
+                if sta.isconnected():
+                    continue
+
+            rescan = self._scan_t is None or time.ticks_diff(time.ticks_ms(), self._scan_t) > scan_max_age_ms
+            t = time.ticks_ms()
+            try:
+                ok = await self.connect(per_network_timeout, rescan=rescan)
             except Exception as e:
-                print('Error connecting to', ssid, e)
-        return sta.isconnected()
+                print('WiFi reconnect error:', e)
+                ok = False
+            busy = time.ticks_diff(time.ticks_ms(), t)
+            link['radio_ms'] += busy
+            # radio duty cycle: busy / (busy + idle) <= radio_pct / 100
+            radio_free = time.ticks_add(time.ticks_ms(), busy * (100 - radio_pct) // radio_pct)
+            if ok:
+                up = True
+                fails = 0
+                link['reconnects'] += 1
+                link['backoff_ms'] = 0
+                continue
+
+            fails += 1
+            link['failures'] += 1
+            backoff = min_backoff_ms << min(fails - 1, 16)
+            if backoff > max_backoff_ms:
+                backoff = max_backoff_ms
+            # full jitter over the upper half keeps several boards from retrying in step
+            backoff = random.randint(backoff // 2, backoff)
+            link['backoff_ms'] = backoff
+            # the check_ms sleep at the top of the loop is part of the wait
+            if backoff > check_ms:
+                await asyncio.sleep_ms(backoff - check_ms)
+
+    # ---------- Config portal ----------
+    def _ssid_fragment(self):
+        sta = self.adapter['sta']
+        cur = sta.config('essid') if sta.isconnected() else None
+        if self._ssid_html is None or cur != self._ssid_cur:
+            parts = []
+            for ss, r in sorted(self._scan_map.items(), key=lambda x: x[1], reverse=True):
+                e = _escape(ss)
+                if ss == cur:
+                    parts.append('<option value="%s">%s ** (%d)</option>' % (e, e, r))
+                else:
+                    parts.append('<option value="%s">%s (%d)</option>' % (e, e, r))
+            self._ssid_html = ''.join(parts).encode()
+            self._ssid_cur = cur
+        return self._ssid_html
 
-    # ---------- Simple URL decode ----------
-    def _urldecode(self, s):
-        if not s:
+    def _saved_fragment(self):
+        self.store.refresh()
+        if self._saved_html is None or self.store.gen != self._saved_gen:
+            parts = ['<li>%s</li>' % _escape(n.get('ssid', '')) for n in self.get_saved_networks()]
+            self._saved_html = ''.join(parts).encode()
+            self._saved_gen = self.store.gen
+        return self._saved_html
+
+    def _write_page(self, writer):
+        ssids = self._ssid_fragment()
+        saved = self._saved_fragment()
+        n = len(_PAGE_HEAD) + len(ssids) + len(_PAGE_MID) + len(saved) + len(_PAGE_TAIL)
+        writer.write(('HTTP/1.0 200 OK\r\nContent-Type: text/html\r\n'
+                      'Content-Length: %d\r\n\r\n' % n).encode())
+        writer.write(_PAGE_HEAD)
+        writer.write(ssids)
+        writer.write(_PAGE_MID)
+        writer.write(saved)
+        writer.write(_PAGE_TAIL)
+
+    def _save_form(self, fields):
+        """Store the network from decoded form fields; returns the SSID or ''."""
+        ssid = fields.get(b'ssid_manual')
+        if ssid is None or not len(ssid):
+            ssid = fields.get(b'ssid_select')
+        if ssid is None or not len(ssid):
             return ''
-        s = s.replace('+', ' ')
-        res = ''
-        i = 0
-        L = len(s)
-        while i < L:
-            ch = s[i]
-            if ch == '%' and i + 2 < L:
-                try:
-                    hexv = s[i+1:i+3]
-                    res += chr(int(hexv, 16))
-                    i += 3
-                    continue
-                except Exception:
-                    pass
-            res += ch
-            i += 1
-        return res
+        ssid = bytes(ssid).decode('utf-8')
+        password = bytes(fields.get(b'password', b'')).decode('utf-8')
+        self._add_or_update_network(ssid, password)
+        return ssid
 
-    # ---------- Config portal (append mode) ----------
-    def start_config_portal(self, listen_addr='0.0.0.0', port=80,noap=False):
-        # produce a scan snapshot to show available SSIDs
-        scans = self._scan()
-        ssids = sorted(scans.items(), key=lambda x: x[1], reverse=True)
+    async def config_portal(self, listen_addr='0.0.0.0', port=80, noap=False,
+                            max_clients=4, timeout_ms=5000):
+        """Serve the config form on the running event loop until cancelled.
+
+        Runs alongside the candle and REPL tasks. At most `max_clients`
+        connections are served at once (others get a 503, see
+        httpreq.reject) and every read from a client must complete within
+        `timeout_ms`."""
         if noap or (self.adapter['sta']).isconnected():
             print('Skipping config portal, STA connected')
         else:
@@ -143,103 +310,68 @@ class WiFiManager:
             ap.active(True)
             ap.config(essid=self.ap_ssid)
 
-        addr = socket.getaddrinfo(listen_addr, port)[0][-1]
-        s = socket.socket()
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind(addr)
-        s.listen(1)
+        # produce a scan snapshot to show available SSIDs
+        self._scan()
+        self._clients = 0
+        self._max_clients = max_clients
+        self._timeout_ms = timeout_ms
+        # one request buffer per connection slot, allocated up front
+        self._parsers = [RequestParser() for _ in range(max_clients)]
+        server = await asyncio.start_server(self._portal_client, listen_addr, port, backlog=max_clients)
         if self.adapter['ap'].active():
             print('Config portal running on AP:', self.ap_ssid)
         else:
             print('Config portal running on:', self.adapter['sta'].ipconfig('addr4'))
-        html_top = '<html><head><title>WiFi Setup</title></head><body>'
-        html_top += '<h3>Select a scanned SSID or enter one manually</h3>'
-        html_top += '<form method="post">'
-        # dropdown of scanned SSIDs
-        html_top += 'Scanned: <select name="ssid_select">'
-        html_top += '<option value="">--choose--</option>'
-        for ss, r in ssids:
-            if self.adapter['sta'].isconnected() and ss == self.adapter['sta'].config('essid'):
-                html_top += '<option value="%s">%s ** (%d)</option>' % (ss, ss, r)
-            else:
-                html_top += '<option value="%s">%s (%d)</option>' % (ss, ss, r)
-        html_top += '</select><br>'
-        html_top += 'Or SSID: <input name="ssid_manual"><br>'
-        html_top += 'Password: <input name="password" type="password"><br>'
-        html_top += '<input type="submit" value="Add/Update">'
-        html_top += '</form>'
-        html_top += '<p>Saved networks:</p><ul>'
-        for n in self.get_saved_networks():
-            html_top += '<li>%s</li>' % n.get('ssid')
-        html_top += '</ul>'
-        html_top += '</body></html>'
-
         try:
             while True:
-                cl, addr = s.accept()
-                cl_file = cl.makefile('rwb', 0)
-                request_line = cl_file.readline()
-                if not request_line:
-                    cl.close()
-                    continue
-                # read headers
-                headers = b''
-                while True:
-                    line = cl_file.readline()
-                    if not line or line == b'\r\n':
-                        break
-                    headers += line
-
-                request = request_line.decode('utf-8')
-                method = request.split(' ')[0]
-                if method == 'GET':
-                    resp = 'HTTP/1.0 200 OK\r\nContent-Type: text/html\r\n\r\n' + html_top
-                    cl.send(resp)
-                    cl.close()
-                    continue
-
-                if method == 'POST':
-                    # read body (Content-Length)
-                    length = 0
-                    try:
-                        for hline in headers.split(b'\r\n'):
-                            if hline.lower().startswith(b'content-length:'):
-                                try:
-                                    length = int(hline.split(b':', 1)[1].strip())
-                                except Exception:
-                                    length = 0
-                                break
-                    except Exception:
-                        length = 0
-
-                    body = cl_file.read(length).decode('utf-8') if length else ''
-                    params = {}
-                    for pair in body.split('&'):
-                        if '=' in pair:
-                            k, v = pair.split('=', 1)
-                            params[k] = v
-
-                    ssid = ''
-                    if params.get('ssid_manual'):
-                        ssid = self._urldecode(params.get('ssid_manual'))
-                    elif params.get('ssid_select'):
-                        ssid = self._urldecode(params.get('ssid_select'))
-
-                    password = self._urldecode(params.get('password', ''))
-
-                    if ssid:
-                        self._add_or_update_network(ssid, password)
-                        cl.send('HTTP/1.0 200 OK\r\nContent-Type: text/html\r\n\r\n')
-                        cl.send('Saved. Rebooting...')
-                        cl.close()
-                        time.sleep(1)
-                        machine.reset()
-                    else:
-                        cl.send('HTTP/1.0 400 Bad Request\r\n\r\nMissing SSID')
-                        cl.close()
+                await asyncio.sleep(3600)
         finally:
+            server.close()
+            await server.wait_closed()
+
+    def start_config_portal(self, listen_addr='0.0.0.0', port=80, noap=False):
+        """Blocking entry point; from aiorepl use `await wm.config_portal()`."""
+        asyncio.run(self.config_portal(listen_addr, port, noap))
+
+    async def _portal_client(self, reader, writer):
+        if self._clients >= self._max_clients:
+            await reject(reader, writer, b'HTTP/1.0 503 Service Unavailable\r\n\r\nBusy',
+                         self._timeout_ms)
+            return
+        self._clients += 1
+        req = self._parsers.pop()
+        reboot = False
+        try:
+            if not await req.read(reader, self._timeout_ms):
+                return
+            method = req.method()
+            if method == b'GET':
+                if b'?scan' in req.path():
+                    self._scan()
+                self._write_page(writer)
+            elif method == b'POST':
+                if self._save_form(req.form()):
+                    writer.write(b'HTTP/1.0 200 OK\r\nContent-Type: text/html\r\n\r\n')
+                    writer.write(b'Saved. Rebooting...')
+                    reboot = True
+                else:
+                    writer.write(b'HTTP/1.0 400 Bad Request\r\n\r\nMissing SSID')
+            else:
+                raise HTTPError(400)
+            await writer.drain()
+        except HTTPError as e:
+            writer.write(('HTTP/1.0 %d %s\r\n\r\n' % (e.status, REASONS.get(e.status, ''))).encode())
             try:
-                s.close()
+                await writer.drain()
             except Exception:
                 pass
-
+        except Exception as e:
+            # timeouts and dropped clients end up here
+            print('Portal client error:', repr(e))
+        finally:
+            self._parsers.append(req)
+            self._clients -= 1
+            await close(writer)
+        if reboot:
+            await asyncio.sleep(1)
+            machine.reset()